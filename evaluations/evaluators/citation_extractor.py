@@ -1,17 +1,32 @@
 """
 Citation Extractor for Tattva Evaluation System
-Extracts citations from answer text using regex patterns.
+Extracts citations from answer text using the shared citation scanner.
 
 Supported citation formats:
 - "Bala Kanda 1.5"           → (Bala Kanda, 1, 5)
 - "Kishkindha Kanda 18.60"   → (Kishkindha Kanda, 18, 60)
 - "(Bala Kanda 3.7-8)"       → [(Bala Kanda, 3, 7), (Bala Kanda, 3, 8)]
 - "[Sundara Kanda 22.46]"    → (Sundara Kanda, 22, 46)
+- "[Ayodhya Kanda 26.1-2, 64.72]" → (Ayodhya Kanda, 26, 1), (26, 2), (64, 72)
+
+extract_citation_ranges() keeps ranges compact instead (one CitationRange
+per merged interval), so a garbled "Yuddha Kanda 127.11-1500" costs one
+object rather than ~1,500. extract_citations() is built on it and expands
+at most MAX_EXPANDED_SHLOKAS shlokas per range.
 """
 
-import re
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .citation_scanner import iter_citations
+
+# Missing shlokas listed per range in reports (the count is always exact)
+MAX_REPORTED_MISSING = 20
+
+# Shlokas extract_citations() expands per merged range; longer (usually
+# garbled) ranges are truncated. Use extract_citation_ranges() for exact spans.
+MAX_EXPANDED_SHLOKAS = 100
 
 # Kanda normalization map - maps various forms to canonical ID format
 KANDA_NORMALIZATION = {
@@ -74,10 +89,81 @@ class Citation:
         """Generate the Pinecone vector ID format."""
         return f"{self.kanda}-{self.sarga}-{self.shloka}"
     
+    @property
+    def key(self) -> Optional[int]:
+        """Packed integer key (see shloka_keys.py); None if not packable."""
+        from .shloka_keys import pack_key
+        return pack_key(self.kanda, self.sarga, self.shloka)
+    
     def __repr__(self) -> str:
         return f"Citation({self.kanda}, {self.sarga}, {self.shloka})"
 
 
+@dataclass
+class CitationRange:
+    """
+    A compact interval of shlokas within one sarga, merged from one or more
+    cited ranges. `parts` keeps each cited (start, end, original_text) in
+    order of appearance, so expansion reports the text that first cited
+    each shloka.
+    """
+    kanda: str
+    sarga: int
+    shloka_start: int
+    shloka_end: int
+    parts: List[Tuple[int, int, str]]
+    
+    @property
+    def range_id(self) -> str:
+        return f"{self.kanda}-{self.sarga}-{self.shloka_start}-{self.shloka_end}"
+    
+    @property
+    def original_text(self) -> str:
+        return self.parts[0][2]
+    
+    @property
+    def cited_text(self) -> str:
+        """Original text of every cited part, for reporting the range as a whole."""
+        return ", ".join(dict.fromkeys(text for _, _, text in self.parts))
+    
+    @property
+    def is_range(self) -> bool:
+        return self.shloka_end != self.shloka_start
+    
+    def __len__(self) -> int:
+        return self.shloka_end - self.shloka_start + 1
+    
+    def original_text_for(self, shloka: int) -> str:
+        """Text of the first cited part covering `shloka`."""
+        for start, end, text in self.parts:
+            if start <= shloka <= end:
+                return text
+        return self.original_text
+    
+    def summarize(self, found: Iterable[int], limit: int = MAX_REPORTED_MISSING) -> Tuple[int, int, List[int]]:
+        """
+        (found count, missing count, first `limit` missing shlokas) given the
+        shloka numbers a lookup found. The range is not expanded: work is
+        bounded by len(found) + limit, not by the range length.
+        """
+        found = {shloka for shloka in found if self.shloka_start <= shloka <= self.shloka_end}
+        missing = []
+        shloka = self.shloka_start
+        while len(missing) < limit and shloka <= self.shloka_end:
+            if shloka not in found:
+                missing.append(shloka)
+            shloka += 1
+        return len(found), len(self) - len(found), missing
+    
+    def expand(self) -> Iterator[Citation]:
+        """Lazily yield one Citation per shloka (for reporting)."""
+        for shloka in range(self.shloka_start, self.shloka_end + 1):
+            yield Citation(self.kanda, self.sarga, shloka, self.original_text_for(shloka))
+    
+    def __repr__(self) -> str:
+        return f"CitationRange({self.kanda}, {self.sarga}, {self.shloka_start}-{self.shloka_end})"
+
+
 def normalize_kanda(kanda_text: str) -> Optional[str]:
     """
     Normalize a Kanda name to its canonical ID form.
@@ -106,7 +192,7 @@ def normalize_kanda(kanda_text: str) -> Optional[str]:
     return None
 
 
-def extract_citations(answer_text: str) -> List[Citation]:
+def extract_citations(answer_text: str, max_per_range: int = MAX_EXPANDED_SHLOKAS) -> List[Citation]:
     """
     Extract all citations from an answer text.
     
@@ -115,73 +201,67 @@ def extract_citations(answer_text: str) -> List[Citation]:
     - "(Bala Kanda 3.7-8)"  - range expansion
     - "[Sundara Kanda 22.46]"
     - "Kishkindha Kanda 18.60, Yuddha Kanda 127.15"
+    - "[Ayodhya Kanda 26.1-2, 64.72]" - comma-separated list
+    - "[Sundara Kanda 35.7; Bala Kanda 1.27]" - semicolon-separated
     
     Args:
         answer_text: The full answer text containing citations
+        max_per_range: Shlokas expanded per merged range (the rest are dropped)
     
     Returns:
-        List of Citation objects, deduplicated by shloka_id
+        List of Citation objects, one per shloka_id, grouped by (kanda, sarga)
+        in order of first appearance
+    
+    Built on extract_citation_ranges, so expansion is bounded by
+    max_per_range per range; verification uses the ranges directly.
     """
     citations = []
-    
-    # Primary pattern: "Kanda Name Sarga.Shloka" or "Kanda Name Sarga.Shloka-Shloka2"
-    # Captures: (Kanda Name) (Sarga) (Shloka) (optional: -Shloka2)
-    pattern = r"""
-        ((?:Bala|Ayodhya|Aranya|Kishkindha|Sundara|Yuddha|Uttara)
-        \s*Kanda?)                    # Kanda name (with optional "Kanda" suffix)
-        \s+                           # Whitespace
-        (\d+)                         # Sarga number
-        [.\s:]                        # Separator (., space, or :)
-        (\d+)                         # Shloka number
-        (?:\s*[-–—]\s*(\d+))?         # Optional: range end (e.g., "-8" for 3.7-8)
+    for citation_range in extract_citation_ranges(answer_text):
+        # Merged ranges are disjoint, so no shloka is expanded twice
+        citations.extend(islice(citation_range.expand(), max_per_range))
+    return citations
+
+
+def extract_citation_ranges(answer_text: str) -> List[CitationRange]:
     """
+    Extract citations as compact ranges, merging overlapping and adjacent
+    intervals within each (kanda, sarga).
     
-    # Find all matches (case insensitive)
-    matches = re.findall(pattern, answer_text, re.IGNORECASE | re.VERBOSE)
-    
-    for match in matches:
-        kanda_raw, sarga_str, shloka_start_str, shloka_end_str = match
-        
-        kanda = normalize_kanda(kanda_raw)
-        if not kanda:
-            continue  # Skip unrecognized kanda names
-        
-        sarga = int(sarga_str)
-        shloka_start = int(shloka_start_str)
-        
-        # Reconstruct original text for reference
-        original = f"{kanda_raw} {sarga_str}.{shloka_start_str}"
-        if shloka_end_str:
-            original += f"-{shloka_end_str}"
-        
-        # Handle range expansion
-        if shloka_end_str:
-            shloka_end = int(shloka_end_str)
-            # Expand range (e.g., 3.7-8 → 3.7, 3.8)
-            for shloka in range(shloka_start, shloka_end + 1):
-                citations.append(Citation(
-                    kanda=kanda,
-                    sarga=sarga,
-                    shloka=shloka,
-                    original_text=original
-                ))
-        else:
-            citations.append(Citation(
-                kanda=kanda,
-                sarga=sarga,
-                shloka=shloka_start,
-                original_text=original
-            ))
+    Ranges are ordered by the first appearance of their (kanda, sarga);
+    nothing is expanded, so the result size is bounded by the number of
+    citations written, not by the shloka span they claim.
+    
+    Args:
+        answer_text: The full answer text containing citations
+    
+    Returns:
+        List of CitationRange objects (disjoint, non-adjacent per sarga)
+    """
+    by_sarga: Dict[Tuple[str, int], List[Tuple[int, int, str]]] = {}
+    for scanned in iter_citations(answer_text):
+        start, end = scanned.shloka_start, scanned.shloka_end
+        if end < start:
+            # Backwards ranges ("3.8-7") cite nothing, as in extract_citations
+            continue
+        by_sarga.setdefault((scanned.kanda, scanned.sarga), []).append((start, end, scanned.original_text))
     
-    # Deduplicate by shloka_id (keep first occurrence)
-    seen = set()
-    unique_citations = []
-    for c in citations:
-        if c.shloka_id not in seen:
-            seen.add(c.shloka_id)
-            unique_citations.append(c)
+    ranges = []
+    for (kanda, sarga), parts in by_sarga.items():
+        merged: List[CitationRange] = []
+        for start, end, _ in sorted(parts, key=lambda part: part[0]):
+            if merged and start <= merged[-1].shloka_end + 1:
+                merged[-1].shloka_end = max(merged[-1].shloka_end, end)
+            else:
+                merged.append(CitationRange(kanda, sarga, start, end, []))
+        # Attach the cited parts (in appearance order) to the interval holding them
+        for part in parts:
+            for citation_range in merged:
+                if citation_range.shloka_start <= part[0] <= citation_range.shloka_end:
+                    citation_range.parts.append(part)
+                    break
+        ranges.extend(merged)
     
-    return unique_citations
+    return ranges
 
 
 def format_citation(kanda: str, sarga: int, shloka: int) -> str:
@@ -211,3 +291,6 @@ if __name__ == "__main__":
                 print(f"  → {c.shloka_id} (from '{c.original_text}')")
         else:
             print("  → No citations found")
+        for r in extract_citation_ranges(text):
+            if r.is_range:
+                print(f"  ⇒ range {r.range_id} ({len(r)} shlokas)")
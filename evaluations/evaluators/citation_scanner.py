@@ -0,0 +1,172 @@
+"""
+Citation Scanner for Tattva Evaluation System
+Single-pass, precompiled citation scanner shared by every citation extractor.
+
+One compiled pattern finds every documented format in a single linear pass:
+- "Bala Kanda 1.5", "Bala-Kanda 1.23", "BalaKanda 1.5", "Bala Kanda 1 5"
+- "[Bala Kanda, 1.5]"                     (comma after "Kanda"; sarga.shloka then needs "." or ":")
+- "Bala 1.1" (without "Kanda" the sarga/shloka separator must be "." or ":",
+  so prose like "the bala 1-2 thing" is not a citation)
+- "[Aranya Kanda 14.33-35]"               (shloka ranges, kept compact)
+- "[Ayodhya Kanda 26.1-2, 64.72]"         (comma lists of sarga.shloka)
+- "[Sundara Kanda 35.7; Bala Kanda 1.27]" (semicolon multi-citations)
+
+Scanning never expands ranges; callers decide whether to expand.
+citation_brackets() returns the inline [...] groups themselves, as written,
+for reports that count bracketed citation groups.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+
+KANDA_BASE_NAMES = r"(?:Bala|Ayodhya|Aranya|Kishkindha|Sundara|Yuddha|Uttara)"
+
+CITATION_REGEX = re.compile(
+    r"""
+    \b(?P<base>""" + KANDA_BASE_NAMES + r""")  # Kanda base name
+    (?P<suffix>[\s-]*Kanda?)?                  # Optional "Kanda" suffix (space/hyphen/none)
+    (?(suffix)(?:(?P<comma>,)\s*|\s+)|[\s-]+)  # Separator before sarga (optional comma after "Kanda")
+    (?P<sarga>\d{1,4})                         # Sarga number
+    (?(comma)[.:]|(?(suffix)[.:\s]|[.:]))       # Sarga/shloka separator ("." or ":" without "Kanda" or after a comma)
+    (?P<shloka>\d{1,4})                        # Shloka number
+    (?:\s*[-–—]\s*(?P<end>\d{1,4}))?           # Optional range end (e.g., 3.7-8)
+    (?P<more>(?:\s*[,;]\s*\d{1,4}[.:]\d{1,4}(?:\s*[-–—]\s*\d{1,4})?)*)  # Same-kanda list
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Applied only to the short `more` tail of a match, never to the full text
+_CONTINUATION_REGEX = re.compile(r"(\d{1,4})[.:](\d{1,4})(?:\s*[-–—]\s*(\d{1,4}))?")
+
+
+@dataclass(frozen=True)
+class ScannedCitation:
+    """A citation (or compact shloka range) found by the scanner."""
+    kanda: str          # Canonical form: "bala-kanda"
+    sarga: int
+    shloka_start: int
+    shloka_end: int     # Equal to shloka_start for single-shloka citations
+    original_text: str  # Normalized original text, e.g. "Bala Kanda 3.7-8"
+    bracketed: bool     # True when the citation sits inside [...]
+
+    @property
+    def is_range(self) -> bool:
+        return self.shloka_end != self.shloka_start
+
+
+def _scan(text: str) -> Iterator[Tuple["re.Match", int]]:
+    """
+    Yield (match, position of the enclosing "[" or -1) for every citation match.
+
+    The last "[" and "]" are tracked incrementally, searching only the text
+    since the previous match, so the whole scan stays linear in the text length.
+    """
+    last_open = last_close = -1
+    scanned = 0
+    for match in CITATION_REGEX.finditer(text):
+        position = match.start()
+        last_open = max(last_open, text.rfind("[", scanned, position))
+        last_close = max(last_close, text.rfind("]", scanned, position))
+        scanned = position
+        yield match, last_open if last_open > last_close else -1
+
+
+def _make_citation(kanda_raw, kanda, sarga, start, end, bracketed) -> ScannedCitation:
+    original = f"{kanda_raw} {sarga}.{start}"
+    if end is not None:
+        original += f"-{end}"
+    start_num = int(start)
+    return ScannedCitation(
+        kanda=kanda,
+        sarga=int(sarga),
+        shloka_start=start_num,
+        shloka_end=int(end) if end is not None else start_num,
+        original_text=original,
+        bracketed=bracketed,
+    )
+
+
+def iter_citations(text: str, bracketed_only: bool = False) -> Iterator[ScannedCitation]:
+    """
+    Scan text for citations in a single pass.
+
+    Args:
+        text: Answer text to scan
+        bracketed_only: Only yield citations written inline as [...]
+
+    Yields:
+        ScannedCitation objects in order of appearance (not deduplicated).
+    """
+    if not text:
+        return
+
+    for match, open_pos in _scan(text):
+        bracketed = open_pos != -1
+        if bracketed_only and not bracketed:
+            continue
+
+        base = match.group("base")
+        kanda = base.lower() + "-kanda"
+        kanda_raw = base + (match.group("suffix") or "")
+
+        yield _make_citation(
+            kanda_raw, kanda, match.group("sarga"), match.group("shloka"),
+            match.group("end"), bracketed
+        )
+
+        more = match.group("more")
+        if more:
+            for sarga, start, end in _CONTINUATION_REGEX.findall(more):
+                yield _make_citation(kanda_raw, kanda, sarga, start, end or None, bracketed)
+
+
+def scan_citations(text: str, bracketed_only: bool = False) -> List[ScannedCitation]:
+    """Return all citations found in text (see iter_citations)."""
+    return list(iter_citations(text, bracketed_only))
+
+
+def citation_brackets(text: str) -> List[str]:
+    """
+    Inline [...] groups containing at least one citation, each once and as
+    written (e.g. "[Ayodhya Kanda 26.1-2, 64.72]").
+    """
+    if not text:
+        return []
+    brackets = []
+    last_open = -1
+    for match, open_pos in _scan(text):
+        if open_pos == -1 or open_pos == last_open:
+            continue
+        last_open = open_pos
+        close_pos = text.find("]", match.end())
+        if close_pos != -1:
+            brackets.append(text[open_pos:close_pos + 1])
+    return brackets
+
+
+def has_citations(text: str, bracketed_only: bool = False) -> bool:
+    """Check whether text contains at least one citation (stops at the first)."""
+    return next(iter_citations(text, bracketed_only), None) is not None
+
+
+# --- Testing / Demo ---
+if __name__ == "__main__":
+    test_texts = [
+        "According to Bala Kanda 3.7, the epic begins with...",
+        "[Bala-Kanda 1.23] and [Aranya Kanda 14.33-35]",
+        "[Ayodhya Kanda 26.1-2, 64.72]",
+        "[Sundara Kanda 35.7; Bala Kanda 1.27]",
+        "Ayodhya-Kanda 100.76 and Bala 1.1",
+        "[Bala Kanda, 1.5] and Kishkindha Kanda,4.10",
+        "the bala 1-2 thing, Sundara kanda, 12 3",
+        "No citations in this text.",
+    ]
+
+    print("Citation Scanner Test:")
+    print("=" * 50)
+    for text in test_texts:
+        print(f"\nInput: {text}")
+        for c in scan_citations(text):
+            span = f"{c.shloka_start}-{c.shloka_end}" if c.is_range else str(c.shloka_start)
+            print(f"  → {c.kanda} {c.sarga}.{span} bracketed={c.bracketed} ('{c.original_text}')")
@@ -5,17 +5,23 @@ Integrates citation extraction and Pinecone verification.
 Full pipeline:
 1. Extract citations from answer text
 2. Normalize Kanda names
-3. Verify each citation exists in Pinecone
-4. Return PASS/FAIL with details
+3. Reject citations outside the sarga bounds table (no lookup)
+4. Verify each remaining citation exists in Pinecone (shloka ranges are
+   kept compact and checked with one lookup per range)
+5. Return PASS/FAIL with details (one detail per range, never expanded)
 """
 
 import json
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 from enum import Enum
 
-from .citation_extractor import extract_citations, Citation, normalize_kanda
-from .pinecone_verifier import verify_citation_exists, verify_citations_batch
+from .citation_extractor import MAX_REPORTED_MISSING, CitationRange, extract_citation_ranges, normalize_kanda
+from .pinecone_verifier import (
+    LookupStats, RangeVerification, VerificationResult, verify_citation_exists,
+    verify_citation_range, verify_citations_batch
+)
+from .sarga_bounds import get_sarga_bounds
 
 
 class VerificationStatus(Enum):
@@ -40,6 +46,11 @@ class CitationDetail:
     exists: bool
     text_preview: Optional[str] = None
     error: Optional[str] = None
+    # Ranges only (one detail per range): found / missing shloka counts and
+    # the first MAX_REPORTED_MISSING missing shlokas
+    found_count: Optional[int] = None
+    missing_count: Optional[int] = None
+    missing_shlokas: Optional[List[int]] = None
 
 
 @dataclass
@@ -51,6 +62,8 @@ class VerificationReport:
     phantom_citations: List[str]
     details: List[CitationDetail]
     note: Optional[str] = None
+    network_calls: Optional[int] = None  # Pinecone requests issued for this report
+    calls_saved: Optional[int] = None    # Requests avoided vs. per-citation fallback
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to JSON-serializable dict."""
@@ -60,7 +73,9 @@ class VerificationReport:
             "verified_citations": self.verified_citations,
             "phantom_citations": self.phantom_citations,
             "details": [asdict(d) for d in self.details],
-            "note": self.note
+            "note": self.note,
+            "network_calls": self.network_calls,
+            "calls_saved": self.calls_saved
         }
     
     def to_json(self, indent: int = 2) -> str:
@@ -68,115 +83,139 @@ class VerificationReport:
         return json.dumps(self.to_dict(), indent=indent)
 
 
-def verify_answer_citations(
-    answer_text: str,
-    template: Optional[AnswerTemplate] = None,
-    use_pinecone: bool = True
+def _empty_report(template: Optional[AnswerTemplate]) -> VerificationReport:
+    """Build the report for an answer with no citations, based on template."""
+    if template == AnswerTemplate.T3:
+        return VerificationReport(
+            result=VerificationStatus.SKIP,
+            total_citations=0,
+            verified_citations=0,
+            phantom_citations=[],
+            details=[],
+            note="T3 refusal template - no citations expected"
+        )
+    elif template == AnswerTemplate.T1:
+        return VerificationReport(
+            result=VerificationStatus.FAIL,
+            total_citations=0,
+            verified_citations=0,
+            phantom_citations=[],
+            details=[],
+            note="T1 textual template requires citations but none found"
+        )
+    elif template == AnswerTemplate.T2:
+        return VerificationReport(
+            result=VerificationStatus.WARNING,
+            total_citations=0,
+            verified_citations=0,
+            phantom_citations=[],
+            details=[],
+            note="T2 interpretive template should have citations but none found"
+        )
+    else:
+        # No template specified
+        return VerificationReport(
+            result=VerificationStatus.PASS,
+            total_citations=0,
+            verified_citations=0,
+            phantom_citations=[],
+            details=[],
+            note="No citations found in answer"
+        )
+
+
+def _range_detail(citation_range: CitationRange, verification: Optional[RangeVerification]) -> CitationDetail:
+    """
+    Report a whole range as one detail. verification is None in offline mode
+    (every shloka unverified).
+    """
+    if verification is None:
+        found, error = (), "Offline mode - Pinecone verification skipped"
+    else:
+        found = verification.found
+        error = verification.error
+        if error is None and verification.outside_reason and (
+            citation_range.shloka_start < verification.start or citation_range.shloka_end > verification.end
+        ):
+            error = f"Out of bounds: {verification.outside_reason}"
+    
+    found_count, missing_count, missing_shlokas = citation_range.summarize(found, MAX_REPORTED_MISSING)
+    return CitationDetail(
+        citation_text=citation_range.cited_text,
+        shloka_id=citation_range.range_id,
+        exists=missing_count == 0,
+        error=error if missing_count else None,
+        found_count=found_count,
+        missing_count=missing_count,
+        missing_shlokas=missing_shlokas
+    )
+
+
+def _build_report(
+    ranges: List[CitationRange],
+    results: Optional[Dict[str, VerificationResult]],
+    range_results: Optional[Dict[str, RangeVerification]] = None
 ) -> VerificationReport:
     """
-    Verify all citations in an answer text.
+    Build a report from pre-computed verification results.
     
     Args:
-        answer_text: The full answer text containing citations
-        template: Optional answer template (T1/T2/T3) for edge case handling
-        use_pinecone: Whether to verify against Pinecone (set False for offline testing)
+        ranges: Citation ranges extracted from one answer
+        results: Dict mapping shloka_id to VerificationResult for single-shloka
+            citations, or None for offline mode (all citations marked unverified)
+        range_results: Dict mapping range_id to RangeVerification for
+            multi-shloka ranges
     
-    Returns:
-        VerificationReport with PASS/FAIL result and citation details.
+    total_citations and verified_citations count shlokas; details and
+    phantom_citations hold one entry per citation or range.
     """
-    # Step 1: Extract citations
-    citations = extract_citations(answer_text)
-    
-    # Edge case: No citations found
-    if not citations:
-        # Handle based on template type
-        if template == AnswerTemplate.T3:
-            return VerificationReport(
-                result=VerificationStatus.SKIP,
-                total_citations=0,
-                verified_citations=0,
-                phantom_citations=[],
-                details=[],
-                note="T3 refusal template - no citations expected"
-            )
-        elif template == AnswerTemplate.T1:
-            return VerificationReport(
-                result=VerificationStatus.FAIL,
-                total_citations=0,
-                verified_citations=0,
-                phantom_citations=[],
-                details=[],
-                note="T1 textual template requires citations but none found"
-            )
-        elif template == AnswerTemplate.T2:
-            return VerificationReport(
-                result=VerificationStatus.WARNING,
-                total_citations=0,
-                verified_citations=0,
-                phantom_citations=[],
-                details=[],
-                note="T2 interpretive template should have citations but none found"
-            )
-        else:
-            # No template specified
-            return VerificationReport(
-                result=VerificationStatus.PASS,
-                total_citations=0,
-                verified_citations=0,
-                phantom_citations=[],
-                details=[],
-                note="No citations found in answer"
-            )
-    
-    # Step 2: Verify each citation
     details = []
     phantom_citations = []
+    total_count = 0
     verified_count = 0
     
-    if use_pinecone:
-        # Batch verify for efficiency
-        citation_tuples = [(c.kanda, c.sarga, c.shloka) for c in citations]
-        results = verify_citations_batch(citation_tuples)
-        
-        for citation in citations:
-            result = results.get(citation.shloka_id)
-            if result:
-                exists = result.exists
-                text_preview = result.text_preview
-                error = result.error
-            else:
-                # Fallback to individual verification
-                result = verify_citation_exists(citation.kanda, citation.sarga, citation.shloka)
-                exists = result.exists
-                text_preview = result.text_preview
-                error = result.error
-            
-            detail = CitationDetail(
-                citation_text=citation.original_text,
-                shloka_id=citation.shloka_id,
-                exists=exists,
-                text_preview=text_preview,
-                error=error
-            )
+    for citation_range in ranges:
+        if citation_range.is_range:
+            # One detail per range; counts only, so work does not grow with the range length
+            detail = _range_detail(citation_range, None if results is None else (range_results or {}).get(citation_range.range_id))
+            total_count += len(citation_range)
+            verified_count += detail.found_count
+            if not detail.exists:
+                phantom_citations.append(citation_range.cited_text)
             details.append(detail)
-            
-            if exists:
-                verified_count += 1
-            else:
-                phantom_citations.append(citation.original_text)
-    else:
-        # Offline mode - mark all as unverified for testing
-        for citation in citations:
-            detail = CitationDetail(
-                citation_text=citation.original_text,
-                shloka_id=citation.shloka_id,
+            continue
+        
+        citation = next(citation_range.expand())
+        if results is None:
+            # Offline mode - mark all as unverified for testing
+            result = VerificationResult(
                 exists=False,
+                shloka_id=citation.shloka_id,
+                kanda=citation.kanda,
+                sarga=citation.sarga,
+                shloka=citation.shloka,
                 error="Offline mode - Pinecone verification skipped"
             )
-            details.append(detail)
+        else:
+            result = results.get(citation.shloka_id)
+            if result is None:
+                # Fallback to individual verification
+                result = verify_citation_exists(citation.kanda, citation.sarga, citation.shloka)
+        
+        details.append(CitationDetail(
+            citation_text=citation.original_text,
+            shloka_id=citation.shloka_id,
+            exists=result.exists,
+            text_preview=result.text_preview,
+            error=result.error
+        ))
+        total_count += 1
+        if result.exists:
+            verified_count += 1
+        else:
             phantom_citations.append(citation.original_text)
     
-    # Step 3: Determine result
+    # Determine result
     if phantom_citations:
         result = VerificationStatus.FAIL
     else:
@@ -184,16 +223,201 @@ def verify_answer_citations(
     
     return VerificationReport(
         result=result,
-        total_citations=len(citations),
+        total_citations=total_count,
         verified_citations=verified_count,
         phantom_citations=phantom_citations,
         details=details
     )
 
 
+def _verify_with_bounds(
+    citations: List[tuple],
+    stats: Optional[LookupStats] = None,
+    include_previews: bool = False
+) -> Dict[str, VerificationResult]:
+    """
+    verify_citations_batch with the sarga bounds table as a first pass.
+    
+    Citations the bounds table rules out are reported as phantoms without
+    any lookup; only in-bounds citations reach the local index / Pinecone.
+    """
+    if stats is None:
+        stats = LookupStats()
+    results = {}
+    pending = []
+    
+    bounds = get_sarga_bounds()
+    for kanda, sarga, shloka in dict.fromkeys(citations):
+        reason = bounds.out_of_bounds(kanda, sarga, shloka) if bounds is not None else None
+        if reason is None:
+            pending.append((kanda, sarga, shloka))
+            continue
+        shloka_id = f"{kanda}-{sarga}-{shloka}"
+        results[shloka_id] = VerificationResult(
+            exists=False, shloka_id=shloka_id, kanda=kanda, sarga=sarga, shloka=shloka,
+            error=f"Out of bounds: {reason}"
+        )
+        stats.bounds_rejects += 1
+        # A missing ID costs a fetch + a query on the per-citation path
+        stats.baseline_calls += 2
+    
+    if pending:
+        results.update(verify_citations_batch(pending, stats, include_previews))
+    return results
+
+
+def _verify_ranges_with_bounds(
+    ranges: List[CitationRange],
+    stats: Optional[LookupStats] = None,
+    include_previews: bool = False
+) -> Dict[str, RangeVerification]:
+    """
+    Verify multi-shloka ranges, one lookup per distinct range.
+    
+    The sarga bounds table clips each range first: shlokas past the end of
+    the sarga are reported as phantoms without any lookup, so lookup work is
+    bounded by the sarga length rather than by what the answer claims.
+    """
+    if stats is None:
+        stats = LookupStats()
+    results = {}
+    
+    bounds = get_sarga_bounds()
+    for citation_range in ranges:
+        if citation_range.range_id in results:
+            continue
+        kanda, sarga = citation_range.kanda, citation_range.sarga
+        if bounds is not None:
+            checked, reason = bounds.clip_range(kanda, sarga, citation_range.shloka_start, citation_range.shloka_end)
+        else:
+            checked, reason = (citation_range.shloka_start, citation_range.shloka_end), None
+        
+        if checked is None:
+            verification = RangeVerification(kanda, sarga, 1, 0, outside_reason=reason)
+            rejected = len(citation_range)
+        else:
+            verification = verify_citation_range(kanda, sarga, checked[0], checked[1], stats, include_previews)
+            verification.outside_reason = reason
+            rejected = len(citation_range) - (checked[1] - checked[0] + 1)
+        
+        stats.bounds_rejects += rejected
+        stats.baseline_calls += 2 * rejected
+        results[citation_range.range_id] = verification
+    
+    return results
+
+
+def verify_answer_citations(
+    answer_text: str,
+    template: Optional[AnswerTemplate] = None,
+    use_pinecone: bool = True,
+    include_previews: bool = False
+) -> VerificationReport:
+    """
+    Verify all citations in an answer text.
+    
+    Args:
+        answer_text: The full answer text containing citations
+        template: Optional answer template (T1/T2/T3) for edge case handling
+        use_pinecone: Whether to verify against Pinecone (set False for offline testing)
+        include_previews: Whether citation details carry text previews (costs
+            metadata transfer for citations the local store cannot answer)
+    
+    Returns:
+        VerificationReport with PASS/FAIL result and citation details.
+    """
+    # Step 1: Extract citations (ranges stay compact)
+    ranges = extract_citation_ranges(answer_text)
+    
+    # Edge case: No citations found
+    if not ranges:
+        return _empty_report(template)
+    
+    # Step 2: Verify single shlokas in one batch, ranges with one lookup each
+    results = None
+    range_results = None
+    stats = LookupStats()
+    if use_pinecone:
+        citation_tuples = [(r.kanda, r.sarga, r.shloka_start) for r in ranges if not r.is_range]
+        results = _verify_with_bounds(citation_tuples, stats, include_previews)
+        range_results = _verify_ranges_with_bounds([r for r in ranges if r.is_range], stats, include_previews)
+    
+    # Step 3: Determine result
+    report = _build_report(ranges, results, range_results)
+    if use_pinecone:
+        report.network_calls = stats.network_calls
+        report.calls_saved = stats.calls_saved
+    return report
+
+
+def verify_answers_bulk(
+    answers: List[Union[str, Tuple[str, Optional[AnswerTemplate]]]],
+    use_pinecone: bool = True,
+    stats: Optional[LookupStats] = None,
+    include_previews: bool = False
+) -> List[VerificationReport]:
+    """
+    Verify citations across many answers with shared lookups.
+    
+    Citations from all answers are deduplicated by shloka ID (ranges by
+    range ID), pre-filtered by the sarga bounds table and verified in one
+    verify_citations_batch call (chunked fetches) plus one lookup per
+    distinct range, then fanned back out
+    into one report per answer. Popular shlokas cited by many answers are
+    only looked up once.
+    
+    Args:
+        answers: Answer texts, or (answer_text, template) tuples
+        use_pinecone: Whether to verify against Pinecone (set False for offline testing)
+        stats: Optional LookupStats to accumulate network call counts for the
+            whole run (lookups are shared, so they are not attributed per answer)
+        include_previews: Whether citation details carry text previews
+    
+    Returns:
+        List of VerificationReport, in the same order as `answers`.
+    """
+    # Step 1: Extract citation ranges for every answer
+    extracted = []
+    unique_tuples = {}
+    unique_ranges = {}
+    for answer in answers:
+        if isinstance(answer, tuple):
+            answer_text, template = answer
+        else:
+            answer_text, template = answer, None
+        
+        ranges = extract_citation_ranges(answer_text or "")
+        extracted.append((ranges, template))
+        for r in ranges:
+            if r.is_range:
+                unique_ranges.setdefault(r.range_id, r)
+            else:
+                unique_tuples[(r.kanda, r.sarga, r.shloka_start)] = None
+    
+    # Step 2: Verify each unique citation / range once
+    results = None
+    range_results = None
+    if use_pinecone:
+        if stats is None:
+            stats = LookupStats()
+        results = _verify_with_bounds(list(unique_tuples), stats, include_previews) if unique_tuples else {}
+        range_results = _verify_ranges_with_bounds(list(unique_ranges.values()), stats, include_previews)
+    
+    # Step 3: Fan results back out per answer
+    reports = []
+    for ranges, template in extracted:
+        if not ranges:
+            reports.append(_empty_report(template))
+        else:
+            reports.append(_build_report(ranges, results, range_results))
+    
+    return reports
+
+
 def verify_trace(
     trace: Dict[str, Any],
-    use_pinecone: bool = True
+    use_pinecone: bool = True,
+    include_previews: bool = False
 ) -> VerificationReport:
     """
     Verify citations in a trace from traces.jsonl.
@@ -201,6 +425,7 @@ def verify_trace(
     Args:
         trace: A trace dict containing generation_result.answer
         use_pinecone: Whether to verify against Pinecone
+        include_previews: Whether citation details carry text previews
     
     Returns:
         VerificationReport forewise
@@ -229,7 +454,7 @@ def verify_trace(
     elif template_str == "T3":
         template = AnswerTemplate.T3
     
-    return verify_answer_citations(answer, template, use_pinecone)
+    return verify_answer_citations(answer, template, use_pinecone, include_previews)
 
 
 # --- Testing / Demo ---
@@ -257,3 +482,11 @@ if __name__ == "__main__":
             print(f"Phantom: {report.phantom_citations}")
         if report.note:
             print(f"Note: {report.note}")
+    
+    print("\n--- Bulk verification ---")
+    bulk_reports = verify_answers_bulk(
+        [(answer, AnswerTemplate[template_str]) for template_str, answer in test_answers],
+        use_pinecone=False
+    )
+    for report in bulk_reports:
+        print(f"{report.result.value}: {report.total_citations} citations")
@@ -3,16 +3,34 @@ Pinecone Verifier for Tattva Evaluation System
 Verifies that cited shlokas exist in the Pinecone database.
 
 Uses metadata filtering (not vector similarity) to check citation existence.
+When a fresh local existence index is available (see shloka_index.py),
+lookups are answered from it without any network calls. Pinecone results are
+persisted in the shared verification cache (see verification_cache.py).
+
+Lookups never download embedding values: existence checks are filtered
+queries with include_values=False that return IDs only. Metadata (for the
+100-char text preview) is requested only when include_previews=True, and
+previews are loaded lazily from the local corpus store when it has them.
 """
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Dict, Any, List
 from pinecone import Pinecone
 
+from .citation_extractor import CANONICAL_TO_DISPLAY, normalize_kanda
+from .shloka_index import get_shloka_index
+from .shloka_keys import format_shloka_id, pack_key, parse_shloka_id
+from .shloka_store import get_shloka_store
+from .verification_cache import CachedVerification, get_verification_cache, make_preview
+
 # Pinecone configuration
 PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME", "tattva-shlokas")
 EMBEDDING_DIMENSION = 1536  # text-embedding-3-small
+# Max citations per filtered lookup query (keeps the $or filter and top_k small)
+FETCH_BATCH_SIZE = 100
+# Cap on matches returned by one range query (bounds garbled ranges like 127.11-1500)
+RANGE_QUERY_MAX_TOP_K = 1000
 
 # Singleton Pinecone client
 _pinecone_client: Optional[Pinecone] = None
@@ -29,6 +47,57 @@ class VerificationResult:
     shloka: int
     text_preview: Optional[str] = None  # First 100 chars of shloka text
     error: Optional[str] = None
+    
+    @property
+    def key(self) -> Optional[int]:
+        """Packed citation key (see shloka_keys.py)."""
+        return pack_key(self.kanda, self.sarga, self.shloka)
+
+
+@dataclass
+class RangeVerification:
+    """
+    Result of verifying a shloka range with one lookup.
+    
+    Only shlokas found in [start, end] are materialized; result() builds the
+    per-shloka VerificationResult for anything else on demand.
+    """
+    kanda: str
+    sarga: int
+    start: int                      # Interval actually checked
+    end: int
+    found: Dict[int, VerificationResult] = field(default_factory=dict)
+    error: Optional[str] = None     # Lookup error (applies to unfound shlokas in [start, end])
+    outside_reason: Optional[str] = None  # Why shlokas outside [start, end] cannot exist
+    
+    def result(self, shloka: int) -> VerificationResult:
+        if shloka in self.found:
+            return self.found[shloka]
+        if self.start <= shloka <= self.end:
+            error = self.error
+        else:
+            error = f"Out of bounds: {self.outside_reason}" if self.outside_reason else None
+        return VerificationResult(
+            exists=False,
+            shloka_id=f"{self.kanda}-{self.sarga}-{shloka}",
+            kanda=self.kanda,
+            sarga=self.sarga,
+            shloka=shloka,
+            error=error
+        )
+
+
+@dataclass
+class LookupStats:
+    """Network call accounting for batch verification."""
+    network_calls: int = 0   # Pinecone requests actually issued
+    baseline_calls: int = 0  # Requests the per-citation fallback would have issued
+    local_hits: int = 0      # Citations answered by the local existence index
+    bounds_rejects: int = 0  # Citations rejected by the sarga bounds table (no lookup)
+    
+    @property
+    def calls_saved(self) -> int:
+        return max(self.baseline_calls - self.network_calls, 0)
 
 
 def get_pinecone_index():
@@ -48,162 +117,420 @@ def get_pinecone_index():
     return _pinecone_index
 
 
-def verify_citation_exists(
+def verify_citation_local(
     kanda: str,
     sarga: int,
     shloka: int
-) -> VerificationResult:
+) -> Optional[VerificationResult]:
     """
-    Verify that a citation exists in Pinecone.
+    Verify a citation against the local existence index.
     
-    Uses metadata filtering with a dummy vector (not semantic search).
+    Existence comes only from the index, which is checked for staleness and
+    the Pinecone index it was built from. The corpus store has no such check
+    (it may come from an older or different dataset), so it only supplies
+    the text preview.
     
-    Args:
-        kanda: Canonical kanda name (e.g., "bala-kanda")
-        sarga: Sarga number
-        shloka: Shloka number
+    Returns:
+        VerificationResult, or None if no fresh index is available and the
+        cache / Pinecone must be consulted.
+    """
+    local_index = get_shloka_index()
+    if local_index is None:
+        return None
+    
+    store = get_shloka_store()
+    exists = local_index.contains(kanda, sarga, shloka)
+    record = store.get(kanda, sarga, shloka) if exists and store is not None else None
+    
+    return VerificationResult(
+        exists=exists,
+        shloka_id=f"{kanda}-{sarga}-{shloka}",
+        kanda=kanda,
+        sarga=sarga,
+        shloka=shloka,
+        text_preview=_make_preview({"shloka_text": record.text}) if record is not None else None
+    )
+
+
+def verify_range_local(
+    kanda: str,
+    sarga: int,
+    start: int,
+    end: int
+) -> Optional[RangeVerification]:
+    """
+    Verify a shloka range against the local existence index: two bisects
+    over the sorted keys, regardless of the range length. As in
+    verify_citation_local, the corpus store only supplies previews.
     
     Returns:
-        VerificationResult with exists=True/False and metadata if found.
+        RangeVerification, or None if no fresh index is available.
     """
-    shloka_id = f"{kanda}-{sarga}-{shloka}"
+    local_index = get_shloka_index()
+    if local_index is None:
+        return None
+    
+    store = get_shloka_store()
+    verification = RangeVerification(kanda, sarga, start, end)
+    for shloka in local_index.shlokas_in_range(kanda, sarga, start, end):
+        record = store.get(kanda, sarga, shloka) if store is not None else None
+        verification.found[shloka] = VerificationResult(
+            exists=True,
+            shloka_id=f"{kanda}-{sarga}-{shloka}",
+            kanda=kanda,
+            sarga=sarga,
+            shloka=shloka,
+            text_preview=_make_preview({"shloka_text": record.text}) if record is not None else None
+        )
+    return verification
+
+
+def verify_citation_range(
+    kanda: str,
+    sarga: int,
+    start: int,
+    end: int,
+    stats: Optional[LookupStats] = None,
+    include_previews: bool = False
+) -> RangeVerification:
+    """
+    Verify every shloka in start..end of one sarga with a single lookup.
+    
+    Uses the local index when available, then the verification cache when
+    it holds every shloka of the range, otherwise one metadata-filtered
+    Pinecone query with `shloka: {"$gte": start, "$lte": end}` (top_k capped
+    at RANGE_QUERY_MAX_TOP_K). Query results (found and missing shlokas) are
+    written to the cache. Ranges longer than RANGE_QUERY_MAX_TOP_K skip the
+    cache entirely, so the work per range stays bounded.
+    """
+    if stats is None:
+        stats = LookupStats()
+    length = end - start + 1
+    
+    local = verify_range_local(kanda, sarga, start, end)
+    if local is not None:
+        stats.local_hits += length
+        return local
+    
+    verification = RangeVerification(kanda, sarga, start, end)
+    cache = get_verification_cache()
+    cacheable = cache is not None and length <= RANGE_QUERY_MAX_TOP_K
+    if cacheable:
+        cached = cache.get_many(format_shloka_id(kanda, sarga, shloka) for shloka in range(start, end + 1))
+        if len(cached) == length:
+            for shloka_id, entry in cached.items():
+                if entry.exists:
+                    verification.found[entry.shloka] = _from_cache(shloka_id, entry)
+            if include_previews:
+                load_previews(list(verification.found.values()), stats)
+            return verification
     
     try:
         index = get_pinecone_index()
-        
-        # First try: direct fetch by ID (most efficient)
-        # Pinecone IDs follow format: "bala-kanda-3-7"
-        fetch_result = index.fetch(ids=[shloka_id])
-        
-        if fetch_result.vectors and shloka_id in fetch_result.vectors:
-            vector_data = fetch_result.vectors[shloka_id]
-            metadata = vector_data.metadata or {}
-            
-            # Get text preview
-            text_preview = None
-            if "shloka_text" in metadata:
-                text = metadata["shloka_text"]
-                text_preview = text[:100] + "..." if len(text) > 100 else text
-            elif "explanation" in metadata:
-                text = metadata["explanation"]
-                text_preview = text[:100] + "..." if len(text) > 100 else text
-            
-            return VerificationResult(
-                exists=True,
-                shloka_id=shloka_id,
-                kanda=kanda,
-                sarga=sarga,
-                shloka=shloka,
-                text_preview=text_preview
-            )
-        
-        # Second try: metadata filter query (in case ID format differs)
-        # Use a dummy zero vector since we only care about metadata filtering
-        dummy_vector = [0.0] * EMBEDDING_DIMENSION
-        
-        # Map canonical kanda to display format for metadata match
-        kanda_display = kanda.replace("-", " ").title()  # "bala-kanda" → "Bala Kanda"
-        
+        stats.network_calls += 1
         query_result = index.query(
-            vector=dummy_vector,
-            top_k=1,
-            include_metadata=True,
+            vector=[0.0] * EMBEDDING_DIMENSION,
+            top_k=min(length, RANGE_QUERY_MAX_TOP_K),
+            include_values=False,
+            include_metadata=include_previews,
             filter={
-                "kanda": {"$eq": kanda_display},
+                "kanda": {"$eq": _display_kanda(kanda)},
                 "sarga": {"$eq": sarga},
-                "shloka": {"$eq": shloka}
+                "shloka": {"$gte": start, "$lte": end}
             }
         )
-        
-        if query_result.matches:
-            match = query_result.matches[0]
+        for match in query_result.matches or []:
             metadata = match.metadata or {}
-            
-            text_preview = None
-            if "shloka_text" in metadata:
-                text = metadata["shloka_text"]
-                text_preview = text[:100] + "..." if len(text) > 100 else text
-            
-            return VerificationResult(
-                exists=True,
-                shloka_id=match.id,
-                kanda=kanda,
-                sarga=sarga,
-                shloka=shloka,
-                text_preview=text_preview
-            )
-        
-        # Not found
-        return VerificationResult(
-            exists=False,
-            shloka_id=shloka_id,
-            kanda=kanda,
-            sarga=sarga,
-            shloka=shloka
-        )
-        
+            citation = _match_citation(match)
+            shloka = citation[2] if citation is not None and citation[:2] == (kanda, sarga) else -1
+            if start <= shloka <= end and shloka not in verification.found:
+                verification.found[shloka] = VerificationResult(
+                    exists=True,
+                    shloka_id=match.id,
+                    kanda=kanda,
+                    sarga=sarga,
+                    shloka=shloka,
+                    text_preview=_make_preview(metadata) if include_previews else None
+                )
     except Exception as e:
-        return VerificationResult(
-            exists=False,
-            shloka_id=shloka_id,
-            kanda=kanda,
-            sarga=sarga,
-            shloka=shloka,
-            error=str(e)
-        )
+        verification.error = str(e)
+    
+    # Per-citation path: one fetch per found shloka, fetch + query per missing one
+    stats.baseline_calls += 2 * length - len(verification.found)
+    
+    if cacheable and verification.error is None:
+        # top_k covers the whole range here, so unfound shlokas are known missing
+        cache.put_many({
+            format_shloka_id(kanda, sarga, shloka): _to_cache(verification.result(shloka))
+            for shloka in range(start, end + 1)
+        })
+    return verification
+
+
+def verify_citation_exists(
+    kanda: str,
+    sarga: int,
+    shloka: int,
+    use_local_index: bool = True,
+    include_previews: bool = False
+) -> VerificationResult:
+    """
+    Verify that a citation exists in Pinecone.
+    
+    Checks the local existence index first, then the persistent verification
+    cache; Pinecone is only queried when neither can answer. Pinecone lookups
+    use metadata filtering with a dummy vector (not semantic search) and
+    never return embedding values.
+    
+    Args:
+        kanda: Canonical kanda name (e.g., "bala-kanda")
+        sarga: Sarga number
+        shloka: Shloka number
+        use_local_index: Whether to consult the local existence index first
+        include_previews: Whether to load the text preview (lazily: local
+            store, cache, then a metadata query)
+    
+    Returns:
+        VerificationResult with exists=True/False and metadata if found.
+    """
+    shloka_id = f"{kanda}-{sarga}-{shloka}"
+    result = None
+    
+    if use_local_index:
+        result = verify_citation_local(kanda, sarga, shloka)
+    
+    cache = get_verification_cache()
+    if result is None and cache is not None:
+        cached = cache.get(shloka_id)
+        if cached is not None:
+            result = _from_cache(shloka_id, cached)
+    
+    if result is None:
+        result = _verify_query_chunk([(kanda, sarga, shloka)], LookupStats(), include_previews)[shloka_id]
+        if cache is not None and result.error is None:
+            cache.put(shloka_id, _to_cache(result))
+    elif include_previews:
+        # Local / cached results may have been stored without a preview
+        load_previews([result])
+    return result
+
+
+def _from_cache(shloka_id: str, cached: CachedVerification) -> VerificationResult:
+    return VerificationResult(
+        exists=cached.exists,
+        shloka_id=cached.shloka_id or shloka_id,
+        kanda=cached.kanda,
+        sarga=cached.sarga,
+        shloka=cached.shloka,
+        text_preview=cached.text_preview
+    )
+
+
+def _to_cache(result: VerificationResult) -> CachedVerification:
+    return CachedVerification(
+        exists=result.exists,
+        shloka_id=result.shloka_id,
+        kanda=result.kanda,
+        sarga=result.sarga,
+        shloka=result.shloka,
+        text_preview=result.text_preview
+    )
+
+
+def _chunked(items: List[Any], size: int):
+    """Yield successive chunks of at most `size` items."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
 def verify_citations_batch(
-    citations: List[tuple]
+    citations: List[tuple],
+    stats: Optional[LookupStats] = None,
+    include_previews: bool = False
 ) -> Dict[str, VerificationResult]:
     """
     Verify multiple citations in batch.
     
+    Duplicate citations are collapsed and resolved in chunks of
+    FETCH_BATCH_SIZE, each with one filtered query (an `$or` of one
+    `shloka: {"$in": [...]}` clause per (kanda, sarga)). Queries return IDs
+    only unless include_previews is set, in which case metadata (never
+    embedding values) comes back too.
+    
     Args:
         citations: List of (kanda, sarga, shloka) tuples
+        stats: Optional LookupStats to accumulate network call counts into
+        include_previews: Whether results should carry text previews
     
     Returns:
         Dict mapping shloka_id to VerificationResult
     """
+    if stats is None:
+        stats = LookupStats()
     results = {}
     
-    # Build list of IDs and try batch fetch first
-    shloka_ids = [f"{k}-{s}-{sh}" for k, s, sh in citations]
+    # Resolve what we can from the local existence index (no network);
+    # each citation's ID string is built once and reused below
+    pending = {}
+    for kanda, sarga, shloka in dict.fromkeys(citations):
+        local_result = verify_citation_local(kanda, sarga, shloka)
+        if local_result is not None:
+            results[local_result.shloka_id] = local_result
+            stats.local_hits += 1
+        else:
+            pending[format_shloka_id(kanda, sarga, shloka)] = (kanda, sarga, shloka)
+    
+    # Then the persistent cache (one SQLite query for the whole batch)
+    cache = get_verification_cache()
+    if cache is not None and pending:
+        cached = cache.get_many(pending)
+        for shloka_id, entry in cached.items():
+            results[shloka_id] = _from_cache(shloka_id, entry)
+            del pending[shloka_id]
+    pending = list(pending.values())
+    
+    fetched = {}
+    for chunk in _chunked(pending, FETCH_BATCH_SIZE):
+        fetched.update(_verify_query_chunk(chunk, stats, include_previews))
+    results.update(fetched)
+    
+    if cache is not None:
+        cache.put_many({
+            shloka_id: _to_cache(result)
+            for shloka_id, result in fetched.items() if result.error is None
+        })
+    
+    if include_previews:
+        # Cached / locally verified results may still lack a preview
+        load_previews([r for shloka_id, r in results.items() if shloka_id not in fetched], stats)
+    
+    return results
+
+
+def load_previews(results, stats: Optional[LookupStats] = None):
+    """
+    Fill in text_preview (in place) for existing citations that lack one.
+    
+    Previews come from the local corpus store when it has the shloka;
+    the rest cost one metadata-only query per FETCH_BATCH_SIZE citations.
+    Newly loaded previews are written back to the verification cache.
+    """
+    if stats is None:
+        stats = LookupStats()
+    store = get_shloka_store()
+    remote = []
+    for result in results:
+        if not result.exists or result.text_preview is not None:
+            continue
+        record = store.get(result.kanda, result.sarga, result.shloka) if store is not None else None
+        if record is not None:
+            result.text_preview = _make_preview({"shloka_text": record.text})
+        else:
+            remote.append(result)
+    
+    loaded = {}
+    for chunk in _chunked(remote, FETCH_BATCH_SIZE):
+        fetched = _verify_query_chunk([(r.kanda, r.sarga, r.shloka) for r in chunk], stats, True)
+        for result in chunk:
+            shloka_id = format_shloka_id(result.kanda, result.sarga, result.shloka)
+            match = fetched.get(shloka_id)
+            if match is not None and match.text_preview is not None:
+                result.text_preview = match.text_preview
+                loaded[shloka_id] = result
+    
+    cache = get_verification_cache()
+    if cache is not None and loaded:
+        cache.put_many({shloka_id: _to_cache(result) for shloka_id, result in loaded.items()})
+
+
+def _make_preview(metadata: Dict[str, Any]) -> Optional[str]:
+    """Build the 100-char text preview from vector metadata."""
+    return make_preview(metadata.get("shloka_text"))
+
+
+def _display_kanda(kanda: str) -> str:
+    """Canonical kanda to the display form stored in metadata ("bala-kanda" → "Bala Kanda")."""
+    return CANONICAL_TO_DISPLAY.get(kanda, kanda.replace("-", " ").title())
+
+
+def _match_citation(match) -> Optional[tuple]:
+    """(kanda, sarga, shloka) of a query match: from metadata when returned, else its ID."""
+    metadata = match.metadata or {}
+    if metadata:
+        kanda = normalize_kanda(str(metadata.get("kanda", "")))
+        try:
+            return (kanda, int(metadata["sarga"]), int(metadata["shloka"])) if kanda else None
+        except (KeyError, TypeError, ValueError):
+            pass
+    return parse_shloka_id(match.id)
+
+
+def _verify_query_chunk(
+    citations: List[tuple],
+    stats: LookupStats,
+    include_previews: bool = False
+) -> Dict[str, VerificationResult]:
+    """
+    Verify one chunk of citations with a single filtered query.
+    
+    Uses a dummy zero vector with one `shloka: {"$in": [...]}` clause per
+    (kanda, sarga), OR-ed together. Matching on metadata also catches vectors
+    whose ID format differs from the canonical one. Embedding values are
+    never requested; metadata only with include_previews.
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for kanda, sarga, shloka in citations:
+        groups.setdefault((kanda, sarga), []).append(shloka)
+    
+    clauses = [
+        {"kanda": {"$eq": _display_kanda(kanda)}, "sarga": {"$eq": sarga}, "shloka": {"$in": shlokas}}
+        for (kanda, sarga), shlokas in groups.items()
+    ]
+    found = {}
+    error = None
     
     try:
         index = get_pinecone_index()
-        fetch_result = index.fetch(ids=shloka_ids)
-        
-        for kanda, sarga, shloka in citations:
-            shloka_id = f"{kanda}-{sarga}-{shloka}"
-            
-            if fetch_result.vectors and shloka_id in fetch_result.vectors:
-                vector_data = fetch_result.vectors[shloka_id]
-                metadata = vector_data.metadata or {}
-                
-                text_preview = None
-                if "shloka_text" in metadata:
-                    text = metadata["shloka_text"]
-                    text_preview = text[:100] + "..." if len(text) > 100 else text
-                
-                results[shloka_id] = VerificationResult(
-                    exists=True,
-                    shloka_id=shloka_id,
-                    kanda=kanda,
-                    sarga=sarga,
-                    shloka=shloka,
-                    text_preview=text_preview
-                )
-            else:
-                # Fall back to individual verification for this one
-                results[shloka_id] = verify_citation_exists(kanda, sarga, shloka)
-    
+        stats.network_calls += 1
+        query_result = index.query(
+            vector=[0.0] * EMBEDDING_DIMENSION,
+            top_k=len(citations),
+            include_values=False,
+            include_metadata=include_previews,
+            filter=clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        )
+        for match in query_result.matches or []:
+            citation = _match_citation(match)
+            if citation is not None:
+                found.setdefault(citation, (match.id, match.metadata or {}))
     except Exception as e:
-        # If batch fails, fall back to individual verification
-        for kanda, sarga, shloka in citations:
-            result = verify_citation_exists(kanda, sarga, shloka)
-            results[result.shloka_id] = result
+        error = str(e)
+    
+    results = {}
+    for kanda, sarga, shloka in citations:
+        shloka_id = f"{kanda}-{sarga}-{shloka}"
+        if (kanda, sarga, shloka) in found:
+            match_id, metadata = found[(kanda, sarga, shloka)]
+            results[shloka_id] = VerificationResult(
+                exists=True,
+                shloka_id=match_id,
+                kanda=kanda,
+                sarga=sarga,
+                shloka=shloka,
+                text_preview=_make_preview(metadata) if include_previews else None
+            )
+        else:
+            results[shloka_id] = VerificationResult(
+                exists=False,
+                shloka_id=shloka_id,
+                kanda=kanda,
+                sarga=sarga,
+                shloka=shloka,
+                error=error
+            )
     
+    # Per-citation path: one fetch per citation, plus a query per missing one
+    stats.baseline_calls += 2 * len(citations) - len(found)
     return results
 
 
@@ -230,7 +557,7 @@ if __name__ == "__main__":
     ]
     
     for kanda, sarga, shloka in test_cases:
-        result = verify_citation_exists(kanda, sarga, shloka)
+        result = verify_citation_exists(kanda, sarga, shloka, include_previews=True)
         status = "✓ EXISTS" if result.exists else "✗ PHANTOM"
         print(f"\n{status}: {result.shloka_id}")
         if result.text_preview:
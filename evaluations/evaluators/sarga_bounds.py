@@ -0,0 +1,229 @@
+"""
+Sarga Bounds Table for Tattva Evaluation System
+Rejects citations that cannot exist (unknown kanda, sarga past the end of a
+kanda, shloka past the end of a sarga) before any index or Pinecone lookup.
+
+Two sources, most precise first:
+1. A built bounds file (SARGA_BOUNDS_PATH): shloka count of every sarga,
+   derived from the ingestion dataset or a Pinecone ID listing.
+2. The sarga catalogs shipped with the app (lib/data/sarga_titles.json,
+   lib/data/sarga_summaries.json): a sarga-count ceiling for the kandas they
+   list only. Shloka numbers are not bounded, and kandas missing from the
+   catalogs (Uttara Kanda) are left to the lookup. Sarga counts vary between
+   editions (the catalogs list 131 Yuddha sargas, others count 128), so the
+   catalog number is only used as an upper limit, never as proof of existence.
+
+Bounds are upper limits (the highest number seen), so an in-bounds citation
+still needs a lookup; only out-of-bounds ones are decided here.
+
+Usage:
+    python -m evaluations.evaluators.sarga_bounds build --from-dataset Valmiki_Ramayan_Dataset/data/Valmiki_Ramayan_Shlokas.json
+    python -m evaluations.evaluators.sarga_bounds build --from-pinecone
+    python -m evaluations.evaluators.sarga_bounds check bala-kanda-999-999
+"""
+
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .citation_extractor import normalize_kanda
+from .shloka_index import iter_dataset_citations, iter_pinecone_citations
+from .shloka_keys import parse_shloka_id
+
+# Bounds file configuration
+SARGA_BOUNDS_PATH = os.environ.get("SARGA_BOUNDS_PATH", "evaluations/data/sarga_bounds.json")
+SARGA_CATALOG_PATHS = ["lib/data/sarga_titles.json", "lib/data/sarga_summaries.json"]
+
+# Singleton loaded table
+_sarga_bounds: Optional["SargaBounds"] = None
+_sarga_bounds_loaded = False
+
+
+class SargaBounds:
+    """
+    Per-kanda sarga counts and (optionally) per-sarga shloka counts.
+
+    With shloka counts (a built bounds file) the table covers the whole
+    corpus, so unknown kandas and sargas are out of bounds. Without them
+    (catalog bounds) it only caps the sarga numbers of the kandas it lists.
+    """
+
+    def __init__(
+        self,
+        sarga_counts: Dict[str, int],
+        shloka_counts: Optional[Dict[Tuple[str, int], int]] = None,
+        source: str = "unknown"
+    ):
+        self.sarga_counts = sarga_counts
+        self.shloka_counts = shloka_counts
+        self.source = source
+
+    def out_of_bounds(self, kanda: str, sarga: int, shloka: int) -> Optional[str]:
+        """
+        Why a canonical citation cannot exist, or None if it may exist.
+        """
+        max_sarga = self.sarga_counts.get(kanda)
+        if max_sarga is None:
+            # Catalog bounds do not list every kanda: let the lookup decide
+            return f"{kanda} is not in the corpus" if self.shloka_counts is not None else None
+        if not 1 <= sarga <= max_sarga:
+            return f"{kanda} has {max_sarga} sargas"
+        if shloka < 1:
+            return "shloka numbers start at 1"
+        if self.shloka_counts is not None:
+            max_shloka = self.shloka_counts.get((kanda, sarga))
+            if max_shloka is None:
+                return f"{kanda} sarga {sarga} is not in the corpus"
+            if shloka > max_shloka:
+                return f"{kanda} sarga {sarga} has {max_shloka} shlokas"
+        return None
+
+    def clip_range(
+        self, kanda: str, sarga: int, start: int, end: int
+    ) -> Tuple[Optional[Tuple[int, int]], Optional[str]]:
+        """
+        In-bounds part of shlokas start..end of one sarga, and why the rest
+        cannot exist. The interval is None when nothing in the range can exist.
+        """
+        reason = self.out_of_bounds(kanda, sarga, max(start, 1))
+        if reason is not None:
+            return None, reason
+        low, high = max(start, 1), end
+        if start < 1:
+            reason = "shloka numbers start at 1"
+        max_shloka = self.shloka_counts.get((kanda, sarga)) if self.shloka_counts is not None else None
+        if max_shloka is not None and end > max_shloka:
+            high = max_shloka
+            reason = f"{kanda} sarga {sarga} has {max_shloka} shlokas"
+        return (low, high), reason
+
+    def to_json(self) -> Dict:
+        kandas: Dict[str, Dict[str, int]] = {kanda: {} for kanda in self.sarga_counts}
+        for (kanda, sarga), count in sorted((self.shloka_counts or {}).items()):
+            kandas[kanda][str(sarga)] = count
+        return {
+            "built_at": time.time(),
+            "source": self.source,
+            "sarga_counts": self.sarga_counts,
+            "shloka_counts": kandas,
+        }
+
+
+def build_bounds(citations: Iterable[Tuple[str, int, int]], source: str = "unknown") -> SargaBounds:
+    """Bounds table from every (kanda, sarga, shloka) in the corpus."""
+    sarga_counts: Dict[str, int] = {}
+    shloka_counts: Dict[Tuple[str, int], int] = {}
+    for kanda, sarga, shloka in citations:
+        sarga_counts[kanda] = max(sarga_counts.get(kanda, 0), sarga)
+        shloka_counts[(kanda, sarga)] = max(shloka_counts.get((kanda, sarga), 0), shloka)
+    return SargaBounds(sarga_counts, shloka_counts, source)
+
+
+def save_bounds(bounds: SargaBounds, path: str = SARGA_BOUNDS_PATH) -> int:
+    """Write a bounds file; returns the number of sargas written."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(bounds.to_json(), f, indent=1)
+    os.replace(tmp_path, path)
+    return len(bounds.shloka_counts or {})
+
+
+def load_bounds(path: str = SARGA_BOUNDS_PATH) -> SargaBounds:
+    """Load a bounds file written by save_bounds."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    shloka_counts = {
+        (kanda, int(sarga)): count
+        for kanda, sargas in data["shloka_counts"].items()
+        for sarga, count in sargas.items()
+    }
+    return SargaBounds(data["sarga_counts"], shloka_counts, data.get("source", path))
+
+
+def load_catalog_bounds(paths: List[str] = SARGA_CATALOG_PATHS) -> Optional[SargaBounds]:
+    """
+    Sarga-count ceilings from the app's sarga catalogs (kandas they list
+    only); None if none are readable.
+    """
+    sarga_counts: Dict[str, int] = {}
+    sources = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            continue
+        sources.append(path)
+        for entry in entries:
+            kanda = normalize_kanda(str(entry.get("kanda", "")))
+            if kanda and isinstance(entry.get("sarga"), int):
+                sarga_counts[kanda] = max(sarga_counts.get(kanda, 0), entry["sarga"])
+
+    if not sarga_counts:
+        return None
+    return SargaBounds(sarga_counts, None, ", ".join(sources))
+
+
+def get_sarga_bounds() -> Optional[SargaBounds]:
+    """
+    Get the bounds table: the built bounds file if present, else the sarga
+    catalogs. Returns None when neither is available (no pre-filtering).
+    """
+    global _sarga_bounds, _sarga_bounds_loaded
+
+    if _sarga_bounds_loaded:
+        return _sarga_bounds
+    _sarga_bounds_loaded = True
+
+    if os.path.exists(SARGA_BOUNDS_PATH):
+        try:
+            _sarga_bounds = load_bounds(SARGA_BOUNDS_PATH)
+            return _sarga_bounds
+        except (OSError, ValueError, KeyError) as e:
+            print(f"WARNING: Could not load sarga bounds {SARGA_BOUNDS_PATH}: {e}")
+
+    _sarga_bounds = load_catalog_bounds()
+    return _sarga_bounds
+
+
+# --- CLI ---
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or query the sarga bounds table.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the bounds file")
+    source_group = build_parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--from-pinecone", action="store_true", help="List all vector IDs from Pinecone")
+    source_group.add_argument("--from-dataset", type=str, help="Path to ingestion dataset or vectors JSON")
+    build_parser.add_argument("--output", "-o", type=str, default=SARGA_BOUNDS_PATH)
+
+    check_parser = subparsers.add_parser("check", help="Check shloka IDs against the bounds")
+    check_parser.add_argument("shloka_ids", nargs="+", help='e.g. "bala-kanda-999-999"')
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.from_pinecone:
+            from .pinecone_verifier import get_pinecone_index
+
+            bounds = build_bounds(iter_pinecone_citations(get_pinecone_index()), "pinecone")
+        else:
+            bounds = build_bounds(iter_dataset_citations(args.from_dataset), args.from_dataset)
+        count = save_bounds(bounds, args.output)
+        print(f"Wrote bounds for {count} sargas in {len(bounds.sarga_counts)} kandas to {args.output}")
+
+    elif args.command == "check":
+        bounds = get_sarga_bounds()
+        if bounds is None:
+            print("No sarga bounds available")
+        else:
+            print(f"Bounds source: {bounds.source}")
+            for shloka_id in args.shloka_ids:
+                parsed = parse_shloka_id(shloka_id)
+                reason = bounds.out_of_bounds(*parsed) if parsed else "not a shloka ID"
+                print(f"{shloka_id}: {'OUT OF BOUNDS (' + reason + ')' if reason else 'in bounds'}")
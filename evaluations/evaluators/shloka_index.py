@@ -0,0 +1,274 @@
+"""
+Local Shloka Existence Index for Tattva Evaluation System
+Answers "does this (kanda, sarga, shloka) exist?" without touching Pinecone.
+
+The index is a sorted array of packed integer keys stored in a small binary
+file (~4 bytes per shloka, ~95KB for the full corpus). It is built once from
+a Pinecone ID listing or from the ingestion dataset, and loaded into a set
+for O(1) membership checks.
+
+File layout:
+    b"TSHI" | uint8 format version | uint32 header length | JSON header | uint32[] keys
+
+Usage:
+    python -m evaluations.evaluators.shloka_index build --from-pinecone
+    python -m evaluations.evaluators.shloka_index build --from-dataset Valmiki_Ramayan_Dataset/data/Valmiki_Ramayan_Shlokas.json
+    python -m evaluations.evaluators.shloka_index info --check
+"""
+
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .citation_extractor import normalize_kanda
+from .shloka_keys import FIELD_MAX, key_range, np, pack_key, parse_shloka_id, require_numpy
+
+# Index file configuration
+SHLOKA_INDEX_PATH = os.environ.get("SHLOKA_INDEX_PATH", "evaluations/data/shloka_index.bin")
+SHLOKA_INDEX_MAX_AGE_DAYS = float(os.environ.get("SHLOKA_INDEX_MAX_AGE_DAYS", "30"))
+
+_MAGIC = b"TSHI"
+_FORMAT_VERSION = 1
+
+# Singleton loaded index
+_shloka_index: Optional["ShlokaIndex"] = None
+_shloka_index_loaded = False
+
+
+class ShlokaIndex:
+    """In-memory view of the on-disk existence index."""
+
+    def __init__(self, keys: Iterable[int], header: Dict[str, Any]):
+        self._keys = frozenset(keys)
+        self._sorted = array("I", sorted(self._keys))
+        self.header = header
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def contains(self, kanda: str, sarga: int, shloka: int) -> bool:
+        """Check whether a canonical citation exists in the corpus."""
+        key = pack_key(kanda, sarga, shloka)
+        return key is not None and key in self._keys
+
+    def contains_key(self, key: int) -> bool:
+        """Check a packed key (see shloka_keys.py)."""
+        return key in self._keys
+
+    def keys(self) -> "np.ndarray":
+        """All keys as a sorted uint32 array (a view, no copy)."""
+        require_numpy()
+        return np.asarray(self._sorted, dtype=np.uint32)
+
+    def contains_keys(self, keys) -> "np.ndarray":
+        """Vectorized existence check: boolean mask over an array of packed keys."""
+        return np.isin(np.asarray(keys, dtype=np.uint32), self.keys(), assume_unique=False)
+
+    def shlokas_in_range(self, kanda: str, sarga: int, start: int, end: int) -> List[int]:
+        """Shloka numbers in start..end of one sarga that exist (two bisects)."""
+        bounds = key_range(kanda, sarga, start, end)
+        if bounds is None:
+            return []
+        low = bisect_left(self._sorted, bounds[0])
+        high = bisect_right(self._sorted, bounds[1])
+        return [key & FIELD_MAX for key in self._sorted[low:high]]
+
+    def is_stale(self, max_age_days: Optional[float] = None) -> bool:
+        """
+        Check whether the index should no longer be trusted.
+
+        Stale when it was built for a different Pinecone index or is older
+        than max_age_days (defaults to SHLOKA_INDEX_MAX_AGE_DAYS).
+        """
+        expected_name = os.environ.get("PINECONE_INDEX_NAME", "tattva-shlokas")
+        if self.header.get("index_name") != expected_name:
+            return True
+        if max_age_days is None:
+            max_age_days = SHLOKA_INDEX_MAX_AGE_DAYS
+        age_seconds = time.time() - self.header.get("built_at", 0)
+        return age_seconds > max_age_days * 86400
+
+    def matches_pinecone(self, pinecone_index) -> bool:
+        """Compare the stored vector count against live Pinecone stats (one call)."""
+        stats = pinecone_index.describe_index_stats()
+        return stats.total_vector_count == self.header.get("vector_count")
+
+
+def save_index(
+    citations: Iterable[Tuple[str, int, int]],
+    path: str = SHLOKA_INDEX_PATH,
+    source: str = "unknown",
+    vector_count: Optional[int] = None
+) -> int:
+    """
+    Write an existence index file.
+
+    Args:
+        citations: Iterable of (canonical kanda, sarga, shloka) tuples
+        path: Output file path
+        source: Description of where the keys came from
+        vector_count: Pinecone vector count at build time (for staleness checks)
+
+    Returns:
+        Number of keys written.
+    """
+    keys = set()
+    for kanda, sarga, shloka in citations:
+        key = pack_key(kanda, sarga, shloka)
+        if key is not None:
+            keys.add(key)
+
+    packed = array("I", sorted(keys))
+    if sys.byteorder != "little":
+        packed.byteswap()
+
+    header = json.dumps({
+        "index_name": os.environ.get("PINECONE_INDEX_NAME", "tattva-shlokas"),
+        "built_at": time.time(),
+        "source": source,
+        "key_count": len(keys),
+        "vector_count": vector_count if vector_count is not None else len(keys),
+    }).encode("utf-8")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<BI", _FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(packed.tobytes())
+    os.replace(tmp_path, path)
+
+    return len(keys)
+
+
+def load_index(path: str = SHLOKA_INDEX_PATH) -> ShlokaIndex:
+    """Load an existence index file written by save_index."""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if data[:4] != _MAGIC:
+        raise ValueError(f"{path} is not a shloka index file")
+    version, header_len = struct.unpack_from("<BI", data, 4)
+    if version != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported shloka index format version: {version}")
+
+    header_start = 4 + struct.calcsize("<BI")
+    header = json.loads(data[header_start:header_start + header_len].decode("utf-8"))
+
+    keys = array("I")
+    keys.frombytes(data[header_start + header_len:])
+    if sys.byteorder != "little":
+        keys.byteswap()
+
+    return ShlokaIndex(keys, header)
+
+
+def get_shloka_index() -> Optional[ShlokaIndex]:
+    """
+    Get the local existence index if one is available and fresh.
+
+    Returns None when the file is missing, unreadable or stale, in which case
+    callers should fall back to Pinecone.
+    """
+    global _shloka_index, _shloka_index_loaded
+
+    if _shloka_index_loaded:
+        return _shloka_index
+    _shloka_index_loaded = True
+
+    if not os.path.exists(SHLOKA_INDEX_PATH):
+        return None
+
+    try:
+        index = load_index(SHLOKA_INDEX_PATH)
+    except (OSError, ValueError) as e:
+        print(f"WARNING: Could not load shloka index {SHLOKA_INDEX_PATH}: {e}")
+        return None
+
+    if index.is_stale():
+        print(f"WARNING: Shloka index {SHLOKA_INDEX_PATH} is stale, falling back to Pinecone")
+        return None
+
+    _shloka_index = index
+    return _shloka_index
+
+
+def iter_dataset_citations(dataset_path: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yield citations from an ingestion dataset or vectors export.
+
+    Accepts a JSON list whose records carry either an "id" in Pinecone format
+    or "kanda"/"sarga"/"shloka" fields (raw dataset, enhanced-shlokas.json).
+    """
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    for record in records:
+        if "id" in record:
+            parsed = parse_shloka_id(str(record["id"]))
+            if parsed:
+                yield parsed
+            continue
+
+        kanda = normalize_kanda(str(record.get("kanda", "")))
+        if kanda and record.get("sarga") is not None and record.get("shloka") is not None:
+            try:
+                yield kanda, int(record["sarga"]), int(record["shloka"])
+            except (TypeError, ValueError):
+                continue
+
+
+def iter_pinecone_citations(pinecone_index) -> Iterator[Tuple[str, int, int]]:
+    """Yield citations from a Pinecone ID listing (serverless `index.list`)."""
+    for id_page in pinecone_index.list():
+        for shloka_id in id_page:
+            parsed = parse_shloka_id(shloka_id)
+            if parsed:
+                yield parsed
+
+
+# --- CLI ---
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or inspect the local shloka existence index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the index")
+    source_group = build_parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--from-pinecone", action="store_true", help="List all vector IDs from Pinecone")
+    source_group.add_argument("--from-dataset", type=str, help="Path to ingestion dataset or vectors JSON")
+    build_parser.add_argument("--output", "-o", type=str, default=SHLOKA_INDEX_PATH)
+
+    info_parser = subparsers.add_parser("info", help="Show index metadata")
+    info_parser.add_argument("--path", type=str, default=SHLOKA_INDEX_PATH)
+    info_parser.add_argument("--check", action="store_true", help="Compare vector count against Pinecone")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if args.from_pinecone:
+            from .pinecone_verifier import get_pinecone_index
+
+            pc_index = get_pinecone_index()
+            total = pc_index.describe_index_stats().total_vector_count
+            count = save_index(iter_pinecone_citations(pc_index), args.output, "pinecone", total)
+        else:
+            count = save_index(iter_dataset_citations(args.from_dataset), args.output, args.from_dataset)
+        print(f"Wrote {count} shloka keys to {args.output}")
+
+    elif args.command == "info":
+        shloka_index = load_index(args.path)
+        print(json.dumps(shloka_index.header, indent=2))
+        print(f"Stale: {shloka_index.is_stale()}")
+        if args.check:
+            from .pinecone_verifier import get_pinecone_index
+
+            in_sync = shloka_index.matches_pinecone(get_pinecone_index())
+            print(f"Matches Pinecone vector count: {in_sync}")
@@ -0,0 +1,183 @@
+"""
+Packed Shloka Keys for Tattva Evaluation System
+Canonical integer encoding of shloka identity.
+
+A citation (kanda, sarga, shloka) packs into one uint32:
+
+    kanda number (3 bits) | sarga (10 bits) | shloka (10 bits)
+
+so "bala-kanda-3-7" is 1 << 20 | 3 << 10 | 7. Keys sort in corpus order
+(kanda, then sarga, then shloka), a sarga is a contiguous key range, and key
+0 is never valid (kanda numbers start at 1), which makes it the "invalid"
+marker in arrays.
+
+Scalar helpers work everywhere; the array helpers (pack_keys, ids_to_keys,
+...) need NumPy and turn bulk citation analytics into integer set operations
+(np.isin, np.unique, np.bincount) instead of string handling.
+
+Usage:
+    from evaluations.evaluators.shloka_keys import pack_key, key_to_id, ids_to_keys
+    key = pack_key("bala-kanda", 3, 7)       # 1051655
+    key_to_id(key)                           # "bala-kanda-3-7"
+    ids_to_keys(["bala-kanda-3-7", "x"])     # array([1051655, 0], dtype=uint32)
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+from .citation_extractor import KANDA_NORMALIZATION, normalize_kanda
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Canonical kanda -> kanda number ("bala-kanda" -> 1)
+KANDA_NUMBERS = {
+    canonical: int(key) for key, canonical in KANDA_NORMALIZATION.items() if key.isdigit()
+}
+KANDA_BY_NUMBER = {number: canonical for canonical, number in KANDA_NUMBERS.items()}
+
+# Bit layout: kanda (3 bits) | sarga (10 bits) | shloka (10 bits)
+SARGA_BITS = 10
+SHLOKA_BITS = 10
+FIELD_MAX = (1 << 10) - 1
+INVALID_KEY = 0
+
+
+def pack_key(kanda: str, sarga: int, shloka: int) -> Optional[int]:
+    """Pack a canonical citation into an integer key, or None if out of range."""
+    kanda_number = KANDA_NUMBERS.get(kanda)
+    if kanda_number is None:
+        return None
+    if not (0 <= sarga <= FIELD_MAX and 0 <= shloka <= FIELD_MAX):
+        return None
+    return (kanda_number << (SARGA_BITS + SHLOKA_BITS)) | (sarga << SHLOKA_BITS) | shloka
+
+
+def unpack_key(key: int) -> Tuple[str, int, int]:
+    """(canonical kanda, sarga, shloka) for a key produced by pack_key."""
+    return (
+        KANDA_BY_NUMBER[key >> (SARGA_BITS + SHLOKA_BITS)],
+        (key >> SHLOKA_BITS) & FIELD_MAX,
+        key & FIELD_MAX,
+    )
+
+
+def format_shloka_id(kanda: str, sarga: int, shloka: int) -> str:
+    """Pinecone vector ID for a canonical citation ("bala-kanda-3-7")."""
+    return f"{kanda}-{sarga}-{shloka}"
+
+
+def parse_shloka_id(shloka_id: str) -> Optional[Tuple[str, int, int]]:
+    """
+    Parse a Pinecone vector ID into (kanda, sarga, shloka).
+
+    Args:
+        shloka_id: Vector ID (e.g., "bala-kanda-3-7")
+
+    Returns:
+        (canonical kanda, sarga, shloka) or None if the ID is not a shloka ID.
+    """
+    parts = shloka_id.rsplit("-", 2)
+    if len(parts) != 3 or not parts[1].isdigit() or not parts[2].isdigit():
+        return None
+    kanda = normalize_kanda(parts[0])
+    if not kanda:
+        return None
+    return kanda, int(parts[1]), int(parts[2])
+
+
+def key_to_id(key: int) -> str:
+    """Pinecone vector ID for a packed key."""
+    return format_shloka_id(*unpack_key(key))
+
+
+def id_to_key(shloka_id: str) -> Optional[int]:
+    """Packed key for a vector ID, or None if it is not a (packable) shloka ID."""
+    parsed = parse_shloka_id(shloka_id)
+    return pack_key(*parsed) if parsed else None
+
+
+def key_range(kanda: str, sarga: int, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """Packed (low, high) keys for shlokas start..end of one sarga, clipped to the key space."""
+    start, end = max(start, 0), min(end, FIELD_MAX)
+    if start > end:
+        return None
+    low = pack_key(kanda, sarga, start)
+    return (low, low + (end - start)) if low is not None else None
+
+
+# --- NumPy array helpers ---
+
+def require_numpy():
+    """Raise ImportError when NumPy (needed by the array helpers) is missing."""
+    if np is None:
+        raise ImportError("numpy is required for shloka key arrays")
+
+
+def pack_keys(kandas, sargas, shlokas) -> "np.ndarray":
+    """
+    Vectorized pack_key.
+
+    Args:
+        kandas: Kanda numbers (1-7) or canonical kanda names
+        sargas, shlokas: Integer arrays of the same length
+
+    Returns:
+        uint32 array of keys; INVALID_KEY where a citation cannot be packed.
+    """
+    require_numpy()
+    kandas = np.asarray(kandas)
+    if kandas.dtype.kind in "OUS":
+        names, inverse = np.unique(kandas.astype(str), return_inverse=True)
+        numbers = np.array([KANDA_NUMBERS.get(name, 0) for name in names], dtype=np.int64)
+        kandas = numbers[inverse.reshape(-1)] if len(names) else np.zeros(0, dtype=np.int64)
+    kandas = kandas.astype(np.int64)
+    sargas = np.asarray(sargas, dtype=np.int64)
+    shlokas = np.asarray(shlokas, dtype=np.int64)
+
+    valid = (
+        (kandas >= 1) & (kandas <= max(KANDA_BY_NUMBER))
+        & (sargas >= 0) & (sargas <= FIELD_MAX)
+        & (shlokas >= 0) & (shlokas <= FIELD_MAX)
+    )
+    keys = (kandas << (SARGA_BITS + SHLOKA_BITS)) | (sargas << SHLOKA_BITS) | shlokas
+    return np.where(valid, keys, INVALID_KEY).astype(np.uint32)
+
+
+def unpack_keys(keys) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Vectorized unpack_key: (kanda numbers, sargas, shlokas) arrays."""
+    require_numpy()
+    keys = np.asarray(keys, dtype=np.uint32)
+    return (
+        keys >> (SARGA_BITS + SHLOKA_BITS),
+        (keys >> SHLOKA_BITS) & FIELD_MAX,
+        keys & FIELD_MAX,
+    )
+
+
+def ids_to_keys(shloka_ids: Iterable[str]) -> "np.ndarray":
+    """
+    Keys for many vector IDs; INVALID_KEY for IDs that do not parse.
+
+    Each distinct ID is parsed once, so repeated IDs (the common case across
+    runs) cost an array lookup rather than a string parse.
+    """
+    require_numpy()
+    ids = np.asarray(list(shloka_ids), dtype=str)
+    if ids.size == 0:
+        return np.zeros(0, dtype=np.uint32)
+    distinct, inverse = np.unique(ids, return_inverse=True)
+    table = np.array([id_to_key(i) or INVALID_KEY for i in distinct], dtype=np.uint32)
+    return table[inverse.reshape(-1)]
+
+
+def keys_to_ids(keys) -> List[str]:
+    """Vector IDs for many keys (each distinct key formatted once)."""
+    require_numpy()
+    keys = np.asarray(keys, dtype=np.uint32)
+    if keys.size == 0:
+        return []
+    distinct, inverse = np.unique(keys, return_inverse=True)
+    names = [key_to_id(int(k)) if k != INVALID_KEY else "" for k in distinct]
+    return [names[i] for i in inverse.reshape(-1)]
@@ -0,0 +1,320 @@
+"""
+Local Shloka Corpus Store for Tattva Evaluation System
+Offline, random-access shloka text / translation / explanation lookups.
+
+The store is a single binary file built once from the ingestion dataset
+(Valmiki_Ramayan_Shlokas.json or enhanced-shlokas.json). It is memory-mapped
+on first use, so opening it costs nothing up front and each lookup is a
+binary search over packed integer keys (see shloka_keys.py)
+plus one slice of the mapped file. No network, and results are reproducible
+for a given store file.
+
+File layout (little-endian, sections 4-byte aligned):
+    b"TSHS" | uint8 format version | uint32 header length | JSON header | padding
+    uint32 count | uint32[count] sorted keys
+    uint32[3 * count + 1] field offsets into the blob (text, translation, explanation per key)
+    UTF-8 blob
+
+Usage:
+    python -m evaluations.evaluators.shloka_store build --from-dataset Valmiki_Ramayan_Dataset/data/Valmiki_Ramayan_Shlokas.json
+    python -m evaluations.evaluators.shloka_store info
+    python -m evaluations.evaluators.shloka_store get sundara-kanda-54-30
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .citation_extractor import normalize_kanda
+from .shloka_keys import FIELD_MAX, key_range, np, pack_key, parse_shloka_id, require_numpy, unpack_key
+
+# Store file configuration
+SHLOKA_STORE_PATH = os.environ.get("SHLOKA_STORE_PATH", "evaluations/data/shloka_store.bin")
+
+_MAGIC = b"TSHS"
+_FORMAT_VERSION = 1
+_FIELDS = ("text", "translation", "explanation")
+
+# Singleton store
+_shloka_store: Optional["ShlokaStore"] = None
+_shloka_store_loaded = False
+
+
+@dataclass(frozen=True)
+class ShlokaRecord:
+    """One shloka from the local corpus."""
+    kanda: str          # Canonical form: "bala-kanda"
+    sarga: int
+    shloka: int
+    text: str           # Sanskrit shloka text
+    translation: str
+    explanation: str
+
+    @property
+    def shloka_id(self) -> str:
+        return f"{self.kanda}-{self.sarga}-{self.shloka}"
+
+
+def _align(offset: int) -> int:
+    return (offset + 3) & ~3
+
+
+def _uint32_view(buffer, start: int, count: int):
+    """uint32 sequence over buffer[start:]; zero-copy on little-endian hosts."""
+    if sys.byteorder == "little":
+        return memoryview(buffer)[start:start + 4 * count].cast("I")
+    values = array("I")
+    values.frombytes(buffer[start:start + 4 * count])
+    values.byteswap()
+    return values
+
+
+class ShlokaStore:
+    """Read-only, memory-mapped view of a store file written by save_store."""
+
+    def __init__(self, path: str = SHLOKA_STORE_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._map[:4] != _MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a shloka store file")
+        version, header_len = struct.unpack_from("<BI", self._map, 4)
+        if version != _FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported shloka store format version: {version}")
+
+        header_start = 4 + struct.calcsize("<BI")
+        self.header: Dict[str, Any] = json.loads(self._map[header_start:header_start + header_len].decode("utf-8"))
+
+        position = _align(header_start + header_len)
+        (self._count,) = struct.unpack_from("<I", self._map, position)
+        position += 4
+        self._keys = _uint32_view(self._map, position, self._count)
+        position += 4 * self._count
+        self._offsets = _uint32_view(self._map, position, 3 * self._count + 1)
+        self._blob_start = position + 4 * (3 * self._count + 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _position(self, kanda: str, sarga: int, shloka: int) -> Optional[int]:
+        key = pack_key(kanda, sarga, shloka)
+        if key is None:
+            return None
+        i = bisect_left(self._keys, key)
+        return i if i < self._count and self._keys[i] == key else None
+
+    def _field(self, i: int, field: int) -> str:
+        start = self._offsets[3 * i + field]
+        end = self._offsets[3 * i + field + 1]
+        return self._map[self._blob_start + start:self._blob_start + end].decode("utf-8")
+
+    def contains(self, kanda: str, sarga: int, shloka: int) -> bool:
+        return self._position(kanda, sarga, shloka) is not None
+
+    def shlokas_in_range(self, kanda: str, sarga: int, start: int, end: int) -> List[int]:
+        """Shloka numbers in start..end of one sarga that are in the corpus."""
+        bounds = key_range(kanda, sarga, start, end)
+        if bounds is None:
+            return []
+        low = bisect_left(self._keys, bounds[0])
+        high = bisect_right(self._keys, bounds[1])
+        return [self._keys[i] & FIELD_MAX for i in range(low, high)]
+
+    def get(self, kanda: str, sarga: int, shloka: int) -> Optional[ShlokaRecord]:
+        """Look up one canonical citation; None if it is not in the corpus."""
+        i = self._position(kanda, sarga, shloka)
+        if i is None:
+            return None
+        return ShlokaRecord(kanda, sarga, shloka, *(self._field(i, f) for f in range(len(_FIELDS))))
+
+    def get_key(self, key: int) -> Optional[ShlokaRecord]:
+        """Look up a packed key (see shloka_keys.py)."""
+        return self.get(*unpack_key(key))
+
+    def keys(self) -> "np.ndarray":
+        """All keys as a sorted uint32 array, backed by the mapped file."""
+        require_numpy()
+        return np.asarray(self._keys, dtype=np.uint32)
+
+    def get_id(self, shloka_id: str) -> Optional[ShlokaRecord]:
+        """Look up a Pinecone-style ID ("sundara-kanda-54-30")."""
+        parsed = parse_shloka_id(shloka_id)
+        return self.get(*parsed) if parsed else None
+
+    def translation(self, kanda: str, sarga: int, shloka: int) -> Optional[str]:
+        """English text for entailment checks: translation, else the shloka text."""
+        i = self._position(kanda, sarga, shloka)
+        if i is None:
+            return None
+        return self._field(i, 1) or self._field(i, 0) or None
+
+    def __iter__(self) -> Iterator[ShlokaRecord]:
+        for i in range(self._count):
+            kanda, sarga, shloka = unpack_key(self._keys[i])
+            yield ShlokaRecord(kanda, sarga, shloka, *(self._field(i, f) for f in range(len(_FIELDS))))
+
+    def close(self):
+        # Release the memoryviews before the map they point into
+        self._keys = self._offsets = None
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+
+def save_store(
+    records: Iterable[Tuple[str, int, int, str, str, str]],
+    path: str = SHLOKA_STORE_PATH,
+    source: str = "unknown"
+) -> int:
+    """
+    Write a store file.
+
+    Args:
+        records: (canonical kanda, sarga, shloka, text, translation, explanation) tuples;
+            later duplicates of the same citation replace earlier ones
+        path: Output file path
+        source: Description of where the records came from
+
+    Returns:
+        Number of shlokas written.
+    """
+    by_key = {}
+    for kanda, sarga, shloka, *fields in records:
+        key = pack_key(kanda, sarga, shloka)
+        if key is not None:
+            by_key[key] = [(value or "").encode("utf-8") for value in fields]
+
+    keys = array("I", sorted(by_key))
+    offsets = array("I", [0])
+    blob = bytearray()
+    for key in keys:
+        for value in by_key[key]:
+            blob += value
+            offsets.append(len(blob))
+    if sys.byteorder != "little":
+        keys.byteswap()
+        offsets.byteswap()
+
+    header = json.dumps({
+        "built_at": time.time(),
+        "source": source,
+        "count": len(keys),
+        "fields": list(_FIELDS),
+    }).encode("utf-8")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(struct.pack("<BI", _FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * (_align(f.tell()) - f.tell()))
+        f.write(struct.pack("<I", len(keys)))
+        f.write(keys.tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+    return len(keys)
+
+
+def iter_dataset_records(dataset_path: str) -> Iterator[Tuple[str, int, int, str, str, str]]:
+    """
+    Yield store records from an ingestion dataset (raw or enhanced-shlokas.json).
+
+    Records carry "kanda"/"sarga"/"shloka" fields (or a Pinecone-style "id")
+    plus "shloka_text", "translation" and "explanation"; vectors exports with
+    the same fields under "metadata" are accepted too.
+    """
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+
+    for record in records:
+        fields = record.get("metadata") or record
+        if "id" in record:
+            parsed = parse_shloka_id(str(record["id"]))
+        else:
+            kanda = normalize_kanda(str(fields.get("kanda", "")))
+            try:
+                parsed = (kanda, int(fields["sarga"]), int(fields["shloka"])) if kanda else None
+            except (KeyError, TypeError, ValueError):
+                parsed = None
+        if parsed:
+            yield (*parsed, fields.get("shloka_text") or "", fields.get("translation") or "",
+                   fields.get("explanation") or "")
+
+
+def get_shloka_store() -> Optional[ShlokaStore]:
+    """
+    Get the local corpus store, opened lazily on first use.
+
+    Returns None when the file is missing or unreadable.
+    """
+    global _shloka_store, _shloka_store_loaded
+
+    if _shloka_store_loaded:
+        return _shloka_store
+    _shloka_store_loaded = True
+
+    if not os.path.exists(SHLOKA_STORE_PATH):
+        return None
+
+    try:
+        _shloka_store = ShlokaStore(SHLOKA_STORE_PATH)
+    except (OSError, ValueError) as e:
+        print(f"WARNING: Could not open shloka store {SHLOKA_STORE_PATH}: {e}")
+        return None
+
+    return _shloka_store
+
+
+def lookup_translation(kanda: str, sarga: int, shloka: int) -> Optional[str]:
+    """Translation (or shloka text) from the local store; None if unavailable."""
+    store = get_shloka_store()
+    return store.translation(kanda, sarga, shloka) if store is not None else None
+
+
+# --- CLI ---
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or query the local shloka corpus store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the store")
+    build_parser.add_argument("--from-dataset", type=str, required=True, help="Path to ingestion dataset JSON")
+    build_parser.add_argument("--output", "-o", type=str, default=SHLOKA_STORE_PATH)
+
+    info_parser = subparsers.add_parser("info", help="Show store metadata")
+    info_parser.add_argument("--path", type=str, default=SHLOKA_STORE_PATH)
+
+    get_parser = subparsers.add_parser("get", help="Print one shloka")
+    get_parser.add_argument("shloka_id", type=str, help='e.g. "sundara-kanda-54-30"')
+    get_parser.add_argument("--path", type=str, default=SHLOKA_STORE_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        count = save_store(iter_dataset_records(args.from_dataset), args.output, args.from_dataset)
+        print(f"Wrote {count} shlokas to {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+    elif args.command == "info":
+        store = ShlokaStore(args.path)
+        print(json.dumps(store.header, indent=2))
+
+    elif args.command == "get":
+        record = ShlokaStore(args.path).get_id(args.shloka_id)
+        if record is None:
+            print(f"{args.shloka_id}: not found")
+        else:
+            print(json.dumps(record.__dict__, indent=2, ensure_ascii=False))
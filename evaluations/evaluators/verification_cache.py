@@ -0,0 +1,242 @@
+"""
+Verification Result Cache for Tattva Evaluation System
+Disk-backed (SQLite) cache of citation verification results, shared by both
+Pinecone verifiers.
+
+Whether a shloka exists only changes when Pinecone is re-ingested, so results
+are cached per shloka ID with:
+- a TTL (VERIFICATION_CACHE_TTL_DAYS)
+- an index-version stamp (VERIFICATION_CACHE_INDEX_VERSION); entries written
+  under a different version are treated as misses, so bumping the version
+  after `scripts/upload-to-pinecone.ts` invalidates everything at once
+- hit/miss counters for reporting
+
+Only successful lookups are cached; errors are always retried.
+
+Keys are shloka IDs ("bala-kanda-3-7"); packed integer keys (see
+shloka_keys.py) are accepted too and stored under their ID.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Union
+
+from .shloka_keys import key_to_id
+
+# A shloka ID or a packed shloka key
+CacheKey = Union[str, int]
+
+# Cache configuration (set VERIFICATION_CACHE_PATH="" to disable caching)
+VERIFICATION_CACHE_PATH = os.environ.get(
+    "VERIFICATION_CACHE_PATH", ".cache/verification_cache.sqlite"
+)
+VERIFICATION_CACHE_TTL_DAYS = float(os.environ.get("VERIFICATION_CACHE_TTL_DAYS", "30"))
+VERIFICATION_CACHE_INDEX_VERSION = os.environ.get(
+    "VERIFICATION_CACHE_INDEX_VERSION",
+    os.environ.get("PINECONE_INDEX_NAME", "tattva-shlokas")
+)
+
+# Characters of shloka text kept as a preview
+PREVIEW_CHARS = 100
+
+# Singleton cache
+_verification_cache: Optional["VerificationCache"] = None
+
+
+def make_preview(text: Optional[str]) -> Optional[str]:
+    """Build the text preview shared by both verifiers ("..." only when truncated)."""
+    if not text:
+        return None
+    return text[:PREVIEW_CHARS] + "..." if len(text) > PREVIEW_CHARS else text
+
+
+@dataclass
+class CachedVerification:
+    """A cached verification result for one requested shloka ID."""
+    exists: bool
+    shloka_id: Optional[str]  # Resolved Pinecone ID (may differ from the requested one)
+    kanda: str
+    sarga: int
+    shloka: int
+    text_preview: Optional[str] = None
+
+
+class VerificationCache:
+    """SQLite-backed verification cache keyed by requested shloka ID."""
+
+    def __init__(
+        self,
+        path: str = VERIFICATION_CACHE_PATH,
+        ttl_days: float = VERIFICATION_CACHE_TTL_DAYS,
+        index_version: str = VERIFICATION_CACHE_INDEX_VERSION
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        self.index_version = index_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS verification_results (
+                key TEXT PRIMARY KEY,
+                exists_flag INTEGER NOT NULL,
+                shloka_id TEXT,
+                kanda TEXT NOT NULL,
+                sarga INTEGER NOT NULL,
+                shloka INTEGER NOT NULL,
+                text_preview TEXT,
+                index_version TEXT NOT NULL,
+                cached_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[CacheKey]) -> Dict[CacheKey, CachedVerification]:
+        """
+        Look up many shloka IDs (or packed keys) in one query.
+
+        Returns:
+            Dict of key (as passed in) -> CachedVerification for fresh entries only.
+        """
+        requested = {}
+        for key in keys:
+            requested.setdefault(key_to_id(key) if isinstance(key, int) else key, key)
+        keys = list(requested)
+        if not keys:
+            return {}
+
+        found = {}
+        min_cached_at = time.time() - self.ttl_seconds
+
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, exists_flag, shloka_id, kanda, sarga, shloka, text_preview "
+                    f"FROM verification_results "
+                    f"WHERE key IN ({placeholders}) AND index_version = ? AND cached_at >= ?",
+                    [*chunk, self.index_version, min_cached_at]
+                ).fetchall()
+                for key, exists_flag, shloka_id, kanda, sarga, shloka, text_preview in rows:
+                    found[requested[key]] = CachedVerification(
+                        exists=bool(exists_flag),
+                        shloka_id=shloka_id,
+                        kanda=kanda,
+                        sarga=sarga,
+                        shloka=shloka,
+                        text_preview=text_preview
+                    )
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def get(self, key: CacheKey) -> Optional[CachedVerification]:
+        """Look up a single shloka ID (or packed key)."""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, entries: Dict[CacheKey, CachedVerification]):
+        """Store results keyed by requested shloka ID or packed key (one transaction)."""
+        if not entries:
+            return
+
+        now = time.time()
+        rows = [
+            (key_to_id(key) if isinstance(key, int) else key, int(e.exists), e.shloka_id, e.kanda, e.sarga, e.shloka,
+             e.text_preview, self.index_version, now)
+            for key, e in entries.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO verification_results "
+                "(key, exists_flag, shloka_id, kanda, sarga, shloka, text_preview, index_version, cached_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def put(self, key: CacheKey, entry: CachedVerification):
+        """Store a single result."""
+        self.put_many({key: entry})
+
+    def invalidate(self, keep_current_version: bool = True) -> int:
+        """
+        Delete cached entries in bulk.
+
+        Args:
+            keep_current_version: If True, only delete entries written under
+                other index versions; if False, clear the whole cache.
+
+        Returns:
+            Number of rows deleted.
+        """
+        with self._lock:
+            if keep_current_version:
+                cursor = self._conn.execute(
+                    "DELETE FROM verification_results WHERE index_version != ?",
+                    (self.index_version,)
+                )
+            else:
+                cursor = self._conn.execute("DELETE FROM verification_results")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "index_version": self.index_version,
+        }
+
+
+def get_verification_cache() -> Optional[VerificationCache]:
+    """Get the shared cache, or None if caching is disabled or unavailable."""
+    global _verification_cache
+
+    if _verification_cache is not None:
+        return _verification_cache
+    if not VERIFICATION_CACHE_PATH:
+        return None
+
+    try:
+        _verification_cache = VerificationCache()
+    except sqlite3.Error as e:
+        print(f"WARNING: Verification cache unavailable ({VERIFICATION_CACHE_PATH}): {e}")
+        return None
+
+    return _verification_cache
+
+
+# --- CLI ---
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the verification cache.")
+    parser.add_argument("--invalidate-stale-versions", action="store_true",
+                        help="Delete entries written under other index versions")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached entry")
+    args = parser.parse_args()
+
+    cache = VerificationCache()
+    if args.clear:
+        print(f"Deleted {cache.invalidate(keep_current_version=False)} entries")
+    elif args.invalidate_stale_versions:
+        print(f"Deleted {cache.invalidate()} entries")
+
+    count = cache._conn.execute("SELECT COUNT(*) FROM verification_results").fetchone()[0]
+    print(json.dumps({"path": cache.path, "entries": count, **cache.stats()}, indent=2))
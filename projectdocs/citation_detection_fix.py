@@ -22,71 +22,35 @@ Author: Tattva Evaluation System
 Date: December 20, 2025
 """
 
-import re
 import json
+import os
+import sys
 from typing import List, Dict, Tuple
 
-# ============================================================================
-# IMPROVED CITATION DETECTION PATTERNS
-# ============================================================================
-
-# Kanda names (all 7 kandas of Valmiki Ramayana)
-KANDA_NAMES = r'(?:Bala|Ayodhya|Aranya|Kishkindha|Sundara|Yuddha|Uttara)'
-
-# Main citation pattern - handles most cases including ranges
-# This pattern matches: [Kanda-Name Sarga.Shloka] or [Kanda Name Sarga.Shloka]
-# Also handles shloka ranges like 14.33-35 or 127.11-12
-CITATION_PATTERN = (
-    r'\[' +                           # Opening bracket
-    KANDA_NAMES +                     # Kanda name
-    r'[\s\-]?' +                      # Optional space or hyphen
-    r'Kanda' +                        # Literal "Kanda"
-    r'[\s\-]?' +                      # Optional space or hyphen
-    r'\d+' +                          # Sarga number
-    r'[\.\-\s]' +                     # Dot, hyphen, or space separator
-    r'\d+' +                          # First shloka number
-    r'(?:[\-,\s]*\d+)*' +             # Optional additional shlokas (ranges or lists)
-    r'\]'                             # Closing bracket
-)
-
-# Compiled regex for better performance
-CITATION_REGEX = re.compile(CITATION_PATTERN, re.IGNORECASE)
+# Shared single-pass scanner lives in evaluations/evaluators (repo root on path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Alternative pattern for semicolon-separated citations in single brackets
-# e.g., [Sundara Kanda 35.7; Bala Kanda 1.27]
-MULTI_CITATION_PATTERN = (
-    r'\[' +
-    r'[^\]]+' +                       # Any content inside brackets
-    KANDA_NAMES +                     # Must contain at least one Kanda name
-    r'[^\]]+' +                       # More content
-    r'\]'
-)
-MULTI_CITATION_REGEX = re.compile(MULTI_CITATION_PATTERN, re.IGNORECASE)
+from evaluations.evaluators.citation_scanner import citation_brackets
 
+# ============================================================================
+# CITATION DETECTION
+# ============================================================================
 
 def extract_citations(text: str) -> List[str]:
     """
-    Extract all citations from text using improved regex patterns.
+    Extract all inline (bracketed) citations from text.
+    
+    Uses the shared precompiled scanner, which handles hyphen/space variants,
+    ranges, comma lists and semicolon multi-citations in a single pass.
     
     Args:
         text: The answer text to search for citations
         
     Returns:
-        List of citation strings found
+        List of bracketed citation groups found, as written
+        (e.g. "[Ayodhya Kanda 26.1-2, 64.72]")
     """
-    # First, try the main pattern
-    citations = CITATION_REGEX.findall(text)
-    
-    # If no citations found, check for multi-citation brackets
-    if not citations:
-        # Look for brackets containing Kanda names
-        bracket_contents = re.findall(r'\[([^\]]+)\]', text)
-        for content in bracket_contents:
-            # Check if this bracket contains a Kanda reference
-            if re.search(KANDA_NAMES, content, re.IGNORECASE):
-                citations.append(f'[{content}]')
-    
-    return citations
+    return citation_brackets(text)
 
 
 def has_inline_citations(text: str) -> bool:
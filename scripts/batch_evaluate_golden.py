@@ -4,52 +4,50 @@ Batch Evaluation: Generate Fresh Responses for Golden Dataset
 ==============================================================
 Runs all 60 golden dataset questions through the Tattva API with both
 OpenAI and Claude providers. Saves responses for Gemini evaluation.
+
+Both providers are called concurrently for each question, and several
+questions run at once. Each provider has its own thread pool (its
+concurrency cap) sharing one pooled HTTP session, so a run is bounded by the
+slowest provider rather than the sum of all calls. Completed questions are
+streamed to a .jsonl file as they finish.
 """
 
 import requests
 import json
 import csv
-import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import os
+import sys
 import argparse
+from requests.adapters import HTTPAdapter
 
 # Configuration
 API_URL = "http://localhost:3000/api/answer"
 GOLDEN_DATASET_PATH = "projectdocs/golden_dataset.csv"
 OUTPUT_DIR = "projectupdates"
 TIMESTAMP = datetime.now().strftime('%Y_%m_%d_%H%M')
+REQUEST_TIMEOUT = 180  # 3 min timeout for complex questions
+
+# Max in-flight API calls per provider
+PROVIDER_CONCURRENCY = {
+    'openai': 4,
+    'anthropic': 4,
+}
 
-# Citation regex pattern - improved to handle:
+# Shared single-pass citation scanner (repo root on path). Handles:
 # - [Bala-Kanda X.Y] and [Bala Kanda X.Y] (hyphen/space format)
 # - [Aranya Kanda 14.33-35] (shloka ranges)
 # - [Ayodhya Kanda 26.1-2, 64.72] (comma-separated)
-KANDA_NAMES = r'(?:Bala|Ayodhya|Aranya|Kishkindha|Sundara|Yuddha|Uttara)'
-CITATION_PATTERN = (
-    r'\[' +                           # Opening bracket
-    KANDA_NAMES +                     # Kanda name
-    r'[\s\-]?' +                       # Optional space or hyphen
-    r'Kanda' +                        # Literal "Kanda"
-    r'[\s\-]?' +                       # Optional space or hyphen
-    r'\d+' +                          # Sarga number
-    r'[\.\-\s]' +                     # Dot, hyphen, or space separator
-    r'\d+' +                          # First shloka number
-    r'(?:[\-,\s]*\d+)*' +             # Optional additional shlokas (ranges or lists)
-    r'\]'                             # Closing bracket
-)
-CITATION_REGEX = re.compile(CITATION_PATTERN, re.IGNORECASE)
+# - [Sundara Kanda 35.7; Bala Kanda 1.27] (semicolon-separated)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluations.evaluators.citation_scanner import citation_brackets
 
 def extract_citations(text: str) -> list:
-    """Extract all citations from text using improved regex patterns."""
-    citations = CITATION_REGEX.findall(text)
-    # Fallback: check for brackets containing Kanda names
-    if not citations:
-        bracket_contents = re.findall(r'\[([^\]]+)\]', text)
-        for content in bracket_contents:
-            if re.search(KANDA_NAMES, content, re.IGNORECASE):
-                citations.append(f'[{content}]')
-    return citations
+    """Extract all inline (bracketed) citations from text."""
+    return citation_brackets(text)
 
 
 def load_golden_dataset():
@@ -66,10 +64,20 @@ def load_golden_dataset():
     print(f"Loaded {len(questions)} questions from golden dataset")
     return questions
 
-def call_api(question: str, provider: str = 'openai') -> dict:
+def make_session(pool_size: int) -> requests.Session:
+    """Pooled HTTP session shared by all worker threads (keep-alive connections)."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Content-Type": "application/json"})
+    return session
+
+def call_api(question: str, provider: str = 'openai', session: requests.Session = None,
+             timeout: float = REQUEST_TIMEOUT) -> dict:
     """Call the Tattva API with a question."""
     try:
-        response = requests.post(
+        response = (session or requests).post(
             API_URL,
             json={
                 "question": question,
@@ -77,7 +85,7 @@ def call_api(question: str, provider: str = 'openai') -> dict:
                 "stream": False
             },
             headers={"Content-Type": "application/json"},
-            timeout=180  # 3 min timeout for complex questions
+            timeout=timeout
         )
         response.raise_for_status()
         return response.json()
@@ -131,11 +139,22 @@ def extract_answer_info(trace: dict, provider: str) -> dict:
         'full_response': full_response,  # Store for Gemini evaluation
     }
 
+def timed_call(question: str, provider: str, session: requests.Session, timeout: float):
+    """Run call_api and return (trace, elapsed seconds)."""
+    start = time.time()
+    trace = call_api(question, provider, session, timeout)
+    return trace, time.time() - start
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int, help="Limit number of questions")
     parser.add_argument("--index", type=int, help="Run specific index (1-based)")
     parser.add_argument("--sample", type=int, help="Run a random sample of N questions")
+    parser.add_argument("--openai-concurrency", type=int, default=PROVIDER_CONCURRENCY['openai'],
+                        help="Max in-flight OpenAI calls")
+    parser.add_argument("--anthropic-concurrency", type=int, default=PROVIDER_CONCURRENCY['anthropic'],
+                        help="Max in-flight Anthropic calls")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Per-request timeout in seconds")
     args = parser.parse_args()
 
     print("=" * 70)
@@ -179,69 +198,88 @@ def main():
     openai_total_applicable = 0
     claude_total_applicable = 0
     
-    # Process each question
+    # Stream completed questions to disk as they finish
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    stream_path = f"{OUTPUT_DIR}/golden_responses_AFTER_FIX_{TIMESTAMP}.jsonl"
+    
+    limits = {'openai': args.openai_concurrency, 'anthropic': args.anthropic_concurrency}
+    session = make_session(sum(limits.values()))
+    pools = {provider: ThreadPoolExecutor(max_workers=n, thread_name_prefix=provider) for provider, n in limits.items()}
+    
+    print(f"Running {len(questions)} questions: OpenAI x{limits['openai']}, Anthropic x{limits['anthropic']} in flight")
+    run_start = time.time()
+    
+    # Fan out: every question goes to both providers' pools at once
+    pending = {}  # question number -> {provider: result}
+    futures = {}
     for i, q in enumerate(questions, 1):
-        # Restore original index if filtering
-        idx = q.get('original_index', i) if args.index else i
-        
-        question = q['user_query']
-        expected_template = q['expected_template']
-        
-        print(f"\n[{i}/60] {question[:60]}...")
-        print(f"  Expected template: {expected_template}")
-        
-        # Call OpenAI
-        print(f"  Calling OpenAI...", end=" ", flush=True)
-        start = time.time()
-        openai_trace = call_api(question, 'openai')
-        openai_time = time.time() - start
-        openai_info = extract_answer_info(openai_trace, 'openai')
-        print(f"Done ({openai_time:.1f}s) - {openai_info['citation_count']} citations")
-        
-        # Minimal delay between providers (0.5s)
-        time.sleep(0.5)
-        
-        # 2. Claude
-        print(f"  Calling Claude...", end=" ", flush=True)
-        start = time.time()
-        claude_trace = call_api(question, 'anthropic')
-        claude_time = time.time() - start
-        claude_info = extract_answer_info(claude_trace, 'claude')
-        print(f"Done ({claude_time:.1f}s) - {claude_info['citation_count']} citations")
-        
-        # Track citation stats (excluding T3)
-        if expected_template != 'T3':
-            openai_total_applicable += 1
-            claude_total_applicable += 1
-            if openai_info['has_inline_citations']:
-                openai_citation_pass += 1
-            if claude_info['has_inline_citations']:
-                claude_citation_pass += 1
-        
-        # Store result
-        result = {
-            'index': i,
-            'user_query': question,
-            'classification': q['classification'],
-            'expected_template': expected_template,
-            'openai': openai_info,
-            'claude': claude_info,
-            'openai_trace': openai_trace,
-            'claude_trace': claude_trace,
-        }
-        all_results.append(result)
-        
-        # Minimal delay between questions (0.5s)
-        time.sleep(0.5)
-        
-        # Progress update every 10 questions
-        if i % 10 == 0:
-            curr_openai_rate = openai_citation_pass / openai_total_applicable * 100 if openai_total_applicable > 0 else 0
-            curr_claude_rate = claude_citation_pass / claude_total_applicable * 100 if claude_total_applicable > 0 else 0
-            print(f"\n  --- Progress: {i}/60 | OpenAI citations: {curr_openai_rate:.1f}% | Claude citations: {curr_claude_rate:.1f}% ---\n")
+        pending[i] = {}
+        for provider in limits:
+            future = pools[provider].submit(timed_call, q['user_query'], provider, session, args.timeout)
+            futures[future] = (i, provider)
+    
+    with open(stream_path, 'w', encoding='utf-8') as stream:
+        completed = 0
+        for future in as_completed(futures):
+            i, provider = futures[future]
+            pending[i][provider] = future.result()
+            if len(pending[i]) < len(limits):
+                continue
+            
+            # Both providers answered this question
+            q = questions[i - 1]
+            question = q['user_query']
+            expected_template = q['expected_template']
+            openai_trace, openai_time = pending[i].pop('openai')
+            claude_trace, claude_time = pending[i].pop('anthropic')
+            openai_info = extract_answer_info(openai_trace, 'openai')
+            claude_info = extract_answer_info(claude_trace, 'claude')
+            
+            completed += 1
+            print(f"\n[{completed}/{len(questions)}] (Q{i}) {question[:60]}...")
+            print(f"  Expected template: {expected_template}")
+            print(f"  OpenAI: {openai_time:.1f}s - {openai_info['citation_count']} citations | "
+                  f"Claude: {claude_time:.1f}s - {claude_info['citation_count']} citations")
+            
+            # Track citation stats (excluding T3)
+            if expected_template != 'T3':
+                openai_total_applicable += 1
+                claude_total_applicable += 1
+                if openai_info['has_inline_citations']:
+                    openai_citation_pass += 1
+                if claude_info['has_inline_citations']:
+                    claude_citation_pass += 1
+            
+            # Store result
+            result = {
+                'index': i,
+                'user_query': question,
+                'classification': q['classification'],
+                'expected_template': expected_template,
+                'openai': openai_info,
+                'claude': claude_info,
+                'openai_trace': openai_trace,
+                'claude_trace': claude_trace,
+            }
+            all_results.append(result)
+            stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+            stream.flush()
+            
+            # Progress update every 10 questions
+            if completed % 10 == 0:
+                curr_openai_rate = openai_citation_pass / openai_total_applicable * 100 if openai_total_applicable > 0 else 0
+                curr_claude_rate = claude_citation_pass / claude_total_applicable * 100 if claude_total_applicable > 0 else 0
+                print(f"\n  --- Progress: {completed}/{len(questions)} | OpenAI citations: {curr_openai_rate:.1f}% | Claude citations: {curr_claude_rate:.1f}% ---\n")
+    
+    for pool in pools.values():
+        pool.shutdown()
+    session.close()
+    print(f"\nAll calls finished in {time.time() - run_start:.1f}s (streamed to {stream_path})")
+    
+    # Keep the final JSON in question order regardless of completion order
+    all_results.sort(key=lambda r: r['index'])
     
     # Save all results to JSON
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
     output_json = f"{OUTPUT_DIR}/golden_responses_AFTER_FIX_{TIMESTAMP}.json"
     with open(output_json, 'w', encoding='utf-8') as f:
         json.dump(all_results, f, indent=2, ensure_ascii=False)
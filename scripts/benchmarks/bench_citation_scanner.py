@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Citation Scanner Throughput Benchmark
+=====================================
+
+Measures how many logged answers per minute the shared citation scanner can
+process, using the final answers in projectupdates/llm_responses_output.csv.
+The legacy per-call `re.findall` extractor is timed alongside for comparison.
+
+Usage:
+    python scripts/benchmarks/bench_citation_scanner.py --repeat 200
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from evaluations.evaluators.citation_scanner import scan_citations
+
+INPUT_FILE = "projectupdates/llm_responses_output.csv"
+
+# Pattern used by the pre-scanner evaluators (passed to re.findall on every call)
+LEGACY_PATTERN = r"""
+    ((?:Bala|Ayodhya|Aranya|Kishkindha|Sundara|Yuddha|Uttara)
+    \s*Kanda?)
+    \s+
+    (\d+)
+    [.\s:]
+    (\d+)
+    (?:\s*[-–—]\s*(\d+))?
+"""
+
+
+def legacy_extract(text):
+    return re.findall(LEGACY_PATTERN, text, re.IGNORECASE | re.VERBOSE)
+
+
+def run(label, func, answers):
+    start = time.perf_counter()
+    found = 0
+    for answer in answers:
+        found += len(func(answer))
+    elapsed = time.perf_counter() - start
+
+    per_minute = len(answers) / elapsed * 60 if elapsed > 0 else float("inf")
+    print(f"{label:<10} {len(answers):>9,} answers  {elapsed:8.3f}s  "
+          f"{per_minute:>14,.0f} answers/min  {found:>9,} citations")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark citation scanning throughput.")
+    parser.add_argument("--input", type=str, default=INPUT_FILE, help="CSV with a final_answer column")
+    parser.add_argument("--repeat", type=int, default=100, help="Times to replay the answer set")
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        base_answers = [row["final_answer"] for row in csv.DictReader(f) if row.get("final_answer")]
+
+    answers = base_answers * args.repeat
+    total_mb = sum(len(a) for a in answers) / 1e6
+    print(f"Loaded {len(base_answers)} answers x {args.repeat} = {len(answers):,} ({total_mb:.1f} MB of text)")
+    print("-" * 80)
+
+    scanner_time = run("scanner", scan_citations, answers)
+    legacy_time = run("legacy", legacy_extract, answers)
+
+    print("-" * 80)
+    print(f"Speedup vs legacy: {legacy_time / scanner_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
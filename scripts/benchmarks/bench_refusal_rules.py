@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+T3 Refusal Check Benchmark
+==========================
+
+Measures how many answers per second check_t3_refusal (scripts/response_rules.py)
+can score, using the T3 answers (OpenAI and Claude) in
+projectupdates/golden_for_gemini_eval_v3.csv. The legacy per-pattern
+`re.search` loop is timed alongside, and the two must agree on every answer.
+
+Usage:
+    python scripts/benchmarks/bench_refusal_rules.py --repeat 2000
+    python scripts/benchmarks/bench_refusal_rules.py --all-templates   # every answer, not just T3
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_rules import REFUSAL_PATTERNS, SUBSTANTIVE_ANSWER_PATTERNS, check_t3_refusal, explain_t3_refusal
+
+INPUT_FILE = "projectupdates/golden_for_gemini_eval_v3.csv"
+ANSWER_COLUMNS = ("openai_final_answer", "claude_final_answer")
+
+
+def legacy_check_t3_refusal(answer_text):
+    """The pre-matcher check: one re.search per pattern on every call."""
+    if not answer_text:
+        return 'FAIL'
+    answer_lower = answer_text.lower()
+    has_refusal = any(re.search(pattern, answer_lower) for pattern in REFUSAL_PATTERNS)
+    has_substantive = any(re.search(pattern, answer_lower) for pattern in SUBSTANTIVE_ANSWER_PATTERNS)
+    if has_refusal and not has_substantive:
+        return 'PASS'
+    elif has_substantive:
+        return 'FAIL'
+    if len(answer_text) < 200 and ('sorry' in answer_lower or 'apologize' in answer_lower):
+        return 'PASS'
+    return 'FAIL'
+
+
+def run(label, func, answers):
+    start = time.perf_counter()
+    passed = sum(func(answer) == 'PASS' for answer in answers)
+    elapsed = time.perf_counter() - start
+
+    per_second = len(answers) / elapsed if elapsed > 0 else float("inf")
+    print(f"{label:<10} {len(answers):>9,} answers  {elapsed:8.3f}s  "
+          f"{per_second:>12,.0f} answers/s  {passed:>9,} PASS")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the T3 refusal check.")
+    parser.add_argument("--input", type=str, default=INPUT_FILE, help="CSV with template and *_final_answer columns")
+    parser.add_argument("--repeat", type=int, default=1000, help="Times to replay the answer set")
+    parser.add_argument("--all-templates", action="store_true", help="Score every answer, not just T3 rows")
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        base_answers = [
+            row[column]
+            for row in csv.DictReader(f)
+            if args.all_templates or row.get("template") == "T3"
+            for column in ANSWER_COLUMNS
+            if row.get(column)
+        ]
+
+    mismatches = [a for a in base_answers if check_t3_refusal(a) != legacy_check_t3_refusal(a)]
+    if mismatches:
+        print(f"ERROR: {len(mismatches)} answers scored differently, e.g.: {mismatches[0][:120]!r}")
+        sys.exit(1)
+
+    print("Verdicts (matcher == legacy on every answer):")
+    for answer in base_answers:
+        verdict, reason, rule = explain_t3_refusal(answer)
+        print(f"  {verdict}  {reason:<14} {rule or '-':<40} {answer[:50]!r}")
+
+    answers = base_answers * args.repeat
+    total_mb = sum(len(a) for a in answers) / 1e6
+    print(f"\nLoaded {len(base_answers)} answers x {args.repeat} = {len(answers):,} ({total_mb:.1f} MB of text)")
+    print("-" * 80)
+
+    matcher_time = run("matcher", check_t3_refusal, answers)
+    legacy_time = run("legacy", legacy_check_t3_refusal, answers)
+
+    print("-" * 80)
+    print(f"Speedup vs legacy: {legacy_time / matcher_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
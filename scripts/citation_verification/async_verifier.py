@@ -0,0 +1,187 @@
+"""
+Async Pinecone Verifier
+Asyncio variant of CitationVerifier with bounded concurrency.
+
+Lookups run in worker threads (the Pinecone client is synchronous) behind a
+semaphore that caps in-flight requests. A thread that times out cannot be
+cancelled, so it keeps its slot until it actually finishes. Cached results (see
+verification_cache.py) are returned without scheduling a lookup. Each lookup has its own timeout and
+transient failures (timeouts, dropped connections, 429s, 5xx) are retried with
+exponential backoff plus full jitter. Identical citations
+requested concurrently (e.g. the same Bala Kanda shloka cited by many
+answers) share a single lookup; a failed lookup is forgotten so a later
+request tries again. Shloka ranges are checked with one range
+query each rather than one lookup per shloka.
+"""
+
+import asyncio
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+from citation_utils import normalize_kanda, extract_citation_ranges
+from pinecone_verifier import CitationVerifier, CANONICAL_TO_DISPLAY
+
+# Defaults
+MAX_IN_FLIGHT = 16
+REQUEST_TIMEOUT_SECONDS = 10.0
+RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Check whether a failed Pinecone call is worth retrying (timeout, connection, 429, 5xx)."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    for attr in ("status", "status_code"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status == 429 or status >= 500
+    return False
+
+
+class AsyncCitationVerifier(CitationVerifier):
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        timeout: float = REQUEST_TIMEOUT_SECONDS,
+        retries: int = RETRIES,
+        backoff_base: float = BACKOFF_BASE_SECONDS
+    ):
+        super().__init__()
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self._semaphore = None
+        self._lookups: Dict[tuple, asyncio.Future] = {}
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def _run_in_thread(self, func, *args) -> Any:
+        """
+        Run one blocking call in a worker thread, holding a semaphore slot until
+        the thread finishes (even after the caller has timed out on it).
+        """
+        semaphore = self._get_semaphore()
+        await semaphore.acquire()
+
+        def release(thread: asyncio.Future):
+            semaphore.release()
+            if not thread.cancelled():
+                thread.exception()  # Mark an abandoned thread's error as retrieved
+
+        thread = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        thread.add_done_callback(release)
+        return await asyncio.wait_for(asyncio.shield(thread), timeout=self.timeout)
+
+    async def _call_with_retry(self, func, *args) -> Tuple[Any, Optional[str]]:
+        """Run one blocking Pinecone call with timeout and jittered retries; returns (result, error)."""
+        last_error = None
+
+        for attempt in range(self.retries):
+            try:
+                return await self._run_in_thread(func, *args), None
+            except Exception as e:
+                last_error = "Timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+                if not is_transient_error(e):
+                    break
+                if attempt < self.retries - 1:
+                    # Full jitter: sleep uniformly in [0, base * 2^attempt]
+                    await asyncio.sleep(random.uniform(0, self.backoff_base * (2 ** attempt)))
+
+        return None, last_error
+
+    async def _query_with_retry(self, display_kanda: str, sarga: int, shloka: int) -> Dict[str, Any]:
+        """Run one Pinecone query with timeout and jittered retries."""
+        check, error = await self._call_with_retry(self.query_citation, display_kanda, sarga, shloka)
+        if error is None:
+            return check
+        print(f"Error querying Pinecone for {display_kanda} {sarga}.{shloka}: {error}")
+        return {"exists": False, "error": error}
+
+    async def verify_range_async(self, kanda: str, sarga: int, start: int, end: int) -> Tuple[Dict[int, Dict[str, Any]], Optional[str]]:
+        """Async counterpart of verify_range: one retried query for the whole range, unless cached."""
+        normalized_kanda = normalize_kanda(kanda)
+        if not normalized_kanda:
+            return {}, None
+        cached = self.cached_range(normalized_kanda, sarga, start, end)
+        if cached is not None:
+            return cached, None
+        display_kanda = CANONICAL_TO_DISPLAY.get(normalized_kanda, normalized_kanda)
+
+        found, error = await self._call_with_retry(self.query_range, display_kanda, sarga, start, end)
+        if error is not None:
+            print(f"Error querying Pinecone for {display_kanda} {sarga}.{start}-{end}: {error}")
+            return {}, error
+
+        self.store_range(normalized_kanda, sarga, start, end, found)
+        return found, None
+
+    async def verify_citation_exists_async(self, kanda: str, sarga: int, shloka: int) -> Dict[str, Any]:
+        """
+        Async counterpart of verify_citation_exists.
+        Concurrent requests for the same citation share one lookup.
+        """
+        normalized_kanda = normalize_kanda(kanda)
+        if not normalized_kanda:
+            return {"exists": False, "shloka_id": None, "text_preview": None, "reason": "Invalid Kanda Name"}
+
+        key = (normalized_kanda, sarga, shloka)
+        lookup = self._lookups.get(key)
+        if lookup is None:
+            cached = self.cached_check(normalized_kanda, sarga, shloka)
+            if cached is not None:
+                return cached
+            display_kanda = CANONICAL_TO_DISPLAY.get(normalized_kanda, normalized_kanda)
+            lookup = asyncio.ensure_future(self._lookup(key, display_kanda))
+            self._lookups[key] = lookup
+
+        return await lookup
+
+    async def _lookup(self, key: tuple, display_kanda: str) -> Dict[str, Any]:
+        normalized_kanda, sarga, shloka = key
+        check = await self._query_with_retry(display_kanda, sarga, shloka)
+        if check.get("error"):
+            # Waiters already hold this future; later requests should try again
+            self._lookups.pop(key, None)
+        else:
+            self.store_check(normalized_kanda, sarga, shloka, check)
+        return check
+
+    async def verify_answer_async(self, answer_text: str) -> Dict[str, Any]:
+        """
+        Async counterpart of verify_answer: all citations in the answer are
+        looked up concurrently (bounded by max_in_flight).
+        """
+        ranges = extract_citation_ranges(answer_text)
+        lookups = await asyncio.gather(*[
+            self.verify_range_async(r.kanda, r.sarga, r.shloka_start, r.shloka_end) if r.is_range
+            else self.verify_citation_exists_async(r.kanda, r.sarga, r.shloka_start)
+            for r in ranges
+        ])
+
+        # Ranges are reported as one detail each, never expanded
+        checks = [
+            self.range_detail(citation_range, *lookup) if citation_range.is_range else lookup
+            for citation_range, lookup in zip(ranges, lookups)
+        ]
+        return self.build_report(ranges, checks)
+
+
+if __name__ == "__main__":
+    # Demo
+    async def demo():
+        verifier = AsyncCitationVerifier()
+        report = await verifier.verify_answer_async(
+            "Valmiki composed the epic [Bala Kanda 1.1] and Hanuman leapt [Sundara Kanda 1.999]."
+        )
+        print(report)
+
+    try:
+        asyncio.run(demo())
+    except Exception as e:
+        print(f"Skipping demo due to initialization error: {e}")
@@ -3,10 +3,20 @@ Citation Utils
 Contains regex patterns and normalization logic for Tattva Citation Verification.
 """
 
+import os
 import re
+import sys
 from dataclasses import dataclass
+from itertools import islice
 from typing import List, Optional
 
+# Shared citation scanner lives in evaluations/evaluators (repo root on path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from evaluations.evaluators.citation_extractor import (
+    MAX_EXPANDED_SHLOKAS, MAX_REPORTED_MISSING, CitationRange, extract_citation_ranges
+)
+
 # Kanda normalization map
 KANDA_NORMALIZATION = {
     # Full names (lowercase)
@@ -91,65 +101,22 @@ def normalize_kanda(kanda_text: str) -> Optional[str]:
     
     return None
 
-def extract_citations(answer_text: str) -> List[Citation]:
+def extract_citations(answer_text: str, max_per_range: int = MAX_EXPANDED_SHLOKAS) -> List[Citation]:
     """
-    Extract all citations from an answer text using robust regex.
+    Extract all citations from an answer text, one per shloka_id.
+    Built on extract_citation_ranges: each merged range expands to at most
+    max_per_range shlokas; verification uses the ranges directly.
     """
     citations = []
-    
-    # Improved Regex found in Step 1 Analysis
-    pattern = r"""
-        ((?:Bala|Ayodhya|Aranya|Kishkindha|Sundara|Yuddha|Uttara)  # Base name
-        (?:[\s-]*Kanda)?)             # Optional suffix with space or hyphen
-        [\s,]+                        # Separator (space or comma)
-        (\d+)                         # Sarga
-        [.\s:]                        # Separator
-        (\d+)                         # Shloka
-        (?:\s*[-–—]\s*(\d+))?         # Optional Range
-    """
-    
-    matches = re.findall(pattern, answer_text, re.IGNORECASE | re.VERBOSE)
-    
-    for match in matches:
-        kanda_raw, sarga_str, shloka_start_str, shloka_end_str = match
-        
-        kanda = normalize_kanda(kanda_raw)
-        if not kanda:
-            continue
-        
-        sarga = int(sarga_str)
-        shloka_start = int(shloka_start_str)
-        
-        original = f"{kanda_raw} {sarga_str}.{shloka_start_str}"
-        if shloka_end_str:
-            original += f"-{shloka_end_str}"
-        
-        if shloka_end_str:
-            shloka_end = int(shloka_end_str)
-            for shloka in range(shloka_start, shloka_end + 1):
-                citations.append(Citation(
-                    kanda=kanda,
-                    sarga=sarga,
-                    shloka=shloka,
-                    original_text=original
-                ))
-        else:
+    for citation_range in extract_citation_ranges(answer_text):
+        for shloka in islice(range(citation_range.shloka_start, citation_range.shloka_end + 1), max_per_range):
             citations.append(Citation(
-                kanda=kanda,
-                sarga=sarga,
-                shloka=shloka_start,
-                original_text=original
+                kanda=citation_range.kanda,
+                sarga=citation_range.sarga,
+                shloka=shloka,
+                original_text=citation_range.original_text_for(shloka)
             ))
-            
-    # Deduplicate
-    seen = set()
-    unique_citations = []
-    for c in citations:
-        if c.shloka_id not in seen:
-            seen.add(c.shloka_id)
-            unique_citations.append(c)
-            
-    return unique_citations
+    return citations
 
 if __name__ == "__main__":
     # Quick Test
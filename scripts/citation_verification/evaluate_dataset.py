@@ -4,33 +4,22 @@ Runs citation verification on a dataset of generated answers.
 """
 
 import argparse
+import asyncio
 import json
 import os
 import sys
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Ensure we can import local modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from pinecone_verifier import CitationVerifier
 
-def evaluate_dataset(input_path: str, output_path: str, provider: str = "openai"):
-    print(f"Loading dataset from {input_path}...")
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        
-    print(f"Initializing Verifier (Provider: {provider})...")
-    try:
-        verifier = CitationVerifier()
-    except Exception as e:
-        print(f"Failed to initialize verifier: {e}")
-        print("Ensure PINECONE_API_KEY and PINECONE_INDEX_NAME are set.")
-        return
-
-    results = {
+def new_results(total_questions: int) -> Dict[str, Any]:
+    return {
         "summary": {
-            "total_questions": len(data),
+            "total_questions": total_questions,
             "processed": 0,
             "skipped_t3": 0,
             "passed": 0,
@@ -41,83 +30,179 @@ def evaluate_dataset(input_path: str, output_path: str, provider: str = "openai"
         },
         "details": []
     }
-    
-    print("Starting verification...")
-    
-    for item in data:
-        idx = item.get("index", "?")
-        question = item.get("user_query", "")
-        expected_template = item.get("expected_template", "T1")
-        
-        # Skip T3
-        if expected_template == "T3":
-            results["summary"]["skipped_t3"] += 1
-            results["details"].append({
-                "question_index": idx,
-                "question": question,
-                "result": "SKIP",
-                "reason": "T3 template - no citations expected"
-            })
-            continue
-            
-        # Get provider data
-        provider_data = item.get(provider)
-        if not provider_data:
-             results["details"].append({
-                "question_index": idx,
-                "question": question,
-                "result": "ERROR",
-                "reason": f"No data for provider {provider}"
-            })
-             continue
-             
-        answer = provider_data.get("answer", "")
-        
-        # Verify
-        verification = verifier.verify_answer(answer)
-        
-        # Record stats
-        results["summary"]["processed"] += 1
-        results["summary"]["total_citations_checked"] += verification["total_citations"]
-        results["summary"]["total_phantom_citations"] += len(verification["phantom_citations"])
-        
-        if verification["result"] == "PASS":
-            results["summary"]["passed"] += 1
-        else:
-            results["summary"]["failed"] += 1
-            
-        # Record details
+
+def prepare_item(item: Dict[str, Any], provider: str, results: Dict[str, Any]) -> Optional[str]:
+    """
+    Record skip/error rows directly; return the answer text if it needs verification.
+    """
+    idx = item.get("index", "?")
+    question = item.get("user_query", "")
+    expected_template = item.get("expected_template", "T1")
+
+    # Skip T3
+    if expected_template == "T3":
+        results["summary"]["skipped_t3"] += 1
         results["details"].append({
             "question_index": idx,
             "question": question,
-            "result": verification["result"],
-            "verification_details": verification
+            "result": "SKIP",
+            "reason": "T3 template - no citations expected"
         })
-        
-        # Progress log
-        if results["summary"]["processed"] % 10 == 0:
-            print(f"Processed {results['summary']['processed']} questions...")
+        return None
 
+    # Get provider data
+    provider_data = item.get(provider)
+    if not provider_data:
+         results["details"].append({
+            "question_index": idx,
+            "question": question,
+            "result": "ERROR",
+            "reason": f"No data for provider {provider}"
+        })
+         return None
+
+    return provider_data.get("answer", "")
+
+def record_verification(item: Dict[str, Any], verification: Dict[str, Any], results: Dict[str, Any]):
+    """Add one verified answer to the summary and details."""
+    # Record stats
+    results["summary"]["processed"] += 1
+    results["summary"]["total_citations_checked"] += verification["total_citations"]
+    results["summary"]["total_phantom_citations"] += len(verification["phantom_citations"])
+
+    if verification["result"] == "PASS":
+        results["summary"]["passed"] += 1
+    else:
+        results["summary"]["failed"] += 1
+
+    # Record details
+    results["details"].append({
+        "question_index": item.get("index", "?"),
+        "question": item.get("user_query", ""),
+        "result": verification["result"],
+        "verification_details": verification
+    })
+
+    # Progress log
+    if results["summary"]["processed"] % 10 == 0:
+        print(f"Processed {results['summary']['processed']} questions...")
+
+def save_results(results: Dict[str, Any], output_path: str, verifier: Optional[CitationVerifier] = None):
     # Calculate final rate
     total_processed = results["summary"]["processed"]
     if total_processed > 0:
         results["summary"]["pass_rate"] = results["summary"]["passed"] / total_processed
-    
+
+    # Verification cache effectiveness
+    if verifier is not None and verifier.cache is not None:
+        results["summary"]["verification_cache"] = verifier.cache.stats()
+
     # Save output
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2)
-        
+
     print("\nEvaluation Complete!")
     print(f"Summary: {json.dumps(results['summary'], indent=2)}")
     print(f"Results saved to {output_path}")
 
+def evaluate_dataset(input_path: str, output_path: str, provider: str = "openai"):
+    print(f"Loading dataset from {input_path}...")
+    with open(input_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    print(f"Initializing Verifier (Provider: {provider})...")
+    try:
+        verifier = CitationVerifier()
+    except Exception as e:
+        print(f"Failed to initialize verifier: {e}")
+        print("Ensure PINECONE_API_KEY and PINECONE_INDEX_NAME are set.")
+        return
+
+    results = new_results(len(data))
+
+    print("Starting verification...")
+
+    for item in data:
+        answer = prepare_item(item, provider, results)
+        if answer is None:
+            continue
+
+        # Verify
+        verification = verifier.verify_answer(answer)
+        record_verification(item, verification, results)
+
+    save_results(results, output_path, verifier)
+
+async def evaluate_dataset_async(
+    input_path: str,
+    output_path: str,
+    provider: str = "openai",
+    concurrency: int = 16,
+    timeout: float = 10.0
+):
+    """
+    Pipelined variant of evaluate_dataset.
+
+    Extraction and lookups for all answers run concurrently (bounded by
+    `concurrency` in-flight Pinecone requests); a writer task records each
+    verification as soon as it completes.
+    """
+    # Imported here so the sync path does not depend on asyncio helpers
+    from async_verifier import AsyncCitationVerifier
+
+    print(f"Loading dataset from {input_path}...")
+    with open(input_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    print(f"Initializing Async Verifier (Provider: {provider}, in-flight: {concurrency})...")
+    try:
+        verifier = AsyncCitationVerifier(max_in_flight=concurrency, timeout=timeout)
+    except Exception as e:
+        print(f"Failed to initialize verifier: {e}")
+        print("Ensure PINECONE_API_KEY and PINECONE_INDEX_NAME are set.")
+        return
+
+    results = new_results(len(data))
+    completed: asyncio.Queue = asyncio.Queue()
+
+    async def verify(item: Dict[str, Any], answer: str):
+        verification = await verifier.verify_answer_async(answer)
+        await completed.put((item, verification))
+
+    async def writer(expected: int):
+        for _ in range(expected):
+            item, verification = await completed.get()
+            record_verification(item, verification, results)
+
+    print("Starting verification...")
+
+    tasks = []
+    for item in data:
+        answer = prepare_item(item, provider, results)
+        if answer is not None:
+            tasks.append(verify(item, answer))
+
+    await asyncio.gather(writer(len(tasks)), *tasks)
+
+    # Keep output order stable regardless of completion order
+    order = {item.get("index", "?"): i for i, item in enumerate(data)}
+    results["details"].sort(key=lambda d: order.get(d["question_index"], len(order)))
+
+    save_results(results, output_path, verifier)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Verify citations in generated answers.")
     parser.add_argument("--input", "-i", type=str, required=True, help="Path to input JSON file (golden responses)")
     parser.add_argument("--output", "-o", type=str, required=True, help="Path to output results JSON file")
     parser.add_argument("--provider", "-p", type=str, default="openai", choices=["openai", "claude"], help="Provider to evaluate")
-    
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Use the concurrent async verifier")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max in-flight Pinecone requests (async mode)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds (async mode)")
+
     args = parser.parse_args()
-    
-    evaluate_dataset(args.input, args.output, args.provider)
+
+    if args.use_async:
+        asyncio.run(evaluate_dataset_async(args.input, args.output, args.provider, args.concurrency, args.timeout))
+    else:
+        evaluate_dataset(args.input, args.output, args.provider)
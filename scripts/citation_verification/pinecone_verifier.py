@@ -1,16 +1,32 @@
 """
 Pinecone Verifier
 Verifies if citations exist in the Pinecone vector database.
+Results are persisted in the shared verification cache
+(evaluations/evaluators/verification_cache.py).
 """
 
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from pinecone import Pinecone
-from citation_utils import normalize_kanda, extract_citations, Citation
+from citation_utils import normalize_kanda, extract_citation_ranges, CitationRange, MAX_REPORTED_MISSING
+from evaluations.evaluators.verification_cache import CachedVerification, get_verification_cache, make_preview
 
 # Configuration
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME", "tattva-shlokas")
+# Cap on matches returned by one range query (bounds garbled ranges like 127.11-1500)
+RANGE_QUERY_MAX_TOP_K = 1000
+
+# Pinecone metadata stores the display name ("Bala Kanda"), not the canonical ID
+CANONICAL_TO_DISPLAY = {
+    "bala-kanda": "Bala Kanda",
+    "ayodhya-kanda": "Ayodhya Kanda",
+    "aranya-kanda": "Aranya Kanda",
+    "kishkindha-kanda": "Kishkindha Kanda",
+    "sundara-kanda": "Sundara Kanda",
+    "yuddha-kanda": "Yuddha Kanda",
+    "uttara-kanda": "Uttara Kanda",
+}
 
 class CitationVerifier:
     def __init__(self):
@@ -19,8 +35,70 @@ class CitationVerifier:
         
         self.pc = Pinecone(api_key=PINECONE_API_KEY)
         self.index = self.pc.Index(PINECONE_INDEX_NAME)
+        self.cache = get_verification_cache()
         print(f"Connected to Pinecone index: {PINECONE_INDEX_NAME}")
 
+    def cached_check(self, normalized_kanda: str, sarga: int, shloka: int) -> Optional[Dict[str, Any]]:
+        """Return a cached check result, or None on a cache miss."""
+        if self.cache is None:
+            return None
+        entry = self.cache.get(f"{normalized_kanda}-{sarga}-{shloka}")
+        if entry is None:
+            return None
+        return {
+            "exists": entry.exists,
+            "shloka_id": entry.shloka_id,
+            "text_preview": entry.text_preview
+        }
+
+    def store_check(self, normalized_kanda: str, sarga: int, shloka: int, check: Dict[str, Any]):
+        """Cache a successful check result (errors are never cached)."""
+        if self.cache is None or check.get("error"):
+            return
+        self.cache.put(f"{normalized_kanda}-{sarga}-{shloka}", CachedVerification(
+            exists=check["exists"],
+            shloka_id=check.get("shloka_id"),
+            kanda=normalized_kanda,
+            sarga=sarga,
+            shloka=shloka,
+            text_preview=check.get("text_preview")
+        ))
+
+    def cached_range(self, normalized_kanda: str, sarga: int, start: int, end: int) -> Optional[Dict[int, Dict[str, Any]]]:
+        """
+        Checks for the found shlokas of start..end when the cache holds every
+        shloka of the range (one get_many), otherwise None. Ranges longer than
+        RANGE_QUERY_MAX_TOP_K are never cached.
+        """
+        length = end - start + 1
+        if self.cache is None or length > RANGE_QUERY_MAX_TOP_K:
+            return None
+        cached = self.cache.get_many(f"{normalized_kanda}-{sarga}-{shloka}" for shloka in range(start, end + 1))
+        if len(cached) < length:
+            return None
+        return {
+            entry.shloka: {"exists": True, "shloka_id": entry.shloka_id, "text_preview": entry.text_preview}
+            for entry in cached.values()
+            if entry.exists
+        }
+
+    def store_range(self, normalized_kanda: str, sarga: int, start: int, end: int, found: Dict[int, Dict[str, Any]]):
+        """Cache a successful range query: found shlokas and, since top_k covered the range, missing ones."""
+        if self.cache is None or end - start + 1 > RANGE_QUERY_MAX_TOP_K:
+            return
+        entries = {}
+        for shloka in range(start, end + 1):
+            check = found.get(shloka, {})
+            entries[f"{normalized_kanda}-{sarga}-{shloka}"] = CachedVerification(
+                exists=bool(check.get("exists")),
+                shloka_id=check.get("shloka_id"),
+                kanda=normalized_kanda,
+                sarga=sarga,
+                shloka=shloka,
+                text_preview=check.get("text_preview")
+            )
+        self.cache.put_many(entries)
+
     def verify_citation_exists(self, kanda: str, sarga: int, shloka: int) -> Dict[str, Any]:
         """
         Check if a specific citation tuple exists in Pinecone.
@@ -45,63 +123,159 @@ class CitationVerifier:
         # This suggests the database likely uses "Bala Kanda", "Ayodhya Kanda" etc. 
         # I will map canonical "bala-kanda" to "Bala Kanda" for the query.
         
-        canonical_to_display = {
-            "bala-kanda": "Bala Kanda",
-            "ayodhya-kanda": "Ayodhya Kanda",
-            "aranya-kanda": "Aranya Kanda",
-            "kishkindha-kanda": "Kishkindha Kanda",
-            "sundara-kanda": "Sundara Kanda",
-            "yuddha-kanda": "Yuddha Kanda",
-            "uttara-kanda": "Uttara Kanda",
+        display_kanda = CANONICAL_TO_DISPLAY.get(normalized_kanda, normalized_kanda)
+
+        cached = self.cached_check(normalized_kanda, sarga, shloka)
+        if cached is not None:
+            return cached
+
+        try:
+            check = self.query_citation(display_kanda, sarga, shloka)
+        except Exception as e:
+            print(f"Error querying Pinecone: {e}")
+            return {"exists": False, "error": str(e)}
+
+        self.store_check(normalized_kanda, sarga, shloka, check)
+        return check
+
+    def query_citation(self, display_kanda: str, sarga: int, shloka: int) -> Dict[str, Any]:
+        """
+        Run the metadata-filtered Pinecone query for one citation.
+        Raises on network/API errors so callers can decide how to retry.
+        """
+        metadata_filter = {
+            "kanda": {"$eq": display_kanda},
+            "sarga": {"$eq": sarga},
+            "shloka": {"$eq": shloka}
         }
+
+        # Query with dummy vector
+        dummy_vector = [0.0] * 1536 # text-embedding-3-small dimension
         
-        display_kanda = canonical_to_display.get(normalized_kanda, normalized_kanda)
+        result = self.index.query(
+            vector=dummy_vector,
+            filter=metadata_filter,
+            top_k=1,
+            include_metadata=True
+        )
 
+        if result and result.matches:
+            match = result.matches[0]
+            text = match.metadata.get('shloka_text', '') or match.metadata.get('text', '')
+            return {
+                "exists": True,
+                "shloka_id": match.id,
+                "text_preview": make_preview(text)
+            }
+        else:
+            return {
+                "exists": False,
+                "shloka_id": None,
+                "text_preview": None
+            }
+
+    def query_range(self, display_kanda: str, sarga: int, start: int, end: int) -> Dict[int, Dict[str, Any]]:
+        """
+        Run one metadata-filtered query covering shlokas start..end of a sarga.
+        Returns checks for the shlokas found, keyed by shloka number.
+        Raises on network/API errors so callers can decide how to retry.
+        """
         metadata_filter = {
             "kanda": {"$eq": display_kanda},
             "sarga": {"$eq": sarga},
-            "shloka": {"$eq": shloka}
+            "shloka": {"$gte": start, "$lte": end}
         }
 
-        try:
-            # Query with dummy vector
-            dummy_vector = [0.0] * 1536 # text-embedding-3-small dimension
-            
-            result = self.index.query(
-                vector=dummy_vector,
-                filter=metadata_filter,
-                top_k=1,
-                include_metadata=True
-            )
+        result = self.index.query(
+            vector=[0.0] * 1536,
+            filter=metadata_filter,
+            top_k=min(end - start + 1, RANGE_QUERY_MAX_TOP_K),
+            include_metadata=True
+        )
 
-            if result and result.matches:
-                match = result.matches[0]
+        found = {}
+        for match in (result.matches if result else None) or []:
+            shloka = int(match.metadata.get('shloka', -1))
+            if start <= shloka <= end and shloka not in found:
                 text = match.metadata.get('shloka_text', '') or match.metadata.get('text', '')
-                return {
+                found[shloka] = {
                     "exists": True,
                     "shloka_id": match.id,
-                    "text_preview": text[:100] + "..." if text else None
-                }
-            else:
-                return {
-                    "exists": False,
-                    "shloka_id": None,
-                    "text_preview": None
+                    "text_preview": make_preview(text)
                 }
+        return found
 
+    def verify_range(self, kanda: str, sarga: int, start: int, end: int) -> Tuple[Dict[int, Dict[str, Any]], Optional[str]]:
+        """
+        Check every shloka in start..end with a single query, unless the cache
+        holds the whole range. Returns (checks for found shlokas, error); query
+        results (found and missing shlokas) are cached.
+        """
+        normalized_kanda = normalize_kanda(kanda)
+        if not normalized_kanda:
+            return {}, None
+        cached = self.cached_range(normalized_kanda, sarga, start, end)
+        if cached is not None:
+            return cached, None
+        display_kanda = CANONICAL_TO_DISPLAY.get(normalized_kanda, normalized_kanda)
+
+        try:
+            found = self.query_range(display_kanda, sarga, start, end)
         except Exception as e:
             print(f"Error querying Pinecone: {e}")
-            return {"exists": False, "error": str(e)}
+            return {}, str(e)
+
+        self.store_range(normalized_kanda, sarga, start, end, found)
+        return found, None
+
+    @staticmethod
+    def range_detail(citation_range: CitationRange, found: Dict[int, Dict[str, Any]], error: Optional[str]) -> Dict[str, Any]:
+        """
+        One report detail for a whole range: found / missing counts and the
+        first MAX_REPORTED_MISSING missing shlokas (the range is never expanded).
+        """
+        found_count, missing_count, missing_shlokas = citation_range.summarize(found, MAX_REPORTED_MISSING)
+        detail = {
+            "citation": citation_range.cited_text,
+            "parsed": f"{citation_range.kanda} {citation_range.sarga}.{citation_range.shloka_start}-{citation_range.shloka_end}",
+            "exists": missing_count == 0,
+            "shloka_id": citation_range.range_id,
+            "found_count": found_count,
+            "missing_count": missing_count,
+            "missing_shlokas": missing_shlokas
+        }
+        if error and missing_count:
+            detail["error"] = error
+        return detail
 
     def verify_answer(self, answer_text: str) -> Dict[str, Any]:
         """
         Full verification pipeline for an answer string.
+        Shloka ranges stay compact, cost one query each and are reported as
+        one detail each.
+        """
+        citations, checks = [], []
+        for citation_range in extract_citation_ranges(answer_text):
+            citations.append(citation_range)
+            if not citation_range.is_range:
+                checks.append(self.verify_citation_exists(
+                    citation_range.kanda, citation_range.sarga, citation_range.shloka_start))
+                continue
+            found, error = self.verify_range(citation_range.kanda, citation_range.sarga,
+                                             citation_range.shloka_start, citation_range.shloka_end)
+            checks.append(self.range_detail(citation_range, found, error))
+        return self.build_report(citations, checks)
+
+    def build_report(self, citations: List[CitationRange], checks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Assemble the verification report from per-citation check results
+        (range_detail results for ranges). total_citations and
+        verified_citations count shlokas; details and phantom_citations hold
+        one entry per citation or range.
         """
-        citations = extract_citations(answer_text)
-        
         results = {
             "result": "PASS", # Default
-            "total_citations": len(citations),
+            "total_citations": sum(len(cit) for cit in citations),
             "verified_citations": 0,
             "phantom_citations": [],
             "details": []
@@ -114,22 +288,23 @@ class CitationVerifier:
 
         phantom_found = False
         
-        for cit in citations:
-            check = self.verify_citation_exists(cit.kanda, cit.sarga, cit.shloka)
-            
-            detail = {
-                "citation": cit.original_text,
-                "parsed": f"{cit.kanda} {cit.sarga}.{cit.shloka}",
-                "exists": check["exists"],
-                "shloka_id": check.get("shloka_id")
-            }
+        for cit, check in zip(citations, checks):
+            if cit.is_range:
+                detail = check
+                results["verified_citations"] += check["found_count"]
+            else:
+                detail = {
+                    "citation": cit.original_text,
+                    "parsed": f"{cit.kanda} {cit.sarga}.{cit.shloka_start}",
+                    "exists": check["exists"],
+                    "shloka_id": check.get("shloka_id")
+                }
+                results["verified_citations"] += int(bool(check["exists"]))
             results["details"].append(detail)
             
-            if check["exists"]:
-                results["verified_citations"] += 1
-            else:
+            if not detail["exists"]:
                 phantom_found = True
-                results["phantom_citations"].append(cit.original_text)
+                results["phantom_citations"].append(detail["citation"])
         
         if phantom_found:
             results["result"] = "FAIL"
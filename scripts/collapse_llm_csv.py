@@ -1,7 +1,9 @@
-import pandas as pd
 import sys
 import os
 
+from eval_dataset import read_frame, write_frame
+from pivot_engine import RESPONSE_COLUMNS, normalize_query, pivot_providers, provider_prefix
+
 # Configuration
 # User pointed to `transformedllmoutput.csv` but the logic describes transforming the raw interleaved data.
 # I will use the verified interleaved source `llm_responses_output.csv`.
@@ -44,7 +46,7 @@ def collapse_group(group):
 def main():
     print(f"Reading {INPUT_FILE}...")
     try:
-        df = pd.read_csv(INPUT_FILE)
+        df = read_frame(INPUT_FILE, columns=RESPONSE_COLUMNS)
     except Exception as e:
         print(f"Error reading input CSV: {e}")
         sys.exit(1)
@@ -53,55 +55,26 @@ def main():
     
     # SIMPLIFIED ROBUST LOGIC
     # 1. Read Raw
-    df = pd.read_csv(INPUT_FILE)
+    df = read_frame(INPUT_FILE, columns=RESPONSE_COLUMNS)
     print(f"Initial Rows: {len(df)}")
     
-    # 2. Assign 'model_prefix'
-    def get_prefix(val):
-        s = str(val).lower()
-        if 'openai' in s: return 'openai'
-        if 'claude' in s or 'anthropic' in s: return 'claude'
-        return 'unknown'
-        
-    df['model_prefix'] = df['llm_used'].apply(get_prefix)
+    # 2. Assign 'model_prefix' (openai / claude / unknown)
+    df['model_prefix'] = provider_prefix(df['llm_used'])
+    df['query_key'] = normalize_query(df['user_query'])
     
     # 3. Pivot
     # We want one row per user_query.
     # Columns to preserve (index): QUESTION_COLS
     # Columns to pivot: everything else
+    pivot_cols = [c for c in df.columns if c not in QUESTION_COLS and c not in ('model_prefix', 'llm_used', 'query_key')]
     
-    # Check if user_query is unique per model?
-    # duplicates = df.groupby(['user_query', 'model_prefix']).size()
-    # print(duplicates[duplicates > 1])
-    
-    # Pivot logic
-    pivot_cols = [c for c in df.columns if c not in QUESTION_COLS and c != 'model_prefix' and c != 'llm_used']
-    
-    # We melt first? Or just iterate?
-    # Let's iterate to be safe and explicit like the user wanted, but CORRECTLY.
-    
-    unique_queries = df['user_query'].unique()
+    unique_queries = df['query_key'].unique()
     print(f"Unique Queries: {len(unique_queries)}")
     
-    final_rows = []
-    
-    grouped = df.groupby('user_query')
-    
-    for query, group in grouped:
-        # Base data from first row
-        base_row = group.iloc[0][QUESTION_COLS].to_dict()
-        
-        # Merge model data
-        for _, row in group.iterrows():
-            prefix = row['model_prefix']
-            for col in pivot_cols:
-                val = row[col]
-                if pd.notna(val):
-                    base_row[f"{prefix}_{col}"] = val
-        
-        final_rows.append(base_row)
-        
-    final_df = pd.DataFrame(final_rows)
+    # Base data from each question's first row; model data merged per prefix
+    # (last non-null value wins), in one vectorized pass
+    final_df = pivot_providers(df, key='query_key', provider='model_prefix',
+                               shared_cols=QUESTION_COLS, value_cols=pivot_cols, sort=True)
 
     # 5. Validation
     print("\n--- Validation ---")
@@ -109,7 +82,7 @@ def main():
     
     # Write
     print(f"Writing to {OUTPUT_FILE}...")
-    final_df.to_csv(OUTPUT_FILE, index=False)
+    write_frame(final_df, OUTPUT_FILE)
     print("Done.")
 
 if __name__ == "__main__":
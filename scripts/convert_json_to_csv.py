@@ -1,18 +1,16 @@
-import json
 import csv
 import sys
 
-INPUT_FILE = "projectupdates/llm_responses_output.json"
+from trace_jsonl import iter_traces, resolve_trace_path
+
+INPUT_FILE = "projectupdates/llm_responses_output.jsonl"  # Legacy .json also accepted
 OUTPUT_FILE = "projectupdates/llm_responses_output.csv"
 
 def main():
     try:
-        print(f"Reading {INPUT_FILE}...")
-        with open(INPUT_FILE, 'r') as f:
-            data = json.load(f)
-        
-        traces = data.get("traces", [])
-        print(f"Found {len(traces)} traces.")
+        input_path = resolve_trace_path(INPUT_FILE)
+        print(f"Streaming traces from {input_path}...")
+        count = 0
 
         # Define CSV headers
         headers = [
@@ -34,7 +32,7 @@ def main():
             writer = csv.DictWriter(f, fieldnames=headers)
             writer.writeheader()
 
-            for trace in traces:
+            for trace in iter_traces(input_path):
                 # Extract retrieved shloka IDs
                 shlokas = trace.get("retrieved_shlokas", [])
                 shloka_ids = [s.get("id", "") for s in shlokas]
@@ -56,8 +54,9 @@ def main():
                 }
                 
                 writer.writerow(row)
+                count += 1
 
-        print(f"Successfully wrote {len(traces)} rows to {OUTPUT_FILE}")
+        print(f"Successfully wrote {count} rows to {OUTPUT_FILE}")
 
     except Exception as e:
         print(f"Error: {e}")
@@ -1,79 +1,184 @@
-import json
+"""
+Convert logs/traces.jsonl to a flat CSV.
+
+Streams line -> parse -> project -> write, so memory stays flat regardless of
+the size of the trace log. Parsing uses orjson when installed (see
+trace_jsonl.py) and can optionally be spread across processes in chunks
+(--workers). Progress and throughput are printed while converting.
+"""
+
+import argparse
 import csv
+import io
 import sys
 import os
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Tuple
+
+from trace_jsonl import loads_line
 
 INPUT_FILE = "logs/traces.jsonl"
 OUTPUT_FILE = "evaluations/data/traces_output.csv"
+CHUNK_LINES = 2000             # Lines per parse task in multi-process mode
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+# Define CSV headers based on TraceData structure
+# Flattening structure for CSV
+TRACE_CSV_HEADERS = [
+    "trace_id",
+    "timestamp",
+    "user_query",
+    "expanded_query",
+    "classification_category",
+    "classification_template",
+    "classification_model",
+    "generation_model",
+    "final_answer",
+    "retrieved_shlokas_count",
+    "retrieved_shlokas_ids",
+    "total_latency_ms"
+]
+
+def project_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten one TraceData record into a CSV row."""
+    # Extract retrieved shloka IDs
+    retrieval = trace.get("retrieval_results", {})
+    shlokas = retrieval.get("shlokas", []) if retrieval else []
+    shloka_ids = [s.get("id", "") for s in shlokas]
+
+    # Extract sub-objects
+    classification = trace.get("classification_result", {}) or {}
+    generation = trace.get("generation_result", {}) or {}
+
+    return {
+        "trace_id": trace.get("trace_id"),
+        "timestamp": trace.get("timestamp"),
+        "user_query": trace.get("user_query"),
+        "expanded_query": trace.get("expanded_query"),
+
+        "classification_category": classification.get("category"),
+        "classification_template": classification.get("template_selected"),
+        "classification_model": classification.get("model"),
+
+        "generation_model": generation.get("model"),
+        "final_answer": generation.get("answer"),
+
+        "retrieved_shlokas_count": len(shlokas),
+        "retrieved_shlokas_ids": ", ".join(shloka_ids),
+
+        "total_latency_ms": trace.get("total_latency_ms")
+    }
+
+def parse_chunk(lines: List[bytes]) -> Tuple[str, int, int]:
+    """
+    Parse, project and CSV-encode a chunk of raw lines.
+
+    Returns (csv text, rows, invalid line count); returning encoded text keeps
+    the hand-off from worker processes cheap.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=TRACE_CSV_HEADERS)
+    rows = 0
+    invalid = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            writer.writerow(project_trace(loads_line(line)))
+            rows += 1
+        except (ValueError, AttributeError):
+            invalid += 1
+    return buffer.getvalue(), rows, invalid
+
+def iter_chunks(f, chunk_lines: int) -> Iterator[Tuple[List[bytes], int]]:
+    """Yield (lines, bytes read) chunks from a binary file."""
+    chunk = []
+    size = 0
+    for line in f:
+        chunk.append(line)
+        size += len(line)
+        if len(chunk) >= chunk_lines:
+            yield chunk, size
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk, size
+
+def iter_parsed_chunks(f, workers: int, chunk_lines: int) -> Iterator[Tuple[str, int, int, int]]:
+    """
+    Yield (csv text, rows, invalid count, bytes read) per chunk, in file order.
+
+    With workers > 1, chunks are parsed in a process pool with at most
+    2 * workers chunks outstanding, so memory stays bounded.
+    """
+    if workers <= 1:
+        for lines, size in iter_chunks(f, chunk_lines):
+            yield (*parse_chunk(lines), size)
+        return
+
+    from multiprocessing import Pool
+
+    with Pool(workers) as pool:
+        pending = deque()
+        for lines, size in iter_chunks(f, chunk_lines):
+            pending.append((pool.apply_async(parse_chunk, (lines,)), size))
+            if len(pending) >= 2 * workers:
+                result, size = pending.popleft()
+                yield (*result.get(), size)
+        while pending:
+            result, size = pending.popleft()
+            yield (*result.get(), size)
+
+def print_progress(rows: int, bytes_read: int, total_bytes: int, elapsed: float):
+    mb = bytes_read / 1e6
+    pct = f" ({bytes_read / total_bytes * 100:.0f}%)" if total_bytes else ""
+    rate = rows / elapsed if elapsed > 0 else 0
+    mb_rate = mb / elapsed if elapsed > 0 else 0
+    print(f"  {rows:,} rows | {mb:,.1f} MB{pct} | {rate:,.0f} rows/s | {mb_rate:,.1f} MB/s")
+
+def convert(input_path: str, output_path: str, workers: int = 1, chunk_lines: int = CHUNK_LINES) -> int:
+    """Stream-convert a trace JSONL file to CSV; returns the number of rows written."""
+    total_bytes = os.path.getsize(input_path)
+    rows_written = 0
+    invalid_lines = 0
+    bytes_read = 0
+    start = time.time()
+    last_report = start
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(input_path, 'rb') as src, open(output_path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.DictWriter(out, fieldnames=TRACE_CSV_HEADERS)
+        writer.writeheader()
+
+        for text, rows, invalid, size in iter_parsed_chunks(src, workers, chunk_lines):
+            out.write(text)
+            rows_written += rows
+            invalid_lines += invalid
+            bytes_read += size
+
+            now = time.time()
+            if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                print_progress(rows_written, bytes_read, total_bytes, now - start)
+                last_report = now
+
+    print_progress(rows_written, bytes_read, total_bytes, time.time() - start)
+    if invalid_lines:
+        print(f"Skipped {invalid_lines} invalid JSON lines")
+    return rows_written
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert trace JSONL to CSV (streaming).")
+    parser.add_argument("--input", default=INPUT_FILE, help="Trace JSONL file")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Output CSV file")
+    parser.add_argument("--workers", type=int, default=1, help="Parse in N processes (chunks of --chunk-lines)")
+    parser.add_argument("--chunk-lines", type=int, default=CHUNK_LINES, help="Lines per parse chunk")
+    args = parser.parse_args()
+
     try:
-        print(f"Reading {INPUT_FILE}...")
-        traces = []
-        with open(INPUT_FILE, 'r') as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        traces.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        print(f"Skipping invalid JSON line")
-        
-        print(f"Found {len(traces)} traces.")
-
-        # Define CSV headers based on TraceData structure
-        # Flattening structure for CSV
-        headers = [
-            "trace_id",
-            "timestamp",
-            "user_query",
-            "expanded_query",
-            "classification_category",
-            "classification_template",
-            "classification_model",
-            "generation_model",
-            "final_answer",
-            "retrieved_shlokas_count",
-            "retrieved_shlokas_ids",
-            "total_latency_ms"
-        ]
-
-        with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
-
-            for trace in traces:
-                # Extract retrieved shloka IDs
-                retrieval = trace.get("retrieval_results", {})
-                shlokas = retrieval.get("shlokas", []) if retrieval else []
-                shloka_ids = [s.get("id", "") for s in shlokas]
-                
-                # Extract sub-objects
-                classification = trace.get("classification_result", {})
-                generation = trace.get("generation_result", {})
-
-                # Build row
-                row = {
-                    "trace_id": trace.get("trace_id"),
-                    "timestamp": trace.get("timestamp"),
-                    "user_query": trace.get("user_query"),
-                    "expanded_query": trace.get("expanded_query"),
-                    
-                    "classification_category": classification.get("category"),
-                    "classification_template": classification.get("template_selected"),
-                    "classification_model": classification.get("model"),
-                    
-                    "generation_model": generation.get("model"),
-                    "final_answer": generation.get("answer"),
-                    
-                    "retrieved_shlokas_count": len(shlokas),
-                    "retrieved_shlokas_ids": ", ".join(shloka_ids),
-                    
-                    "total_latency_ms": trace.get("total_latency_ms")
-                }
-                
-                writer.writerow(row)
-
-        print(f"Successfully wrote {len(traces)} rows to {OUTPUT_FILE}")
+        print(f"Streaming {args.input} -> {args.output} ({args.workers} worker(s))...")
+        count = convert(args.input, args.output, args.workers, args.chunk_lines)
+        print(f"Successfully wrote {count} rows to {args.output}")
 
     except Exception as e:
         print(f"Error: {e}")
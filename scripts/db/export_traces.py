@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Export traces from Postgres to CSV.
+
+Streams rows from the `traces` table (see init_traces.sql) and writes the
+same columns as convert_traces_to_csv.py, so downstream CSV tooling works
+the same whether traces came from logs/traces.jsonl or production.
+
+- Field projection happens in SQL (data->'generation_result'->>'answer', ...),
+  so only the exported columns cross the wire, never the full JSONB blobs.
+- A named (server-side) cursor fetches --itersize rows at a time, keeping
+  client memory flat for any export size.
+- --since/--until/--day filter on the timestamp column (idx_traces_timestamp).
+
+Usage:
+    python scripts/db/export_traces.py --day 2025-12-21
+    python scripts/db/export_traces.py --since 2025-12-20T00:00Z --until 2025-12-21T12:00Z
+
+Requires psycopg (v3). Uses tattva_POSTGRES_URL_NON_POOLING from .env.local
+by default: server-side cursors need a session, which poolers in transaction
+mode do not provide.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+import psycopg
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv('.env.local')
+
+# Shared helpers (scripts/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from convert_traces_to_csv import TRACE_CSV_HEADERS, print_progress
+
+OUTPUT_FILE = "evaluations/data/traces_export.csv"
+ITERSIZE = 2000                # Rows per round trip from the server-side cursor
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+# One SQL expression per TRACE_CSV_HEADERS column, mirroring project_trace()
+_SHLOKAS = "data->'retrieval_results'->'shlokas'"
+TRACE_COLUMN_SQL = {
+    "trace_id": "COALESCE(data->>'trace_id', trace_id::text)",
+    "timestamp": "COALESCE(data->>'timestamp', timestamp::text)",
+    "user_query": "data->>'user_query'",
+    "expanded_query": "data->>'expanded_query'",
+    "classification_category": "data->'classification_result'->>'category'",
+    "classification_template": "data->'classification_result'->>'template_selected'",
+    "classification_model": "data->'classification_result'->>'model'",
+    "generation_model": "data->'generation_result'->>'model'",
+    "final_answer": "data->'generation_result'->>'answer'",
+    "retrieved_shlokas_count": (
+        f"CASE WHEN jsonb_typeof({_SHLOKAS}) = 'array' "
+        f"THEN jsonb_array_length({_SHLOKAS}) ELSE 0 END"
+    ),
+    "retrieved_shlokas_ids": (
+        "COALESCE(("
+        "SELECT string_agg(COALESCE(s.value->>'id', ''), ', ' ORDER BY s.ordinality) "
+        f"FROM jsonb_array_elements(CASE WHEN jsonb_typeof({_SHLOKAS}) = 'array' "
+        f"THEN {_SHLOKAS} ELSE '[]'::jsonb END) WITH ORDINALITY AS s"
+        "), '')"
+    ),
+    "total_latency_ms": "data->>'total_latency_ms'",
+}
+
+
+def build_query(since: Optional[str], until: Optional[str]) -> Tuple[str, list]:
+    """SELECT of the CSV columns, filtered on the indexed timestamp column."""
+    columns = ",\n    ".join(f'{TRACE_COLUMN_SQL[name]} AS "{name}"' for name in TRACE_CSV_HEADERS)
+    where = []
+    params = []
+    if since:
+        where.append("timestamp >= %s::timestamptz")
+        params.append(since)
+    if until:
+        where.append("timestamp < %s::timestamptz")
+        params.append(until)
+
+    query = f"SELECT\n    {columns}\nFROM traces"
+    if where:
+        query += "\nWHERE " + " AND ".join(where)
+    query += "\nORDER BY timestamp, id"
+    return query, params
+
+
+def export(dsn: str, output_path: str, since: Optional[str] = None, until: Optional[str] = None,
+           itersize: int = ITERSIZE) -> int:
+    """Stream the selected traces into a CSV file; returns the number of rows written."""
+    query, params = build_query(since, until)
+    rows_written = 0
+    start = time.time()
+    last_report = start
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with psycopg.connect(dsn) as conn, open(output_path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        writer.writerow(TRACE_CSV_HEADERS)
+
+        # Named cursor => server-side; rows arrive `itersize` at a time
+        with conn.cursor(name="export_traces") as cursor:
+            cursor.itersize = itersize
+            cursor.execute(query, params)
+            for row in cursor:
+                writer.writerow(row)
+                rows_written += 1
+
+                if rows_written % itersize == 0:
+                    now = time.time()
+                    if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                        print_progress(rows_written, out.tell(), 0, now - start)
+                        last_report = now
+
+        print_progress(rows_written, out.tell(), 0, time.time() - start)
+    return rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export traces from Postgres to CSV (streaming).")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Output CSV file")
+    parser.add_argument("--since", help="Inclusive lower bound on timestamp (ISO 8601)")
+    parser.add_argument("--until", help="Exclusive upper bound on timestamp (ISO 8601)")
+    parser.add_argument("--day", help="Export one UTC day (YYYY-MM-DD); overrides --since/--until")
+    parser.add_argument("--itersize", type=int, default=ITERSIZE, help="Rows fetched per round trip")
+    parser.add_argument("--dsn", help="Connection string (default: tattva_POSTGRES_URL_NON_POOLING)")
+    args = parser.parse_args()
+
+    dsn = (args.dsn
+           or os.environ.get("tattva_POSTGRES_URL_NON_POOLING")
+           or os.environ.get("tattva_POSTGRES_URL")
+           or os.environ.get("POSTGRES_URL"))
+    if not dsn:
+        print("Error: no tattva_POSTGRES_URL found in .env.local (or pass --dsn)")
+        sys.exit(1)
+
+    since, until = args.since, args.until
+    if args.day:
+        day = date.fromisoformat(args.day)
+        since = f"{day.isoformat()}T00:00:00Z"
+        until = f"{(day + timedelta(days=1)).isoformat()}T00:00:00Z"
+
+    try:
+        print(f"Exporting traces [{since or '-inf'}, {until or 'now'}) -> {args.output}...")
+        count = export(dsn, args.output, since, until, args.itersize)
+        print(f"Successfully wrote {count} rows to {args.output}")
+
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
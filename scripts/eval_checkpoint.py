@@ -0,0 +1,130 @@
+"""
+Evaluation Checkpoints
+Resumable CSV output shared by the LLM-judge scripts
+(evaluate_with_gemini.py, evaluation/evaluate_template.py,
+evaluation/evaluate_routing.py).
+
+Every output row carries a `row_key`: a stable hash of the inputs that were
+judged (user query plus the model answers / categories). With resume enabled,
+the existing output is read on start; rows already judged successfully are
+kept and skipped, while missing rows and rows whose status columns hold
+PARSE_ERROR/ERROR are evaluated again. The file is rewritten in input order
+when the run finishes.
+
+Output written before row keys existed (no `row_key` column, or rows without
+one) cannot be matched to its inputs, so resuming it is refused with a
+warning and the file is left untouched rather than rewritten without those
+rows.
+"""
+
+import csv
+import hashlib
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+ROW_KEY_COLUMN = "row_key"
+FAILED_VALUES = {"PARSE_ERROR", "ERROR"}
+
+
+def row_key(*parts) -> str:
+    """Stable key for one judged row (independent of row order and file)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part if part is not None else "").strip().encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()[:16]
+
+
+class EvalCheckpoint:
+    """
+    CSV writer that can resume from its own previous output.
+
+    Args:
+        path: Output CSV path
+        fieldnames: Output columns (ROW_KEY_COLUMN is appended if missing)
+        status_columns: Columns whose PARSE_ERROR/ERROR values mark a row for re-evaluation
+        resume: Keep successful rows from an existing file instead of truncating it
+    """
+
+    def __init__(self, path: str, fieldnames: List[str], status_columns: Iterable[str], resume: bool = False):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        if ROW_KEY_COLUMN not in self.fieldnames:
+            self.fieldnames.append(ROW_KEY_COLUMN)
+        self.status_columns = list(status_columns)
+        self.done: Dict[str, dict] = {}
+        self.retrying = 0
+        self._file = None
+        self._writer = None
+
+        if resume and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames and ROW_KEY_COLUMN not in reader.fieldnames:
+                self._refuse_resume(f"it has no {ROW_KEY_COLUMN!r} column")
+            for row in reader:
+                key = row.get(ROW_KEY_COLUMN)
+                if not key:
+                    self._refuse_resume(f"line {reader.line_num} has no {ROW_KEY_COLUMN}")
+                if any(row.get(col) in FAILED_VALUES for col in self.status_columns):
+                    self.retrying += 1
+                    self.done.pop(key, None)
+                else:
+                    self.done[key] = row
+
+    def _refuse_resume(self, reason: str):
+        # Rewriting would drop every row we cannot key, i.e. the judged rows resume should keep
+        print(f"WARNING: cannot resume {self.path}: {reason} (written before row keys existed). "
+              f"The file was left untouched; copy it aside before re-running without --resume, "
+              f"which starts the output over.")
+        sys.exit(1)
+
+    def is_done(self, key: str) -> bool:
+        return key in self.done
+
+    def open(self) -> "EvalCheckpoint":
+        """Rewrite the file with the kept rows and start appending new ones."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._rewrite(self.done.values())
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+        return self
+
+    def _rewrite(self, rows: Iterable[dict]):
+        # Write to a temp file first so an interrupted rewrite never loses kept rows
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, self.path)
+
+    def write(self, key: str, row: dict):
+        """Append one judged row and flush it to disk."""
+        row = {**row, ROW_KEY_COLUMN: key}
+        self.done[key] = row
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self, order: Optional[List[str]] = None):
+        """
+        Close the file; if `order` (row keys in input order) is given, rewrite
+        the output so kept and newly judged rows appear in that order.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        if order is not None:
+            position = {key: i for i, key in enumerate(order)}
+            self._rewrite(sorted(self.done.values(), key=lambda r: position.get(r[ROW_KEY_COLUMN], len(position))))
+
+    def rows(self, keys: Optional[Iterable[str]] = None) -> List[dict]:
+        """Rows currently in the checkpoint (kept + newly written), optionally limited to `keys`."""
+        if keys is None:
+            return list(self.done.values())
+        return [self.done[key] for key in dict.fromkeys(keys) if key in self.done]
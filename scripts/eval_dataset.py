@@ -0,0 +1,265 @@
+"""
+Evaluation Datasets
+Typed, columnar (Parquet) copies of the evaluation CSVs shared by the
+transform / collapse / judge scripts.
+
+Every dataset CSV (e.g. projectupdates/llm_responses_output.csv) can have a
+Parquet sibling with the same name. Readers use the Parquet copy when it is at
+least as new as the CSV, and fall back to parsing the CSV otherwise, so CSVs
+edited by hand (or exported from Sheets) are never shadowed by a stale copy.
+
+Schema (derived from column names, so long and wide/prefixed layouts share it):
+- *retrieved_shlokas_ids    -> list<string>   ("a, b, c" in the CSV)
+- *retrieved_shlokas_count  -> int32
+- statuses, failure types, models, llm_used, classification, template,
+  Subgroup                  -> dictionary (categorical)
+- everything else           -> string
+
+Callers pass `columns` so only what they need is read: a routing-only pass
+never deserializes the multi-KB answer columns.
+
+read_shloka_keys() returns a list column as packed integer shloka keys
+(evaluations/evaluators/shloka_keys.py) for NumPy set operations.
+
+pyarrow is optional; without it everything is read from the CSVs.
+
+Usage:
+    python scripts/eval_dataset.py                   # (re)build Parquet for DATASETS
+    python scripts/eval_dataset.py path/to/file.csv  # build for specific CSVs
+    python scripts/eval_dataset.py --info path.csv   # show schema / source
+"""
+
+import csv
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Packed shloka keys (repo root on path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from evaluations.evaluators.shloka_keys import ids_to_keys, np, require_numpy
+
+# Datasets rebuilt by the CLI when no paths are given
+DATASETS = [
+    "projectupdates/llm_responses_output.csv",
+    "projectupdates/finalfixllmoutput.csv",
+    "projectupdates/golden_for_gemini_eval_v3.csv",
+]
+
+LIST_SEPARATOR = ", "
+LIST_SUFFIXES = ("retrieved_shlokas_ids",)
+INT_SUFFIXES = ("retrieved_shlokas_count",)
+CATEGORICAL_COLUMNS = {"Subgroup", "classification", "template", "llm_used", "model"}
+CATEGORICAL_SUFFIXES = ("_status", "_failure_type", "_model")
+
+
+def parquet_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def column_kind(name: str) -> str:
+    """'list', 'int', 'category' or 'string' for a dataset column."""
+    if name.endswith(LIST_SUFFIXES):
+        return "list"
+    if name.endswith(INT_SUFFIXES):
+        return "int"
+    if name in CATEGORICAL_COLUMNS or name.endswith(CATEGORICAL_SUFFIXES):
+        return "category"
+    return "string"
+
+
+def source_path(csv_path: str) -> str:
+    """The file readers will use: the Parquet sibling if usable and fresh, else the CSV."""
+    if pa is None:
+        return csv_path
+    pq_path = parquet_path(csv_path)
+    if not os.path.exists(pq_path):
+        return csv_path
+    if os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(pq_path):
+        return csv_path
+    return pq_path
+
+
+def _csv_header(path: str) -> List[str]:
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def _project(available: List[str], columns: Optional[Iterable[str]]) -> List[str]:
+    # Requested columns missing from this file are skipped (callers use row.get)
+    if columns is None:
+        return list(available)
+    present = set(available)
+    return [c for c in dict.fromkeys(columns) if c in present]
+
+
+def _typed_column(name: str, column: "pa.ChunkedArray") -> "pa.ChunkedArray":
+    kind = column_kind(name)
+    if kind == "list":
+        return pc.split_pattern_regex(column, r"\s*,\s*")
+    if kind == "int":
+        try:
+            return pc.cast(column, pa.int32())
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # Non-numeric values in the CSV: keep the text rather than lose it
+            return column
+    if kind == "category":
+        return pc.dictionary_encode(column)
+    return column
+
+
+def _read_csv_table(path: str, columns: Optional[Iterable[str]] = None) -> "pa.Table":
+    names = _project(_csv_header(path), columns)
+    table = pa_csv.read_csv(
+        path,
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in names},
+            include_columns=names,
+            null_values=[""],
+            strings_can_be_null=True,
+        ),
+    )
+    return pa.table({name: _typed_column(name, table[name]) for name in names})
+
+
+def read_table(csv_path: str, columns: Optional[Iterable[str]] = None) -> "pa.Table":
+    """Read a dataset as an Arrow table, projecting to `columns` when given."""
+    if pa is None:
+        raise ImportError("pyarrow is required for read_table()")
+    source = source_path(csv_path)
+    if source.endswith(".parquet"):
+        return pq.read_table(source, columns=_project(pq.read_schema(source).names, columns))
+    return _read_csv_table(csv_path, columns)
+
+
+def _join_lists(table: "pa.Table") -> "pa.Table":
+    # List columns back to their "a, b, c" CSV text
+    for i, name in enumerate(table.column_names):
+        if pa.types.is_list(table.schema.field(i).type):
+            table = table.set_column(i, name, pc.binary_join(table[name], LIST_SEPARATOR))
+    return table
+
+
+def read_frame(csv_path: str, columns: Optional[Iterable[str]] = None, join_lists: bool = True):
+    """
+    Read a dataset as a pandas DataFrame.
+
+    Categorical columns come back as pandas categoricals (categories in
+    lexical order). With join_lists
+    (default) list columns are joined back into their CSV text, so frames
+    written out with to_csv() keep the original format.
+    """
+    import pandas as pd
+
+    if pa is None:
+        wanted = None if columns is None else set(columns)
+        return pd.read_csv(csv_path, usecols=None if wanted is None else (lambda c: c in wanted))
+
+    table = read_table(csv_path, columns)
+    if join_lists:
+        table = _join_lists(table)
+    df = table.to_pandas()
+
+    # Lexical category order, so sort_values() behaves as it does on text
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].cat.reorder_categories(sorted(df[name].cat.categories))
+    return df
+
+
+def read_records(csv_path: str, columns: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Read a dataset as csv.DictReader-style rows (all values str, "" for missing),
+    projecting to `columns` when given.
+    """
+    if pa is None:
+        with open(csv_path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            names = _project(reader.fieldnames or [], columns)
+            return [{name: row.get(name) or "" for name in names} for row in reader]
+
+    rows = _join_lists(read_table(csv_path, columns)).to_pylist()
+    for row in rows:
+        for name, value in row.items():
+            if not isinstance(value, str):
+                row[name] = "" if value is None else str(value)
+    return rows
+
+
+def read_shloka_keys(
+    csv_path: str, column: str = "retrieved_shlokas_ids"
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Read a list column of shloka IDs as packed keys.
+
+    Returns:
+        (keys, offsets): all rows' keys flattened into one uint32 array
+        (INVALID_KEY for IDs that do not parse) and int64 row offsets, so
+        row i is keys[offsets[i]:offsets[i + 1]].
+    """
+    require_numpy()
+    if pa is None:
+        rows = [
+            [i for i in re.split(r"\s*,\s*", row.get(column, "").strip()) if i]
+            for row in read_records(csv_path, [column])
+        ]
+        ids = [i for row in rows for i in row]
+        lengths = [len(row) for row in rows]
+    else:
+        values = read_table(csv_path, [column])[column].combine_chunks()
+        if not pa.types.is_list(values.type):
+            values = pc.split_pattern_regex(values, r"\s*,\s*")
+        ids = pc.list_flatten(values).to_numpy(zero_copy_only=False)
+        lengths = pc.list_value_length(values).fill_null(0).to_numpy(zero_copy_only=False)
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return ids_to_keys(ids), offsets
+
+
+def build_dataset(csv_path: str) -> str:
+    """Write the typed Parquet copy of a CSV; returns its path."""
+    if pa is None:
+        raise ImportError("pyarrow is required to build Parquet datasets")
+    out_path = parquet_path(csv_path)
+    tmp_path = out_path + ".tmp"
+    pq.write_table(_read_csv_table(csv_path), tmp_path, compression="zstd")
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def write_frame(df, csv_path: str):
+    """Write a DataFrame to CSV and refresh its Parquet copy (when pyarrow is available)."""
+    df.to_csv(csv_path, index=False)
+    if pa is not None:
+        build_dataset(csv_path)
+
+
+# --- CLI ---
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or inspect typed Parquet copies of evaluation CSVs.")
+    parser.add_argument("paths", nargs="*", help=f"Dataset CSVs (default: {', '.join(DATASETS)})")
+    parser.add_argument("--info", action="store_true", help="Print schema and source instead of building")
+    args = parser.parse_args()
+
+    for path in args.paths or DATASETS:
+        if args.info:
+            table = read_table(path)
+            print(f"{path} ({source_path(path)}): {table.num_rows} rows")
+            print(table.schema)
+            continue
+        if not os.path.exists(path):
+            print(f"Skipping {path} (not found)")
+            continue
+        out_path = build_dataset(path)
+        print(f"{path} -> {out_path} ({os.path.getsize(path) / 1024:.0f} KB -> {os.path.getsize(out_path) / 1024:.0f} KB)")
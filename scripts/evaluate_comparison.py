@@ -6,14 +6,19 @@ import time
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from llm_cache import cached_generate_async, discard_cached, print_cache_stats
+from trace_jsonl import iter_traces, resolve_trace_path
+
 # Load env including OPENAI_API_KEY
 load_dotenv('.env.local')
 
 client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
-INPUT_FILE = "projectupdates/llm_responses_output.json"
+INPUT_FILE = "projectupdates/llm_responses_output.jsonl"  # Legacy .json also accepted
 OUTPUT_FILE = "evaluations/comparative_results.csv"
 CONCURRENT_REQUESTS = 5 
+JUDGE_MODEL = "gpt-4o"
+JUDGE_CONFIG = {"temperature": 0.0, "response_format": {"type": "json_object"}}
 
 async def evaluate_pair(pair, semaphore):
     async with semaphore:
@@ -52,22 +57,31 @@ Format your response as a valid JSON object with these exact keys:
   "winner": "OpenAI" or "Claude" or "Tie"
 }}
 """
-        try:
+        async def generate():
             response = await client.chat.completions.create(
-                model="gpt-4o",
+                model=JUDGE_MODEL,
                 messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.0
+                **JUDGE_CONFIG
             )
-            content = response.choices[0].message.content
-            return json.loads(content)
+            return response.choices[0].message.content
+
+        try:
+            content = await cached_generate_async(JUDGE_MODEL, prompt, generate, JUDGE_CONFIG)
+            try:
+                return json.loads(content)
+            except json.JSONDecodeError:
+                discard_cached(JUDGE_MODEL, prompt, JUDGE_CONFIG)
+                raise
         except Exception as e:
             print(f"Error evaluating query '{question[:20]}...': {e}")
             return None
 
 def group_traces(traces):
+    """Pair OpenAI/Anthropic answers by question; returns (pairs, number of traces read)."""
     pairs = {}
+    count = 0
     for trace in traces:
+        count += 1
         # trace_id format: "001-openai" or "001-anthropic"
         tid_parts = trace['trace_id'].split('-')
         base_id = tid_parts[0] # "001"
@@ -83,20 +97,17 @@ def group_traces(traces):
         pairs[base_id][provider] = trace['generation_result']['answer']
         pairs[base_id]['classification'] = trace['classification_result']['category']
     
-    return [p for p in pairs.values() if p['openai'] is not None and p['anthropic'] is not None]
+    return [p for p in pairs.values() if p['openai'] is not None and p['anthropic'] is not None], count
 
 async def main():
     if not os.environ.get("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY not found in environment.")
         return
 
-    print(f"Reading {INPUT_FILE}...")
-    with open(INPUT_FILE, 'r') as f:
-        data = json.load(f)
-    
-    traces = data.get("traces", [])
-    pairs = group_traces(traces)
-    print(f"Found {len(traces)} traces, formed {len(pairs)} comparison pairs.")
+    input_path = resolve_trace_path(INPUT_FILE)
+    print(f"Streaming traces from {input_path}...")
+    pairs, trace_count = group_traces(iter_traces(input_path))
+    print(f"Found {trace_count} traces, formed {len(pairs)} comparison pairs.")
     
     semaphore = asyncio.Semaphore(CONCURRENT_REQUESTS)
     results = []
@@ -141,6 +152,7 @@ async def main():
         writer.writeheader()
         writer.writerows(results)
         
+    print_cache_stats()
     print("Done!")
 
 if __name__ == "__main__":
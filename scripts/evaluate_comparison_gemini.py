@@ -6,6 +6,8 @@ import google.generativeai as genai
 from dotenv import load_dotenv
 import time
 
+from trace_jsonl import iter_traces, resolve_trace_path
+
 # Load env including GEMINI_API_KEY
 load_dotenv('.env.local')
 
@@ -20,7 +22,7 @@ genai.configure(api_key=api_key)
 # Use Gemini 1.5 Flash (stable)
 MODEL_NAME = "gemini-flash-latest" 
 
-INPUT_FILE = "projectupdates/llm_responses_output.json"
+INPUT_FILE = "projectupdates/llm_responses_output.jsonl"  # Legacy .json also accepted
 OUTPUT_FILE = "evaluations/comparative_results_gemini.csv"
 CONCURRENT_REQUESTS = 1 # Sequential to avoid rate limits
 
@@ -85,8 +87,8 @@ Output ONLY a JSON object with these keys:
         return None
 
 def group_traces(traces):
+    """Pair OpenAI/Anthropic answers by question; returns (pairs, number of traces read)."""
     pairs = {}
-    print(f"DEBUG: Processing {len(traces)} traces...")
     skipped_count = 0
     valid_count = 0
     
@@ -120,24 +122,22 @@ def group_traces(traces):
     
     final_pairs = [p for p in pairs.values() if p['openai'] is not None and p['anthropic'] is not None]
     print(f"DEBUG: Formed {len(final_pairs)} pairs from valid traces.")
-    return final_pairs
+    return final_pairs, skipped_count + valid_count
 
 async def main():
     if not api_key:
         print("Error: GEMINI_API_KEY is missing. Please add it to .env.local")
         return
 
-    print(f"Reading {INPUT_FILE}...")
+    input_path = resolve_trace_path(INPUT_FILE)
+    print(f"Streaming traces from {input_path}...")
     try:
-        with open(INPUT_FILE, 'r') as f:
-            data = json.load(f)
+        pairs, trace_count = group_traces(iter_traces(input_path))
     except FileNotFoundError:
         print(f"File not found: {INPUT_FILE}")
         return
 
-    traces = data.get("traces", [])
-    pairs = group_traces(traces)
-    print(f"Found {len(traces)} traces, from which formed {len(pairs)} comparison pairs.")
+    print(f"Found {trace_count} traces, from which formed {len(pairs)} comparison pairs.")
     
     # Write CSV Header first
     print(f"Writing results incrementally to {OUTPUT_FILE}...")
@@ -1,21 +1,119 @@
+"""
+Generate answers for a question set through the Tattva API with both
+providers.
+
+Each provider has its own queue and workers, admitted by a per-provider
+token-bucket scheduler (scripts/rate_limiter.py). Token usage per request is
+estimated from response sizes and fed back into the TPM budget, so new
+requests start whenever there is headroom; the scheduler only backs off when
+the API reports a 429.
+
+Traces are appended to a JSONL file as they complete (scripts/trace_jsonl.py);
+--resume skips questions whose traces already succeeded in that file.
+"""
+
 import json
 import os
+import sys
 import asyncio
 import aiohttp
 import time
 import argparse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from rate_limiter import RateLimiter, estimate_tokens
+from trace_jsonl import JsonlWriter, completed_trace_ids
 
 # Configurations
 INPUT_FILE_PATH = "projectdocs/ramayana_chatbot_questions_chatgpt.json"
 OUTPUT_FOLDER = "projectupdates"
-OUTPUT_FILE_NAME = "llm_responses_output.json"
+OUTPUT_FILE_NAME = "llm_responses_output.jsonl"
 API_URL = "http://localhost:3000/api/answer"
-CONCURRENT_REQUESTS = 1  # Reduced to 1 to avoid hitting OpenAI 30k TPM rate limit
 RETRIES = 3
 BACKOFF_FACTOR = 2
+RATE_LIMIT_RETRIES = 8  # 429s are retried separately from other failures
+
+# Per-provider quotas (requests/tokens per minute) and max in-flight requests
+PROVIDER_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 30_000, "max_in_flight": 8},
+    "anthropic": {"rpm": 50, "tpm": 40_000, "max_in_flight": 8},
+}
+
+# Starting per-request token estimate (~what the old 15s sleep budgeted at 30k TPM);
+# replaced by a running average of observed usage after the first responses
+INITIAL_TOKENS_PER_REQUEST = 7_500
+
+# Prompt instructions not visible in the response (system prompt, template, schema)
+PROMPT_OVERHEAD_TOKENS = 1_500
+
+# Query expansion + classification run on OpenAI for every request, whichever provider answers
+SHARED_OPENAI_TOKENS = 1_000
+
+
+class ProviderScheduler:
+    """Admission control for one provider: RPM/TPM token buckets plus an in-flight cap."""
+
+    def __init__(self, provider: str, rpm: float, tpm: float, max_in_flight: int):
+        self.provider = provider
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm)
+        self.max_in_flight = max_in_flight
+        self.observed_tokens = 0
+        self.observed_requests = 0
+
+    def tokens_per_request(self) -> int:
+        if not self.observed_requests:
+            return INITIAL_TOKENS_PER_REQUEST
+        return self.observed_tokens // self.observed_requests
+
+    async def admit(self) -> int:
+        """Wait for headroom; return the token estimate reserved for this request."""
+        estimate = self.tokens_per_request()
+        await self.limiter.acquire_async(estimate)
+        return estimate
+
+    def record(self, estimate: int, trace_data: Dict[str, Any]):
+        """Correct the TPM budget with the usage implied by the response size."""
+        used = estimate_response_tokens(trace_data)
+        self.observed_tokens += used
+        self.observed_requests += 1
+        self.limiter.record_usage(estimate, used)
+        self.limiter.on_success()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.limiter.stats(), "tokens_per_request": self.tokens_per_request()}
+
+
+def estimate_response_tokens(trace_data: Dict[str, Any]) -> int:
+    """
+    Approximate tokens consumed by one answer: retrieved context sent in the
+    prompt, the generated answer, and fixed prompt overhead.
+    """
+    retrieved = trace_data.get("retrieval_results", {}) or {}
+    context = json.dumps(retrieved.get("shlokas", []), ensure_ascii=False)
+    answer = json.dumps(trace_data.get("full_response") or (trace_data.get("generation_result") or {}).get("answer", ""),
+                        ensure_ascii=False)
+    return estimate_tokens(context) + estimate_tokens(answer) + estimate_tokens(trace_data.get("user_query", "")) + PROMPT_OVERHEAD_TOKENS
 
-async def query_llm(session: aiohttp.ClientSession, question_obj: Dict[str, Any], provider: str, trace_id: str) -> Dict[str, Any]:
+
+def is_rate_limited(status: int, body: str) -> bool:
+    """The API surfaces provider 429s either directly or inside a 500 error body."""
+    if status == 429:
+        return True
+    lowered = body.lower()
+    return status >= 500 and ("429" in lowered or "rate limit" in lowered)
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    value = headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+async def query_llm(session: aiohttp.ClientSession, question_obj: Dict[str, Any], provider: str, trace_id: str,
+                    scheduler: ProviderScheduler, openai_scheduler: ProviderScheduler) -> Dict[str, Any]:
     """
     Sends a question to the Tattva API for a specific provider.
     """
@@ -27,11 +125,16 @@ async def query_llm(session: aiohttp.ClientSession, question_obj: Dict[str, Any]
     }
 
     attempt = 0
+    rate_limit_hits = 0
     while attempt < RETRIES:
+        estimate = await scheduler.admit()
         try:
             async with session.post(API_URL, json=payload, timeout=60) as response:
                 if response.status == 200:
                     trace_data = await response.json()
+                    scheduler.record(estimate, trace_data)
+                    if scheduler is not openai_scheduler:
+                        openai_scheduler.limiter.record_usage(0, SHARED_OPENAI_TOKENS)
                     
                     # Map to output format
                     return {
@@ -48,7 +151,13 @@ async def query_llm(session: aiohttp.ClientSession, question_obj: Dict[str, Any]
                         "final_answer": trace_data.get("generation_result", {}).get("answer")
                     }
                 else:
-                    print(f"[{trace_id}] Error {response.status}: {await response.text()}")
+                    body = await response.text()
+                    if is_rate_limited(response.status, body) and rate_limit_hits < RATE_LIMIT_RETRIES:
+                        rate_limit_hits += 1
+                        scheduler.limiter.on_rate_limited(parse_retry_after(response.headers))
+                        print(f"[{trace_id}] Rate limited, {provider} backing off to {scheduler.limiter.current_rpm:.1f} RPM")
+                        continue
+                    print(f"[{trace_id}] Error {response.status}: {body}")
         except Exception as e:
             print(f"[{trace_id}] Exception: {str(e)}")
         
@@ -66,50 +175,74 @@ async def query_llm(session: aiohttp.ClientSession, question_obj: Dict[str, Any]
         "error": "Failed after retries"
     }
 
-async def process_questions(questions: List[Dict[str, Any]]):
+async def process_questions(questions: List[Dict[str, Any]], output_path: str,
+                            limits: Dict[str, Dict[str, Any]] = PROVIDER_LIMITS, resume: bool = False) -> int:
     """
-    Orchestrates the batch processing sequentially to respect Rate Limits.
+    Orchestrates the batch with one independent queue per provider.
+    Each provider's workers admit requests through its scheduler, and every
+    result is appended to `output_path` as soon as it arrives.
+
+    Returns:
+        Number of traces written in this run.
     """
-    results = []
-    
-    # Create output directory if it doesn't exist
-    if not os.path.exists(OUTPUT_FOLDER):
-        os.makedirs(OUTPUT_FOLDER)
-
-    print(f"Starting processing of {len(questions)} questions x 2 providers = {len(questions)*2} requests.")
-    print("Running SEQUENTIALLY with 15s delay to avoid Rate Limits (30k TPM).")
-    
-    connector = aiohttp.TCPConnector(limit=1)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        trace_counter = 1
-        
-        for q in questions:
-            # Task for OpenAI
-            print(f"Processing Q{trace_counter} - OpenAI...")
-            t_id_openai = f"{trace_counter:03d}-openai"
-            res_openai = await query_llm(session, q, "openai", t_id_openai)
-            results.append(res_openai)
-            await asyncio.sleep(15) # Wait for tokens to replenish
-            
-            # Task for Anthropic
-            print(f"Processing Q{trace_counter} - Anthropic...")
-            t_id_claude = f"{trace_counter:03d}-anthropic"
-            res_claude = await query_llm(session, q, "anthropic", t_id_claude)
-            results.append(res_claude)
-            await asyncio.sleep(15) # Wait for tokens to replenish
-            
-            trace_counter += 1
-            
-            # periodic save
-            if len(results) % 10 == 0:
-                 print(f"Saved checkpoint with {len(results)} results.")
-                 output_path = os.path.join(OUTPUT_FOLDER, OUTPUT_FILE_NAME)
-                 with open(output_path, 'w') as f:
-                    json.dump({"traces": results}, f, indent=2)
+    done = completed_trace_ids(output_path) if resume else set()
+    if not resume and os.path.exists(output_path):
+        os.remove(output_path)
+
+    schedulers = {provider: ProviderScheduler(provider, **cfg) for provider, cfg in limits.items()}
+    queues = {provider: asyncio.Queue() for provider in limits}
+    for counter, q in enumerate(questions, 1):
+        for provider in limits:
+            trace_id = f"{counter:03d}-{provider}"
+            if trace_id not in done:
+                queues[provider].put_nowait((q, trace_id))
+
+    total = sum(queue.qsize() for queue in queues.values())
+    if resume:
+        print(f"Resuming {output_path}: {len(done)} traces already complete.")
+    print(f"Starting processing of {len(questions)} questions x {len(limits)} providers = {total} requests.")
+    for provider, cfg in limits.items():
+        print(f"  {provider}: {cfg['rpm']} RPM / {cfg['tpm']} TPM, up to {cfg['max_in_flight']} in flight")
+
+    async def worker(provider: str):
+        while True:
+            try:
+                q, trace_id = queues[provider].get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            print(f"Processing {trace_id}...")
+            result = await query_llm(session, q, provider, trace_id, schedulers[provider], schedulers["openai"])
+            writer.write(result)
+
+    connector = aiohttp.TCPConnector(limit=sum(cfg["max_in_flight"] for cfg in limits.values()))
+    with JsonlWriter(output_path) as writer:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await asyncio.gather(*(
+                worker(provider)
+                for provider, cfg in limits.items()
+                for _ in range(cfg["max_in_flight"])
+            ))
 
-        return results
+    for provider, scheduler in schedulers.items():
+        print(f"  {provider} scheduler: {json.dumps(scheduler.stats())}")
+
+    return writer.written
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate answers for a question set with both providers.")
+    parser.add_argument("--openai-tpm", type=float, default=PROVIDER_LIMITS["openai"]["tpm"], help="OpenAI tokens-per-minute quota")
+    parser.add_argument("--anthropic-tpm", type=float, default=PROVIDER_LIMITS["anthropic"]["tpm"], help="Anthropic tokens-per-minute quota")
+    parser.add_argument("--max-in-flight", type=int, help="Override max in-flight requests per provider")
+    parser.add_argument("--resume", action="store_true", help="Append to the existing output, skipping completed traces")
+    args = parser.parse_args()
+
+    limits = {provider: dict(cfg) for provider, cfg in PROVIDER_LIMITS.items()}
+    limits["openai"]["tpm"] = args.openai_tpm
+    limits["anthropic"]["tpm"] = args.anthropic_tpm
+    if args.max_in_flight:
+        for cfg in limits.values():
+            cfg["max_in_flight"] = args.max_in_flight
+
     try:
         # Read input file
         with open(INPUT_FILE_PATH, 'r') as f:
@@ -117,16 +250,12 @@ def main():
             
         print(f"Loaded {len(questions)} questions from {INPUT_FILE_PATH}")
 
-        # Run async loop
-        results = asyncio.run(process_questions(questions))
-        
-        # Save results
+        # Run async loop (traces are appended to the JSONL output as they complete)
         output_path = os.path.join(OUTPUT_FOLDER, OUTPUT_FILE_NAME)
-        with open(output_path, 'w') as f:
-            json.dump({"traces": results}, f, indent=2)
+        written = asyncio.run(process_questions(questions, output_path, limits, args.resume))
             
         print(f"\n✅ Processing Complete.")
-        print(f"Total Traces: {len(results)}")
+        print(f"Traces written this run: {written}")
         print(f"Output saved to: {output_path}")
 
     except Exception as e:
@@ -4,14 +4,31 @@ Ramayana Q&A Evaluation Script using Gemini as LLM-Judge.
 
 Evaluates each row in the transformed CSV using the rubric from evaluation prompt.md.
 Produces evaluations comparing both OpenAI and Claude outputs per question.
+
+Rows are judged concurrently: up to --concurrency requests stay in flight and
+a token-bucket limiter (scripts/rate_limiter.py) keeps the run inside the
+configured RPM/TPM quota, backing off automatically on 429s.
+
+Raw judge responses are cached on disk (scripts/llm_cache.py), so re-running
+after a parser or post-processing change replays without API calls.
+
+By default the judge answers in schema-constrained JSON (Gemini structured
+output), so every field is present and checks can only be PASS/FAIL/N/A.
+--output-format xml uses the legacy XML tag prompt; parse_evaluation reads
+either format.
+
+Use --resume to continue an interrupted run: rows already judged in
+OUTPUT_FILE are kept, and only missing or PARSE_ERROR/ERROR rows are sent
+to Gemini again (see scripts/eval_checkpoint.py).
 """
 
 import os
 import sys
-import csv
 import json
 import time
 import re
+import argparse
+import asyncio
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -23,7 +40,12 @@ import google.generativeai as genai
 INPUT_FILE = "projectupdates/golden_for_gemini_eval_v3.csv"  # V3 with T3 why/outOfScopeNotice fields
 OUTPUT_FILE = "projectupdates/gemini_evaluation_V3.csv"  # V3 with T3 refusal checker
 MODEL_NAME = "gemini-2.0-flash"
-DELAY_SECONDS = 4       # Optimized: 4s delay + execution time ~= 15 RPM (Safe max for free tier)
+GEMINI_RPM = 15             # Free tier quota for gemini-2.0-flash
+GEMINI_TPM = 1_000_000
+CONCURRENCY = 8             # Max judge requests in flight
+OUTPUT_TOKEN_ESTIMATE = 600 # Reserved per request for the verdict
+JUDGE_OUTPUT_FORMAT = "json"  # "json" (structured output) or "xml" (legacy tags)
+RATE_LIMIT_RETRIES = 8      # 429s are retried separately from parse/other errors
 LIMIT_ROWS = None       # Full run
 COVERAGE_MODE = False   # Disable test mode
 
@@ -37,6 +59,14 @@ COVERAGE_INDICES = [
     201, 266            # Mix
 ]
 
+# Shared helpers (scripts/)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from rate_limiter import RateLimiter, estimate_tokens, is_rate_limit_error, retry_after_seconds
+from eval_checkpoint import EvalCheckpoint, row_key
+from eval_dataset import read_records
+from llm_cache import cached_generate, cached_generate_async, discard_cached, print_cache_stats
+from response_rules import check_t3_refusal
+
 # Initialize Gemini
 genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
 model = genai.GenerativeModel(MODEL_NAME)
@@ -183,17 +213,17 @@ Provide your evaluation in this exact XML format:
 </evaluation>
 """
 
+# Input columns shown to the judge (also the only columns read from INPUT_FILE)
+INPUT_COLUMNS = [
+    'user_query', 'expanded_query', 'Subgroup', 'classification', 'template', 'Expected_Depth',
+    'openai_final_answer', 'openai_retrieved_shlokas_ids', 'openai_retrieved_shlokas_count', 'openai_status',
+    'claude_final_answer', 'claude_retrieved_shlokas_ids', 'claude_retrieved_shlokas_count', 'claude_status'
+]
+
 def format_row_data(row):
     """Format a CSV row as readable key-value pairs for the prompt."""
-    # Key columns to include
-    key_cols = [
-        'user_query', 'expanded_query', 'Subgroup', 'classification', 'template', 'Expected_Depth',
-        'openai_final_answer', 'openai_retrieved_shlokas_ids', 'openai_retrieved_shlokas_count', 'openai_status',
-        'claude_final_answer', 'claude_retrieved_shlokas_ids', 'claude_retrieved_shlokas_count', 'claude_status'
-    ]
-    
     lines = []
-    for col in key_cols:
+    for col in INPUT_COLUMNS:
         if col in row:
             val = row[col]
             # Truncate very long answers for prompt efficiency
@@ -224,76 +254,6 @@ def clean_value(val):
     
     return clean
 
-def check_t3_refusal(answer_text):
-    """
-    Check if a T3 response properly refuses and redirects.
-    
-    A good T3 response should:
-    1. Politely decline to answer (out of scope)
-    2. Optionally offer alternative topics
-    3. NOT provide a substantive answer about Ramayana with citations
-    
-    Returns: 'PASS' if proper refusal, 'FAIL' if not
-    """
-    if not answer_text:
-        return 'FAIL'
-    
-    answer_lower = answer_text.lower()
-    
-    # Patterns that indicate proper refusal
-    refusal_patterns = [
-        r'outside (my|the) scope',
-        r'beyond (my|the) scope',
-        r'falls outside',
-        r'cannot (help|assist|answer|provide)',
-        r"can't (help|assist|answer|provide)",
-        r'not (within|in) my (scope|purview|expertise)',
-        r"i'm (designed|meant|built|created) to",
-        r'i am (designed|meant|built|created) to',
-        r'not able to (help|assist|answer)',
-        r'unable to (help|assist|answer)',
-        r'this (is|falls) outside',
-        r'i specialize in',
-        r'my focus is',
-        r'my expertise is limited to',
-        r'out of scope',
-        r'not something i can',
-        # Tattva-specific patterns
-        r'outside tattva',
-        r'outside the scope',
-        r'tattva.*(focus|specialize|interpret)',
-        r'does not engage in',
-        r'beyond the text',
-        r'outside.*text of valmiki',
-    ]
-    
-    # Patterns that would FAIL T3 (gave substantive answer)
-    substantive_answer_patterns = [
-        r'\[[A-Za-z]+[ -]Kanda\s+\d+\.\d+\]',  # Has inline citations
-        r'according to (the text|valmiki|the ramayana)',
-        r'the text (states|says|describes|mentions)',
-        r'the shloka (mentions|indicates|states|says)',
-        r'in the ramayana,',
-        r'valmiki (describes|writes|tells|narrates)',
-    ]
-    
-    # Check for refusal language
-    has_refusal = any(re.search(pattern, answer_lower) for pattern in refusal_patterns)
-    
-    # Check for substantive answer (bad for T3)
-    has_substantive = any(re.search(pattern, answer_lower) for pattern in substantive_answer_patterns)
-    
-    # T3 passes if: has refusal language AND no substantive answer
-    if has_refusal and not has_substantive:
-        return 'PASS'
-    elif has_substantive:
-        return 'FAIL'  # Should not provide substantive answer
-    else:
-        # Check for very short responses (might be valid refusals)
-        if len(answer_text) < 200 and ('sorry' in answer_lower or 'apologize' in answer_lower):
-            return 'PASS'
-        return 'FAIL'  # No clear refusal language
-
 # ... (Imports etc)
 
 # ... (Imports etc)
@@ -343,41 +303,144 @@ Evaluate this row data:
 {categories_list}
 """
 
+EVAL_FIELDS = [
+    'classification_check', 'classification_suggestion',
+    'openai_routing_check', 'openai_retrieval_check', 
+    'openai_answers_question', 'openai_cites_shlokas', 'openai_follows_template', 'openai_no_hallucination',
+    'claude_routing_check', 'claude_retrieval_check',
+    'claude_answers_question', 'claude_cites_shlokas', 'claude_follows_template', 'claude_no_hallucination',
+    'edge_case_check', 'winner',
+    'comments', 'fail_group_category'
+]
+
+CRITICAL_FIELDS = ['openai_answers_question', 'claude_answers_question', 'winner']
+
+# Allowed values in structured output; the remaining fields are free text
+CHECK_VALUES = ['PASS', 'FAIL', 'N/A']
+WINNER_VALUES = ['OPENAI', 'CLAUDE', 'TIE', 'NO_WINNER']
+FREE_TEXT_FIELDS = ['classification_suggestion', 'comments', 'fail_group_category']
+
+EVAL_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        field: {"type": "string"} if field in FREE_TEXT_FIELDS else {
+            "type": "string",
+            "format": "enum",
+            "enum": WINNER_VALUES if field == 'winner' else CHECK_VALUES,
+        }
+        for field in EVAL_FIELDS
+    },
+    "required": EVAL_FIELDS,
+}
+
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": EVAL_RESPONSE_SCHEMA}
+
+EVAL_PROMPT_TEMPLATE_JSON = """
+You are an AI evaluation agent.
+... (Standard instructions) ...
+
+**IMPORTANT:** 
+- Output **ONLY** one JSON object with the keys shown below.
+- Checks are "PASS", "FAIL" or "N/A"; winner is "OPENAI", "CLAUDE", "TIE" or "NO_WINNER".
+
+**EXAMPLE OUTPUT:**
+{{
+  "classification_check": "PASS",
+  "classification_suggestion": "N/A",
+  "openai_routing_check": "PASS",
+  "openai_retrieval_check": "PASS",
+  "openai_answers_question": "PASS",
+  "openai_cites_shlokas": "FAIL",
+  "openai_follows_template": "PASS",
+  "openai_no_hallucination": "PASS",
+  "claude_routing_check": "PASS",
+  "claude_retrieval_check": "PASS",
+  "claude_answers_question": "PASS",
+  "claude_cites_shlokas": "PASS",
+  "claude_follows_template": "PASS",
+  "claude_no_hallucination": "PASS",
+  "edge_case_check": "PASS",
+  "winner": "CLAUDE",
+  "comments": "OpenAI failed to cite shlokas.",
+  "fail_group_category": "3b"
+}}
+
+------------------
+
+Evaluate this row data:
+
+<row_data>
+{row_data}
+</row_data>
+
+**OFFICIAL 45 MVP CATEGORIES:**
+{categories_list}
+"""
+
+OUTPUT_HEADERS = ['user_query', 'classification', 'expected_template'] + EVAL_FIELDS
+
+_EVALUATION_PATTERN = re.compile(r'<evaluation>(.*?)</evaluation>', re.DOTALL | re.IGNORECASE)
+_TAG_PATTERN = re.compile(r'<(/?)([A-Za-z_]+)>')
+_CODE_FENCE_PATTERN = re.compile(r'^```(?:json)?\s*|\s*```$', re.IGNORECASE)
+
+def tokenize_tags(text):
+    """
+    Contents of the first <field>...</field> pair of each eval field, found
+    in one pass over the tags (tag names are case-insensitive).
+    """
+    opened = {}
+    found = {}
+    for match in _TAG_PATTERN.finditer(text):
+        name = match.group(2).lower()
+        if name not in EVAL_FIELDS or name in found:
+            continue
+        if not match.group(1):
+            opened.setdefault(name, match.end())
+        elif name in opened:
+            found[name] = text[opened[name]:match.start()]
+    return found
+
+def parse_json_evaluation(text):
+    """
+    Fields of a structured-output (JSON) response; None if the response is
+    not a JSON object. Values that are not strings, and check values outside
+    CHECK_VALUES, are dropped (-> PARSE_ERROR); winner keeps the same
+    catch-all normalization as the XML path.
+    """
+    candidate = _CODE_FENCE_PATTERN.sub('', text.strip())
+    if not candidate.startswith('{'):
+        return None
+    try:
+        data = json.loads(candidate)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    fields = {}
+    for field in EVAL_FIELDS:
+        val = data.get(field)
+        if not isinstance(val, str):
+            continue
+        if field not in FREE_TEXT_FIELDS and field != 'winner' and clean_value(val) not in CHECK_VALUES:
+            continue
+        fields[field] = val
+    return fields
+
 def parse_evaluation(text):
-    """Parse the XML evaluation response with robust extraction."""
-    result = {}
-    
-    # 1. Extract content between <evaluation> tags (ignoring preamble)
-    match_xml = re.search(r'<evaluation>(.*?)</evaluation>', text, re.DOTALL | re.IGNORECASE)
-    if match_xml:
-        text = match_xml.group(1) # Scope parsing to inside tags
-    
-    fields = [
-        'classification_check', 'classification_suggestion',
-        'openai_routing_check', 'openai_retrieval_check', 
-        'openai_answers_question', 'openai_cites_shlokas', 'openai_follows_template', 'openai_no_hallucination',
-        'claude_routing_check', 'claude_retrieval_check',
-        'claude_answers_question', 'claude_cites_shlokas', 'claude_follows_template', 'claude_no_hallucination',
-        'edge_case_check', 'winner',
-        'comments', 'fail_group_category'
-    ]
-    
-    winner_map = {
-        'NO WINNER': 'NO_WINNER',
-        'DRAW': 'TIE',
-        'NONE': 'NO_WINNER',
-        'N/A': 'NO_WINNER',
-        'BOTH': 'TIE',
-        'EQUAL': 'TIE'
-    }
+    """
+    Parse a judge response: structured-output JSON, else the XML tags (only
+    those inside <evaluation>...</evaluation> when present).
+    """
+    raw = parse_json_evaluation(text)
+    if raw is None:
+        match_xml = _EVALUATION_PATTERN.search(text)
+        raw = tokenize_tags(match_xml.group(1) if match_xml else text)
 
-    for field in fields:
-        pattern = f"<{field}>(.*?)</{field}>"
-        # Case insensitive matching for tags
-        match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-        
-        if match:
-            val = match.group(1).strip()
+    result = {}
+    for field in EVAL_FIELDS:
+        if field in raw:
+            val = raw[field].strip()
             if field == 'comments':
                 result[field] = val
             elif field == 'winner':
@@ -400,29 +463,42 @@ def parse_evaluation(text):
     
     return result
 
-def evaluate_row(row, row_num, total):
-    """Evaluate a single row using Gemini."""
+def build_prompt(row, output_format=JUDGE_OUTPUT_FORMAT):
+    """Build the judge prompt for one row ("json" or "xml" response format)."""
     row_data = format_row_data(row)
     categories_str = ", ".join(PRD_CATEGORIES)
+    template = EVAL_PROMPT_TEMPLATE_JSON if output_format == 'json' else EVAL_PROMPT_TEMPLATE
     
     # Prompt is now self-contained, no extra injections needed
-    prompt = EVAL_PROMPT_TEMPLATE.format(row_data=row_data, categories_list=categories_str)
+    return template.format(row_data=row_data, categories_list=categories_str)
+
+def generation_config(output_format):
+    """Gemini generation config for a response format (None = model defaults)."""
+    return JSON_GENERATION_CONFIG if output_format == 'json' else None
+
+def evaluate_row(row, row_num, total, output_format=JUDGE_OUTPUT_FORMAT):
+    """Evaluate a single row using Gemini."""
+    prompt = build_prompt(row, output_format)
+    config = generation_config(output_format)
 
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = model.generate_content(prompt)
-            eval_result = parse_evaluation(response.text)
+            # Retries bypass the cache so a bad cached response is replaced
+            text = cached_generate(MODEL_NAME, prompt,
+                                   lambda: model.generate_content(prompt, generation_config=config).text,
+                                   config=config, bypass=attempt > 0)
+            eval_result = parse_evaluation(text)
             
-            critical_fields = ['openai_answers_question', 'claude_answers_question', 'winner']
-            if any(eval_result.get(k) == 'PARSE_ERROR' for k in critical_fields):
+            if any(eval_result.get(k) == 'PARSE_ERROR' for k in CRITICAL_FIELDS):
                 # ... (Retry logic) ...
                 if attempt < max_retries - 1:
                     print(f"  [{row_num}/{total}] Parse Error (Attempt {attempt+1}), retrying...")
                     time.sleep(2)
                     continue
                 else:
-                    print(f"  [{row_num}/{total}] CRITICAL PARSE FAILURE. Raw Output snippet:\n{response.text[:200]}...")
+                    print(f"  [{row_num}/{total}] CRITICAL PARSE FAILURE. Raw Output snippet:\n{text[:200]}...")
+                    discard_cached(MODEL_NAME, prompt, config)
             
             print(f"  [{row_num}/{total}] Evaluated: {row.get('user_query', 'N/A')[:40]}... -> {eval_result.get('winner', 'N/A')}")
             return eval_result
@@ -433,19 +509,125 @@ def evaluate_row(row, row_num, total):
             if attempt < max_retries - 1:
                 time.sleep(2)
             else:
-                return {k: "ERROR" for k in fields}
+                return {k: "ERROR" for k in EVAL_FIELDS}
+
+async def evaluate_row_async(row, row_num, total, limiter, output_format=JUDGE_OUTPUT_FORMAT):
+    """
+    Async counterpart of evaluate_row.
+
+    Cache hits skip the API and the rate limiter entirely. Every API call
+    waits for the limiter first; 429s shrink the limiter's rate and are
+    retried (up to RATE_LIMIT_RETRIES) without using up the parse/error retries.
+    """
+    prompt = build_prompt(row, output_format)
+    config = generation_config(output_format)
+    estimated_tokens = estimate_tokens(prompt) + OUTPUT_TOKEN_ESTIMATE
+
+    async def generate():
+        await limiter.acquire_async(estimated_tokens)
+        response = await model.generate_content_async(prompt, generation_config=config)
+        limiter.on_success()
+        usage = getattr(response, 'usage_metadata', None)
+        limiter.record_usage(estimated_tokens, getattr(usage, 'total_token_count', None))
+        # Blocked/empty candidates raise on .text
+        return response.text
+
+    max_retries = 3
+    attempt = 0
+    rate_limit_hits = 0
+    while attempt < max_retries:
+        try:
+            # Retries bypass the cache so a bad cached response is replaced
+            text = await cached_generate_async(MODEL_NAME, prompt, generate, config=config, bypass=attempt > 0)
+        except Exception as e:
+            if is_rate_limit_error(e) and rate_limit_hits < RATE_LIMIT_RETRIES:
+                rate_limit_hits += 1
+                limiter.on_rate_limited(retry_after_seconds(e))
+                print(f"  [{row_num}/{total}] Rate limited (429), backing off to {limiter.current_rpm:.1f} RPM...")
+                continue
+            print(f"  [{row_num}/{total}] ERROR (Attempt {attempt+1}): {e}")
+            attempt += 1
+            if attempt < max_retries:
+                await asyncio.sleep(2)
+            continue
+
+        eval_result = parse_evaluation(text)
+        if any(eval_result.get(k) == 'PARSE_ERROR' for k in CRITICAL_FIELDS):
+            attempt += 1
+            if attempt < max_retries:
+                print(f"  [{row_num}/{total}] Parse Error (Attempt {attempt}), retrying...")
+                continue
+            print(f"  [{row_num}/{total}] CRITICAL PARSE FAILURE. Raw Output snippet:\n{text[:200]}...")
+            discard_cached(MODEL_NAME, prompt, config)
+
+        print(f"  [{row_num}/{total}] Evaluated: {row.get('user_query', 'N/A')[:40]}... -> {eval_result.get('winner', 'N/A')}")
+        return eval_result
+
+    return {k: "ERROR" for k in EVAL_FIELDS}
+
+def build_output_row(row, eval_result):
+    """Apply T3 post-processing and merge row info with the evaluation."""
+    # T3 POST-PROCESSING: Force N/A for citation and retrieval checks
+    # Gemini doesn't consistently apply T3 exception rules, so we override here
+    expected_template = row.get('template', '')
+    if expected_template == 'T3':
+        eval_result['openai_cites_shlokas'] = 'N/A'
+        eval_result['claude_cites_shlokas'] = 'N/A'
+        eval_result['openai_retrieval_check'] = 'N/A'
+        eval_result['claude_retrieval_check'] = 'N/A'
+        
+        # NEW: Check for proper refusal behavior instead of normal answer
+        openai_answer = row.get('openai_final_answer', '')
+        claude_answer = row.get('claude_final_answer', '')
+        eval_result['openai_answers_question'] = check_t3_refusal(openai_answer)
+        eval_result['claude_answers_question'] = check_t3_refusal(claude_answer)
+        # T3 refusals don't need citations/retrieval - that's correct behavior
+    
+    # Merge row info with evaluation
+    return {
+        'user_query': row.get('user_query', ''),
+        'classification': row.get('classification', ''),
+        'expected_template': row.get('template', ''), # Rename for clarity
+        **eval_result
+    }
+
+def eval_row_key(row):
+    """Checkpoint key: the question plus both answers being judged."""
+    return row_key(row.get('user_query', ''), row.get('openai_final_answer', ''), row.get('claude_final_answer', ''))
+
+async def run_evaluation(rows, checkpoint, concurrency, limiter, output_format=JUDGE_OUTPUT_FORMAT):
+    """
+    Judge all (key, row) pairs with up to `concurrency` requests in flight.
+
+    Each result is written to the checkpoint as soon as it completes, so a
+    crash loses at most the in-flight rows.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(rows)
 
-# ... (main function remains)
+    async def judge(i, key, row):
+        async with semaphore:
+            print(f"Processing ({i+1}/{total}): [{row.get('classification', '')}] {row.get('user_query', '')[:50]}...")
+            eval_result = await evaluate_row_async(row, i + 1, total, limiter, output_format)
+        checkpoint.write(key, build_output_row(row, eval_result))
 
-# ... (main function remains)
+    await asyncio.gather(*(judge(i, key, row) for i, (key, row) in enumerate(rows)))
 
 def main():
+    parser = argparse.ArgumentParser(description="Evaluate Q&A outputs with Gemini as LLM-judge.")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Max judge requests in flight")
+    parser.add_argument("--rpm", type=float, default=GEMINI_RPM, help="Requests-per-minute quota")
+    parser.add_argument("--tpm", type=float, default=GEMINI_TPM, help="Tokens-per-minute quota")
+    parser.add_argument("--output-format", choices=["json", "xml"], default=JUDGE_OUTPUT_FORMAT,
+                        help="Judge response format: schema-constrained JSON or legacy XML tags")
+    parser.add_argument("--resume", nargs="?", const=OUTPUT_FILE, metavar="PATH",
+                        help=f"Resume into an existing output CSV (default: {OUTPUT_FILE})")
+    args = parser.parse_args()
+    output_file = args.resume or OUTPUT_FILE
+
     print(f"Reading {INPUT_FILE}...")
     
-    rows = []
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    rows = read_records(INPUT_FILE, columns=INPUT_COLUMNS)
     
     print(f"Loaded {len(rows)} rows.")
     
@@ -489,68 +671,29 @@ def main():
         rows = sampled_rows
         print(f"Selected {len(rows)} diverse rows.")
     
-    # Prepare output
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    
-    output_headers = [
-        'user_query', 'classification', 'expected_template',
-        'classification_check', 'classification_suggestion',
-        'openai_routing_check', 'openai_retrieval_check', 
-        'openai_answers_question', 'openai_cites_shlokas', 'openai_follows_template', 'openai_no_hallucination',
-        'claude_routing_check', 'claude_retrieval_check',
-        'claude_answers_question', 'claude_cites_shlokas', 'claude_follows_template', 'claude_no_hallucination',
-        'edge_case_check', 'winner',
-        'comments', 'fail_group_category'
-    ]
-    
-    # Write header
-    with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=output_headers)
-        writer.writeheader()
+    # Prepare output (a fresh run truncates; --resume keeps successful rows)
+    checkpoint = EvalCheckpoint(output_file, OUTPUT_HEADERS, CRITICAL_FIELDS, resume=bool(args.resume))
+    keyed_rows = [(eval_row_key(row), row) for row in rows]
+    pending = [(key, row) for key, row in keyed_rows if not checkpoint.is_done(key)]
+    if args.resume:
+        print(f"Resuming {output_file}: {len(checkpoint.done)} rows done, "
+              f"{checkpoint.retrying} failed rows to redo, {len(pending)} rows to evaluate.")
     
-    print(f"Starting evaluation with {DELAY_SECONDS}s delay between requests...")
+    print(f"Starting evaluation: {args.concurrency} in flight, {args.rpm:g} RPM / {args.tpm:g} TPM, "
+          f"{args.output_format} verdicts...")
     
-    for i, row in enumerate(rows):
-        row_num = i + 1
-        
-        print(f"Processing ({row_num}/{len(rows)}): [{row.get('classification', '')}] {row.get('user_query', '')[:50]}...")
-        
-        eval_result = evaluate_row(row, row_num, len(rows))
-        
-        # T3 POST-PROCESSING: Force N/A for citation and retrieval checks
-        # Gemini doesn't consistently apply T3 exception rules, so we override here
-        expected_template = row.get('template', '')
-        if expected_template == 'T3':
-            eval_result['openai_cites_shlokas'] = 'N/A'
-            eval_result['claude_cites_shlokas'] = 'N/A'
-            eval_result['openai_retrieval_check'] = 'N/A'
-            eval_result['claude_retrieval_check'] = 'N/A'
-            
-            # NEW: Check for proper refusal behavior instead of normal answer
-            openai_answer = row.get('openai_final_answer', '')
-            claude_answer = row.get('claude_final_answer', '')
-            eval_result['openai_answers_question'] = check_t3_refusal(openai_answer)
-            eval_result['claude_answers_question'] = check_t3_refusal(claude_answer)
-            # T3 refusals don't need citations/retrieval - that's correct behavior
-        
-        # Merge row info with evaluation
-        output_row = {
-            'user_query': row.get('user_query', ''),
-            'classification': row.get('classification', ''),
-            'expected_template': row.get('template', ''), # Rename for clarity
-            **eval_result
-        }
-        
-        # Append to CSV immediately
-        with open(OUTPUT_FILE, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=output_headers)
-            writer.writerow(output_row)
-        
-        # Rate limit
-        if row_num < len(rows):
-            time.sleep(DELAY_SECONDS)
+    limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+    start = time.time()
+    checkpoint.open()
+    try:
+        asyncio.run(run_evaluation(pending, checkpoint, args.concurrency, limiter, args.output_format))
+    finally:
+        checkpoint.close(order=[key for key, _ in keyed_rows])
+    elapsed = time.time() - start
     
-    print(f"\nDone! Results written to {OUTPUT_FILE}")
+    print(f"Judged {len(pending)} rows in {elapsed:.1f}s. Limiter: {json.dumps(limiter.stats())}")
+    print_cache_stats()
+    print(f"\nDone! Results written to {output_file}")
 
 if __name__ == "__main__":
     main()
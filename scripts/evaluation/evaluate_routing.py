@@ -21,6 +21,11 @@ load_dotenv('.env.local')
 
 import google.generativeai as genai
 
+# Shared helpers (scripts/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eval_checkpoint import EvalCheckpoint, row_key
+from llm_cache import cached_generate, discard_cached, print_cache_stats
+
 # Configuration
 INPUT_FILE = "projectupdates/golden_responses_AFTER_FIX_2025_12_21_0044.json"
 OUTPUT_DIR = "projectupdates"
@@ -61,8 +66,12 @@ def evaluate_routing(system_category, expected_category, alternatives, taxonomy,
     prompt = prompt.replace("{{ACCEPTABLE_ALTERNATIVES}}", alternatives or "None")
     
     try:
-        response = model.generate_content(prompt)
-        return parse_xml_result(response.text)
+        text = cached_generate(MODEL_NAME, prompt, lambda: model.generate_content(prompt).text)
+        result = parse_xml_result(text)
+        if result['result'] == "N/A":
+            # Unparseable: don't replay it on the next run
+            discard_cached(MODEL_NAME, prompt)
+        return result
     except Exception as e:
         print(f"  ERROR: {e}")
         return {k: "ERROR" for k in ['result', 'match_type']}
@@ -70,6 +79,8 @@ def evaluate_routing(system_category, expected_category, alternatives, taxonomy,
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--limit", type=int, help="Limit number of rows for testing")
+    parser.add_argument("--resume", type=str, metavar="PATH",
+                        help="Resume into an existing results CSV, re-running only missing or ERROR rows")
     args = parser.parse_args()
     
     print("="*60)
@@ -90,19 +101,20 @@ def main():
     if args.limit:
         data = data[:args.limit]
         print(f"LIMITING run to {args.limit} rows.")
-        
-    results = []
     
     # Prepare CSV output
     timestamp = time.strftime("%Y%m%d_%H%M%S")
-    csv_file = f"{OUTPUT_DIR}/routing_evaluation_results_{timestamp}.csv"
+    csv_file = args.resume or f"{OUTPUT_DIR}/routing_evaluation_results_{timestamp}.csv"
     
     fieldnames = ['index', 'user_query', 'system_model', 'system_category', 'expected_category', 'result', 'match_type', 'note']
     
-    with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
+    checkpoint = EvalCheckpoint(csv_file, fieldnames, ['result', 'match_type'], resume=bool(args.resume))
+    if args.resume:
+        print(f"Resuming {csv_file}: {len(checkpoint.done)} rows done, {checkpoint.retrying} failed rows to redo.")
+    order = []
+    
+    checkpoint.open()
+    try:
         for i, row in enumerate(data):
             idx = row.get('index', i+1)
             query = row.get('user_query', '')
@@ -121,6 +133,12 @@ def main():
             if openai_cat == "UNKNOWN":
                 print("  SKIPPING: No system classification found")
                 continue
+            
+            key = row_key(query, openai_cat, expected)
+            order.append(key)
+            if checkpoint.is_done(key):
+                print("  SKIPPING: Already evaluated (resume)")
+                continue
                 
             # Evaluate
             eval_res = evaluate_routing(openai_cat, expected, "", taxonomy, template)
@@ -137,12 +155,14 @@ def main():
                 'match_type': eval_res.get('match_type', 'ERROR'),
                 'note': eval_res.get('note', '')
             }
-            writer.writerow(out_row)
-            results.append(out_row)
+            checkpoint.write(key, out_row)
             
             time.sleep(DELAY_SECONDS)
+    finally:
+        checkpoint.close(order=order)
             
-    # Summary
+    # Summary (includes rows kept from a resumed run)
+    results = checkpoint.rows(order)
     pass_count = sum(1 for r in results if r['result'] == 'PASS')
     total = len(results)
     
@@ -154,6 +174,7 @@ def main():
         print(f"Output saved to: {csv_file}")
     else:
         print("No rows evaluated.")
+    print_cache_stats()
 
 if __name__ == "__main__":
     main()
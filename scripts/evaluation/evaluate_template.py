@@ -9,7 +9,6 @@ Uses Gemini as LLM-Judge.
 
 import os
 import sys
-import csv
 import json
 import time
 import re
@@ -21,6 +20,16 @@ load_dotenv('.env.local')
 
 import google.generativeai as genai
 
+# Shared helpers (scripts/)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eval_checkpoint import EvalCheckpoint, row_key
+from llm_cache import cached_generate, discard_cached, print_cache_stats
+from response_rules import FAST_LOOKUP_QUERY_MATCHER, METADATA_ANSWER_MATCHER, METADATA_QUERY_MATCHER
+
+# Local shloka corpus (repo root)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from evaluations.evaluators.shloka_store import get_shloka_store
+
 # Configuration
 INPUT_FILE = "projectupdates/golden_responses_AFTER_FIX_2025_12_21_1830.json"
 OUTPUT_DIR = "projectupdates"
@@ -76,12 +85,19 @@ def build_shloka_database(trace):
     if not shlokas:
         return "No shlokas found in trace."
         
+    store = get_shloka_store()
     db_text = ""
     for s in shlokas:
         meta = s.get('metadata', {})
         sid = s.get('id', 'unknown')
         text = meta.get('shloka_text', '')
         trans = meta.get('translation', '')
+        if (not text or not trans) and store is not None:
+            # Traces logged without metadata: fill in from the local corpus
+            record = store.get_id(sid)
+            if record is not None:
+                text = text or record.text
+                trans = trans or record.translation
         db_text += f"ID: {sid}\nText: {text}\nTranslation: {trans}\n---\n"
         
     return db_text
@@ -94,8 +110,12 @@ def evaluate_compliance(answer, template_type, shloka_db, prompt_template):
     prompt = prompt.replace("{{SHLOKA_DATABASE}}", shloka_db)
     
     try:
-        response = model.generate_content(prompt)
-        return parse_evaluation_results(response.text)
+        text = cached_generate(MODEL_NAME, prompt, lambda: model.generate_content(prompt).text)
+        result = parse_evaluation_results(text)
+        if result['overall_compliance'] == "ERROR":
+            # Unparseable: don't replay it on the next (resumed) run
+            discard_cached(MODEL_NAME, prompt)
+        return result
     except Exception as e:
         print(f"  ERROR: {e}")
         return {
@@ -114,47 +134,19 @@ def is_metadata_response(query, answer, response_time_ms=None):
     query_lower = query.lower()
     answer_lower = answer.lower() if answer else ""
     
-    # Etymology patterns
-    etymology_patterns = [
-        "what does 'dasharatha' mean",
-        "what does 'ikshvaku' mean",
-        "what does 'rama' mean",
-        "meaning of",
-        "etymology of"
-    ]
-    
-    # Metadata patterns
-    metadata_patterns = [
-        "first kanda",
-        "name of the first",
-        "critical edition",
-        "vulgate",
-        "how many kandas",
-        "what edition",
-        # Q55: Meta questions about the system
-        "which source",
-        "what source",
-        "meta refusal",
-        "refusal reason",
-        "determine scope"
-    ]
-    
-    # Check query patterns
-    for pattern in etymology_patterns + metadata_patterns:
-        if pattern in query_lower:
-            return True
+    # Check query patterns (etymology / metadata / meta questions)
+    if METADATA_QUERY_MATCHER.matches(query_lower):
+        return True
     
     # Check answer markers
-    if "structural metadata" in answer_lower:
+    if METADATA_ANSWER_MATCHER.matches(answer_lower):
         return True
     if "etymology" in answer_lower and "sanskrit" in answer_lower:
         return True
-    if "this is a metadata question" in answer_lower:
-        return True
     
     # Fast response time indicates cached/lookup (< 5 seconds)
     if response_time_ms and response_time_ms < 5000:
-        if any(p in query_lower for p in ["mean", "kanda", "edition"]):
+        if FAST_LOOKUP_QUERY_MATCHER.matches(query_lower):
             return True
     
     return False
@@ -164,6 +156,8 @@ def main():
     parser.add_argument("--limit", type=int, help="Limit number of rows for testing")
     parser.add_argument("--index", type=int, help="Run only specific question index")
     parser.add_argument("--input", type=str, help="Input JSON file path", default=INPUT_FILE)
+    parser.add_argument("--resume", type=str, metavar="PATH",
+                        help="Resume into an existing results CSV, re-running only missing or ERROR rows")
     args = parser.parse_args()
     
     print("="*60)
@@ -186,19 +180,20 @@ def main():
     if args.index:
         data = [d for d in data if d.get('index') == args.index]
         print(f"FILTERING run to index {args.index} only.")
-        
-    results = []
     
     # Prepare CSV output
     timestamp = time.strftime("%Y%m%d_%H%M%S")
-    csv_file = f"{OUTPUT_DIR}/template_compliance_results_{timestamp}.csv"
+    csv_file = args.resume or f"{OUTPUT_DIR}/template_compliance_results_{timestamp}.csv"
     
     fieldnames = ['index', 'user_query', 'system_model', 'assigned_template', 'structural_result', 'semantic_result', 'overall_compliance', 'failures', 'summary']
     
-    with open(csv_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        
+    checkpoint = EvalCheckpoint(csv_file, fieldnames, ['structural_result', 'semantic_result', 'overall_compliance'], resume=bool(args.resume))
+    if args.resume:
+        print(f"Resuming {csv_file}: {len(checkpoint.done)} rows done, {checkpoint.retrying} failed rows to redo.")
+    order = []
+    
+    checkpoint.open()
+    try:
         for i, row in enumerate(data):
             idx = row.get('index', i+1)
             query = row.get('user_query', '')
@@ -262,6 +257,12 @@ def main():
                 print("  SKIPPING: No answer found")
                 continue
             
+            key = row_key(query, openai_answer)
+            order.append(key)
+            if checkpoint.is_done(key):
+                print("  SKIPPING: Already evaluated (resume)")
+                continue
+            
             # NEW: Check for metadata/etymology responses (Fix for Q17, Q19, Q25, Q56)
             if is_metadata_response(query, openai_answer):
                 print("  -> PASS (Metadata/Etymology response - structural check skipped)")
@@ -297,12 +298,14 @@ def main():
                 'failures': eval_res.get('failures', ''),
                 'summary': eval_res.get('summary', '')
             }
-            writer.writerow(out_row)
-            results.append(out_row)
+            checkpoint.write(key, out_row)
             
             time.sleep(DELAY_SECONDS)
+    finally:
+        checkpoint.close(order=order)
             
-    # Summary
+    # Summary (includes rows kept from a resumed run)
+    results = checkpoint.rows(order)
     pass_count = sum(1 for r in results if r['overall_compliance'] == 'PASS')
     total = len(results)
     
@@ -314,6 +317,7 @@ def main():
         print(f"Output saved to: {csv_file}")
     else:
         print("No rows evaluated.")
+    print_cache_stats()
 
 if __name__ == "__main__":
     main()
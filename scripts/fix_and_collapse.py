@@ -1,7 +1,9 @@
-import pandas as pd
 import sys
 import os
 
+from eval_dataset import read_frame, write_frame
+from pivot_engine import RESPONSE_COLUMNS, answer_status, normalize_query, pivot_providers, provider_prefix
+
 # Configuration
 INPUT_FILE = "projectupdates/llm_responses_output.csv" # Using RAW file to be safe
 OUTPUT_FILE = "projectupdates/finalfixllmoutput.csv"
@@ -9,7 +11,7 @@ OUTPUT_FILE = "projectupdates/finalfixllmoutput.csv"
 def main():
     print(f"Reading {INPUT_FILE}...")
     try:
-        df = pd.read_csv(INPUT_FILE)
+        df = read_frame(INPUT_FILE, columns=RESPONSE_COLUMNS)
     except Exception as e:
         print(f"Error reading input CSV: {e}")
         sys.exit(1)
@@ -23,7 +25,7 @@ def main():
     # And "Expected 135".
     # This implies there are duplicates in the 270 that are not strictly identical.
     
-    df['user_query'] = df['user_query'].astype(str).str.strip()
+    df['user_query'] = normalize_query(df['user_query'])
     
     # Check Unique Queries
     unique_queries = df['user_query'].nunique()
@@ -31,7 +33,7 @@ def main():
     
     # Create Base Trace ID for grouping check
     # trace_id format: "001-openai"
-    df['base_trace_id'] = df['trace_id'].apply(lambda x: str(x).split('-')[0] if '-' in str(x) else str(x))
+    df['base_trace_id'] = df['trace_id'].astype(str).str.split('-').str[0]
     unique_ids = df['base_trace_id'].nunique()
     print(f"Unique Base Trace IDs: {unique_ids}")
     
@@ -60,59 +62,16 @@ def main():
     raw_cols = df.columns.tolist()
     pivot_candidates = [c for c in raw_cols if c not in QUESTION_COLS and c != 'llm_used']
     
-    print("Preparing sparse dataframe...")
-    sparse_rows = []
-    
-    for idx, row in df.iterrows():
-        # Determine Prefix
-        llm = str(row.get('llm_used', '')).lower()
-        if 'openai' in llm: prefix = 'openai'
-        elif 'claude' in llm or 'anthropic' in llm: prefix = 'claude'
-        else: prefix = 'unknown' # Should not happen based on constraints
-        
-        # Base Data
-        new_row = {k: row[k] for k in QUESTION_COLS if k in row}
-        
-        # Pivoted Data
-        for col in pivot_candidates:
-            if col in row: # logic check
-                new_row[f"{prefix}_{col}"] = row[col]
-        
-        sparse_rows.append(new_row)
-        
-    sparse_df = pd.DataFrame(sparse_rows)
-    print(f"Sparse DF Rows: {len(sparse_df)}")
-    
-    # NOW APPLY USER'S EXACT COLLAPSE LOGIC
-    MODEL_COLS = [c for c in sparse_df.columns if c not in QUESTION_COLS]
-    
-    # ROBUST ITERATIVE COLLAPSE (Correctly handles the documented 270 unique queries)
+    # Prefix per row: openai / claude / unknown ('unknown' should not happen based on constraints)
+    df['model_prefix'] = provider_prefix(df['llm_used'])
     
-    # 1. Pivot Logic to Sparse
-    # (Same as before)
-    
-    # 2. Iterate and Collapse
-    final_rows = []
-    
-    unique_cnt = sparse_df['user_query'].nunique()
+    # USER'S COLLAPSE LOGIC, vectorized (see pivot_engine.py):
+    # question columns from each query's first row, <prefix>_<col> = last non-null value
+    unique_cnt = df['user_query'].nunique()
     print(f"Collapsing {unique_cnt} groups...")
     
-    grouped = sparse_df.groupby("user_query", sort=False)
-    
-    for query, group in grouped:
-        # Base from first row
-        base = group.iloc[0][QUESTION_COLS].to_dict()
-        
-        # Merge model columns
-        for _, row in group.iterrows():
-            for col in MODEL_COLS:
-                val = row[col]
-                if pd.notna(val):
-                    base[col] = val
-        
-        final_rows.append(base)
-        
-    final_df = pd.DataFrame(final_rows)
+    final_df = pivot_providers(df, key='user_query', provider='model_prefix',
+                               shared_cols=QUESTION_COLS, value_cols=pivot_candidates)
     print(f"Final Collapsed Rows: {len(final_df)}")
     
     # --- POST-PROCESSING ENHANCEMENTS (Addressing User Feedback) ---
@@ -130,17 +89,9 @@ def main():
             # If the column doesn't exist at all (e.g. no data for a model), create it
             final_df[ans_col] = None
             
-        def determine_status(row):
-            ans = row.get(ans_col)
-            if pd.isna(ans) or str(ans).strip() == "":
-                return "MISSING"
-            # Check for error/refusal heuristics?
-            # User suggested: ANSWERED, REFUSED, ERROR, TIMEOUT, MISSING
-            # If 'failure_type' says 'Refusal', update status?
-            # For now, default to ANSWERED if text exists.
-            return "ANSWERED"
-
-        final_df[status_col] = final_df.apply(determine_status, axis=1)
+        # ANSWERED if text exists, else MISSING
+        # (User suggested: ANSWERED, REFUSED, ERROR, TIMEOUT, MISSING; refine if Error cols exist)
+        final_df[status_col] = answer_status(final_df[ans_col])
         
         # 2. Fill Nulls in Failure Type
         # User wants "MISSING" if null
@@ -186,7 +137,7 @@ def main():
 
     # Write CSV
     print(f"Writing to {OUTPUT_FILE}...")
-    final_df.to_csv(OUTPUT_FILE, index=False)
+    write_frame(final_df, OUTPUT_FILE)
     
     # Generate DIAGNOSTICS REPORT for the User
     # To prove that there are 270 distinct questions
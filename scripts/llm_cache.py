@@ -0,0 +1,245 @@
+"""
+LLM Response Cache
+Content-addressed, disk-backed (SQLite) cache of LLM-judge responses shared
+by the evaluator scripts.
+
+Judge prompts are deterministic for a given input, so the raw response text
+is cached under a key derived from (model name, prompt hash, generation
+config). Re-running an evaluation after changing a parser or post-processing
+step replays from disk instead of calling the API.
+
+- Size-bounded: least-recently-used entries are evicted once the cache
+  exceeds LLM_CACHE_MAX_MB.
+- Callers pass bypass=True when retrying after a parse error so a bad
+  cached response is replaced rather than replayed, and discard responses
+  that still fail to parse so the next run asks again.
+- Hit/miss counters are kept per process for reporting.
+
+Usage:
+    python scripts/llm_cache.py            # show stats
+    python scripts/llm_cache.py --clear    # delete every entry
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Cache configuration (set LLM_CACHE_PATH="" to disable caching)
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+LLM_CACHE_MAX_MB = float(os.environ.get("LLM_CACHE_MAX_MB", "512"))
+
+# Evict down to this fraction of the limit so eviction does not run on every put
+EVICT_TARGET_FRACTION = 0.9
+
+# Singleton cache
+_llm_cache: Optional["LLMCache"] = None
+
+
+def cache_key(model: str, prompt: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Content address for one request: hash of model, prompt hash and generation config."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    config_json = json.dumps(config or {}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{model}\x1f{prompt_hash}\x1f{config_json}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed LRU cache of raw LLM response text."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_mb: float = LLM_CACHE_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._size_on_disk()
+
+    def _size_on_disk(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+
+    def _stored_size(self, key: str) -> int:
+        # Size of the row about to be replaced or deleted (0 if absent); call under the lock
+        row = self._conn.execute("SELECT size FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def get(self, model: str, prompt: str, config: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Return the cached response text, or None on a miss."""
+        key = cache_key(model, prompt, config)
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, model: str, prompt: str, response: str, config: Optional[Dict[str, Any]] = None):
+        """Store (or replace) a response and evict LRU entries if over the size limit."""
+        if response is None:
+            return
+        key = cache_key(model, prompt, config)
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            replaced = self._stored_size(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now)
+            )
+            self._conn.commit()
+            self._total_bytes += size - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Recount first: other processes may share the same cache file
+        self._total_bytes = self._size_on_disk()
+        target = int(self.max_bytes * EVICT_TARGET_FRACTION)
+        if self._total_bytes <= target:
+            return
+
+        freed = 0
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM llm_responses ORDER BY last_used ASC"):
+            if self._total_bytes - freed <= target:
+                break
+            doomed.append((key,))
+            freed += size
+
+        self._conn.executemany("DELETE FROM llm_responses WHERE key = ?", doomed)
+        self._conn.commit()
+        self._total_bytes -= freed
+        self.evictions += len(doomed)
+
+    def discard(self, model: str, prompt: str, config: Optional[Dict[str, Any]] = None):
+        """Drop one cached response (e.g. one that failed to parse)."""
+        key = cache_key(model, prompt, config)
+        with self._lock:
+            removed = self._stored_size(key)
+            self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._conn.commit()
+            self._total_bytes -= removed
+
+    def clear(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+            self._total_bytes = 0
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus on-disk size."""
+        total = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_mb": round(self._total_bytes / (1024 * 1024), 2),
+        }
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Get the shared cache, or None if caching is disabled or unavailable."""
+    global _llm_cache
+
+    if _llm_cache is not None:
+        return _llm_cache
+    if not LLM_CACHE_PATH:
+        return None
+
+    try:
+        _llm_cache = LLMCache()
+    except sqlite3.Error as e:
+        print(f"WARNING: LLM response cache unavailable ({LLM_CACHE_PATH}): {e}")
+        return None
+
+    return _llm_cache
+
+
+def cached_generate(model: str, prompt: str, generate, config: Optional[Dict[str, Any]] = None,
+                    bypass: bool = False) -> str:
+    """
+    Return the response text for `prompt`, calling `generate()` only on a
+    cache miss (or when bypass=True) and storing the result.
+    """
+    cache = get_llm_cache()
+    if cache is not None and not bypass:
+        cached = cache.get(model, prompt, config)
+        if cached is not None:
+            return cached
+
+    text = generate()
+    if cache is not None:
+        cache.put(model, prompt, text, config)
+    return text
+
+
+async def cached_generate_async(model: str, prompt: str, generate, config: Optional[Dict[str, Any]] = None,
+                                bypass: bool = False) -> str:
+    """Async counterpart of cached_generate; `generate` is a coroutine function."""
+    cache = get_llm_cache()
+    if cache is not None and not bypass:
+        cached = cache.get(model, prompt, config)
+        if cached is not None:
+            return cached
+
+    text = await generate()
+    if cache is not None:
+        cache.put(model, prompt, text, config)
+    return text
+
+
+def discard_cached(model: str, prompt: str, config: Optional[Dict[str, Any]] = None):
+    """Drop a cached response that turned out to be unusable."""
+    cache = get_llm_cache()
+    if cache is not None:
+        cache.discard(model, prompt, config)
+
+
+def print_cache_stats():
+    """One-line cache summary for the end of an evaluation run."""
+    cache = get_llm_cache()
+    if cache is not None:
+        print(f"LLM cache: {json.dumps(cache.stats())}")
+
+
+# --- CLI ---
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache.")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached response")
+    args = parser.parse_args()
+
+    cache = LLMCache()
+    if args.clear:
+        print(f"Deleted {cache.clear()} entries")
+    print(json.dumps({"path": cache.path, **cache.stats()}, indent=2))
@@ -0,0 +1,111 @@
+"""
+Pivot Engine
+Vectorized long-to-wide reshaping of per-provider LLM output tables
+(one row per question per provider -> one row per question with
+<provider>_<column> columns).
+
+Shared by transform_llm_csv.py, collapse_llm_csv.py and fix_and_collapse.py.
+Replaces their per-row iterrows() loops with a single groupby/unstack, so the
+cost is a handful of column operations regardless of table size.
+
+Collapse rules (identical to the old loops):
+- question-level columns come from the first row of each question
+- each <provider>_<column> takes the last non-null value the provider
+  produced for that question
+- column order: question columns, then per provider (first-appearance
+  order) the value columns in input order
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Columns of the long per-provider table (llm_responses_output.csv), in file
+# order. The reshaping scripts read only these; each is kept or pivoted.
+RESPONSE_COLUMNS = [
+    "trace_id",
+    "Subgroup",
+    "user_query",
+    "expanded_query",
+    "classification",
+    "template",
+    "Expected_Depth",
+    "llm_used",
+    "model",
+    "final_answer",
+    "retrieved_shlokas_count",
+    "retrieved_shlokas_ids",
+]
+
+def normalize_query(values: pd.Series) -> pd.Series:
+    """Grouping key for questions: the query text with surrounding whitespace stripped."""
+    return values.astype(str).str.strip()
+
+
+def provider_prefix(values: pd.Series) -> pd.Series:
+    """Map llm_used values to the openai / claude / unknown column prefixes."""
+    lowered = values.astype(str).str.lower()
+    return pd.Series(
+        np.select(
+            [lowered.str.contains("openai", regex=False),
+             lowered.str.contains("claude", regex=False) | lowered.str.contains("anthropic", regex=False)],
+            ["openai", "claude"],
+            default="unknown",
+        ),
+        index=values.index,
+    )
+
+
+def _decategorize(df: pd.DataFrame) -> pd.DataFrame:
+    # Categorical columns (see eval_dataset.read_frame) become plain values so
+    # callers can fillna() / assign freely, as with frames built from dicts
+    for name in df.columns:
+        if isinstance(df[name].dtype, pd.CategoricalDtype):
+            df[name] = df[name].astype(df[name].cat.categories.dtype)
+    return df
+
+
+def pivot_providers(df: pd.DataFrame, key: str, provider: str, shared_cols: Sequence[str],
+                    value_cols: Optional[Sequence[str]] = None, sort: bool = False) -> pd.DataFrame:
+    """
+    Collapse a long table into one row per `key`.
+
+    Args:
+        df: Long table (one row per question per provider)
+        key: Question key column (already normalized by the caller)
+        provider: Column holding the column prefix for each row
+        shared_cols: Question-level columns, taken from each question's first row
+        value_cols: Columns to pivot (default: everything not shared/key/provider)
+        sort: Order questions by key (groupby default) instead of first appearance
+    """
+    shared_cols = [c for c in shared_cols if c in df.columns]
+    if value_cols is None:
+        excluded = set(shared_cols) | {key, provider}
+        value_cols = [c for c in df.columns if c not in excluded]
+    value_cols = list(value_cols)
+    providers = list(pd.unique(df[provider]))
+
+    base = df.drop_duplicates(key, keep="first").set_index(key)
+    base = base[[c for c in shared_cols if c != key]]
+
+    # Last non-null value per (question, provider, column) in one pass
+    values = df.groupby([key, provider], sort=False, observed=True)[value_cols].last().unstack(provider)
+    ordered = [(col, p) for p in providers for col in value_cols]
+    values = values.reindex(columns=pd.MultiIndex.from_tuples(ordered))
+    values.columns = [f"{p}_{col}" for col, p in ordered]
+
+    wide = base.join(values)
+    if sort:
+        wide = wide.sort_index()
+    wide.index.name = key
+    wide = wide.reset_index()
+
+    # The key column is only returned when it is one of the shared columns
+    return _decategorize(wide[shared_cols + list(values.columns)])
+
+
+def answer_status(answers: pd.Series) -> pd.Series:
+    """ANSWERED when an answer has non-blank text, MISSING otherwise."""
+    missing = answers.isna() | (answers.astype(str).str.strip() == "")
+    return pd.Series(np.where(missing, "MISSING", "ANSWERED"), index=answers.index)
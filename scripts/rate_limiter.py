@@ -0,0 +1,210 @@
+"""
+Rate Limiter
+Token-bucket rate limiter for LLM APIs, configured in requests-per-minute
+(RPM) and tokens-per-minute (TPM).
+
+Shared by the LLM-judge and generation scripts so they can keep many requests
+in flight while staying inside whatever quota tier they run on:
+- Each caller reserves one request plus its estimated tokens; the limiter
+  returns how long to wait so that both buckets stay within quota.
+- Reservations are handed out in arrival order (buckets may go negative),
+  so waiting callers never starve each other.
+- On a 429 the request rate is halved and every caller pauses for the
+  server-suggested delay; successful calls slowly restore the configured rate.
+
+Works from threads (acquire) and from asyncio (acquire_async).
+"""
+
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Rough token estimate for English prompts (~4 characters per token)
+CHARS_PER_TOKEN = 4
+
+# Fraction of the configured RPM restored per successful request after a 429
+RECOVERY_FRACTION = 0.05
+
+# Default pause after a 429 when the server does not suggest one
+DEFAULT_RETRY_AFTER_SECONDS = 10.0
+
+_RETRY_AFTER_PATTERNS = [
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+    re.compile(r"try again in ([\d.]+)\s*s", re.IGNORECASE),
+]
+
+_RATE_LIMIT_ERROR_TYPES = ("ResourceExhausted", "RateLimitError", "TooManyRequests")
+
+_RATE_LIMIT_MESSAGE_PATTERNS = [
+    re.compile(r"(?<![\w.])429(?![\w.])"),
+    re.compile(r"rate[ _-]?limit", re.IGNORECASE),
+    re.compile(r"resource[ _]exhausted", re.IGNORECASE),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for TPM reservations."""
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Check whether an exception from any LLM SDK is a 429 / quota error.
+
+    The exception type and HTTP status decide when present; the message is
+    only consulted for errors that carry neither, and then only a standalone
+    "429" or rate-limit wording counts (not e.g. "4290 tokens" or an ID).
+    """
+    if type(error).__name__ in _RATE_LIMIT_ERROR_TYPES:
+        return True
+
+    for attr in ("status_code", "status", "code"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status == 429
+
+    message = str(error)
+    return any(pattern.search(message) for pattern in _RATE_LIMIT_MESSAGE_PATTERNS)
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Extract the server-suggested retry delay from a rate-limit error, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    message = str(error)
+    for pattern in _RETRY_AFTER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute / 60` per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` (possibly going negative); return seconds until it is covered."""
+        # A single request larger than the bucket must still be admissible
+        amount = min(amount, self.capacity)
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def set_rate(self, per_minute: float):
+        self.rate = per_minute / 60.0
+
+
+class RateLimiter:
+    """
+    RPM + TPM limiter with adaptive back-off on 429s.
+
+    Args:
+        rpm: Requests per minute allowed by the quota tier
+        tpm: Tokens per minute allowed by the quota tier (None = unlimited)
+        min_rpm: Floor for the adaptive request rate after repeated 429s
+    """
+
+    def __init__(self, rpm: float, tpm: Optional[float] = None, min_rpm: float = 1.0):
+        self.max_rpm = float(rpm)
+        self.min_rpm = min(float(min_rpm), self.max_rpm)
+        self.current_rpm = self.max_rpm
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+        # Counters for reporting
+        self.total_requests = 0
+        self.total_tokens = 0
+        self.rate_limited = 0
+        self.total_wait_seconds = 0.0
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request and `tokens` tokens; return seconds to wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            wait = self.requests.reserve(1)
+            if self.tokens is not None and tokens:
+                self.tokens.refill(now)
+                wait = max(wait, self.tokens.reserve(tokens))
+            wait = max(wait, self._paused_until - now)
+
+            self.total_requests += 1
+            self.total_tokens += tokens
+            self.total_wait_seconds += wait
+            return wait
+
+    def acquire(self, tokens: int = 0):
+        """Block the calling thread until the request may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        """Suspend the calling task until the request may be sent."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct a reservation once the real token count is known."""
+        if self.tokens is None or actual_tokens is None:
+            return
+        with self._lock:
+            delta = estimated_tokens - actual_tokens
+            self.total_tokens -= delta
+            if delta > 0:
+                self.tokens.refund(delta)
+            else:
+                self.tokens.reserve(-delta)
+
+    def on_success(self):
+        """Additively restore the request rate after earlier 429s."""
+        if self.current_rpm >= self.max_rpm:
+            return
+        with self._lock:
+            self.current_rpm = min(self.max_rpm, self.current_rpm + self.max_rpm * RECOVERY_FRACTION)
+            self.requests.set_rate(self.current_rpm)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Halve the request rate and pause all callers after a 429."""
+        with self._lock:
+            self.rate_limited += 1
+            self.current_rpm = max(self.min_rpm, self.current_rpm / 2)
+            self.requests.set_rate(self.current_rpm)
+            pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER_SECONDS
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.total_requests,
+            "tokens": self.total_tokens,
+            "rate_limited": self.rate_limited,
+            "current_rpm": round(self.current_rpm, 2),
+            "total_wait_seconds": round(self.total_wait_seconds, 2),
+        }
@@ -0,0 +1,174 @@
+"""
+Response Rules
+Precompiled keyword/regex rules shared by the evaluators: T3 refusal
+detection (evaluate_with_gemini.py) and metadata-query detection
+(evaluation/evaluate_template.py).
+
+Each rule list is compiled once, at import, and checked rule by rule in list
+order, stopping at the first rule that fires. Literal rules are plain
+substring tests. (A single alternation of all the rules was tried and is
+slower on answer-length text: the combined pattern loses sre's literal-prefix
+search, and the ".*" rules are retried at every position.)
+
+The T3 check scans the substantive rules first, since they override a
+refusal; on a refusal that is one full miss per substantive rule plus a
+refusal scan that stops at its first hit.
+
+Usage:
+    from response_rules import check_t3_refusal, explain_t3_refusal
+    check_t3_refusal(answer)      # 'PASS' / 'FAIL'
+    explain_t3_refusal(answer)    # ('FAIL', 'substantive', 'in the ramayana,')
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+
+class RuleMatcher:
+    """A list of rules (regexes, or literal substrings) compiled once, checked in order."""
+
+    def __init__(self, rules: Iterable[str], literal: bool = False, flags: int = 0):
+        self.rules: List[str] = list(rules)
+        self.literal = literal
+        self._compiled = [] if literal else [re.compile(rule, flags) for rule in self.rules]
+
+    def search(self, text: str) -> Optional[str]:
+        """
+        The first listed rule that fires anywhere in text, or None.
+        """
+        if self.literal:
+            for rule in self.rules:
+                if rule in text:
+                    return rule
+            return None
+        for rule, compiled in zip(self.rules, self._compiled):
+            if compiled.search(text):
+                return rule
+        return None
+
+    def matches(self, text: str) -> bool:
+        return self.search(text) is not None
+
+
+# --- T3 refusal rules (matched against the lowercased answer) ---
+
+# Patterns that indicate proper refusal
+REFUSAL_PATTERNS = [
+    r'outside (my|the) scope',
+    r'beyond (my|the) scope',
+    r'falls outside',
+    r'cannot (help|assist|answer|provide)',
+    r"can't (help|assist|answer|provide)",
+    r'not (within|in) my (scope|purview|expertise)',
+    r"i'm (designed|meant|built|created) to",
+    r'i am (designed|meant|built|created) to',
+    r'not able to (help|assist|answer)',
+    r'unable to (help|assist|answer)',
+    r'this (is|falls) outside',
+    r'i specialize in',
+    r'my focus is',
+    r'my expertise is limited to',
+    r'out of scope',
+    r'not something i can',
+    # Tattva-specific patterns
+    r'outside tattva',
+    r'outside the scope',
+    r'tattva.*(focus|specialize|interpret)',
+    r'does not engage in',
+    r'beyond the text',
+    r'outside.*text of valmiki',
+]
+
+# Patterns that would FAIL T3 (gave substantive answer)
+SUBSTANTIVE_ANSWER_PATTERNS = [
+    r'\[[a-z]+[ -]kanda\s+\d+\.\d+\]',  # Has inline citations
+    r'according to (the text|valmiki|the ramayana)',
+    r'the text (states|says|describes|mentions)',
+    r'the shloka (mentions|indicates|states|says)',
+    r'in the ramayana,',
+    r'valmiki (describes|writes|tells|narrates)',
+]
+
+REFUSAL_MATCHER = RuleMatcher(REFUSAL_PATTERNS)
+SUBSTANTIVE_MATCHER = RuleMatcher(SUBSTANTIVE_ANSWER_PATTERNS)
+APOLOGY_MATCHER = RuleMatcher(["sorry", "apologize"], literal=True)
+
+
+def explain_t3_refusal(answer_text: str) -> Tuple[str, str, Optional[str]]:
+    """
+    T3 refusal verdict with the reason behind it.
+
+    Returns:
+        (verdict, reason, rule): verdict is 'PASS' or 'FAIL'; reason is one of
+        'refusal', 'substantive', 'short_apology', 'no_refusal', 'empty';
+        rule is the pattern that decided it (None when no rule fired).
+    """
+    if not answer_text:
+        return 'FAIL', 'empty', None
+
+    answer_lower = answer_text.lower()
+
+    # A substantive answer fails T3 whether or not it also refuses
+    substantive = SUBSTANTIVE_MATCHER.search(answer_lower)
+    if substantive is not None:
+        return 'FAIL', 'substantive', substantive
+
+    refusal = REFUSAL_MATCHER.search(answer_lower)
+    if refusal is not None:
+        return 'PASS', 'refusal', refusal
+
+    # Very short responses might be valid refusals
+    if len(answer_text) < 200:
+        apology = APOLOGY_MATCHER.search(answer_lower)
+        if apology is not None:
+            return 'PASS', 'short_apology', apology
+    return 'FAIL', 'no_refusal', None
+
+
+def check_t3_refusal(answer_text: str) -> str:
+    """
+    Check if a T3 response properly refuses and redirects.
+
+    A good T3 response should:
+    1. Politely decline to answer (out of scope)
+    2. Optionally offer alternative topics
+    3. NOT provide a substantive answer about Ramayana with citations
+
+    Returns: 'PASS' if proper refusal, 'FAIL' if not
+    """
+    return explain_t3_refusal(answer_text)[0]
+
+
+# --- Metadata/etymology query rules (matched against the lowercased query) ---
+
+METADATA_QUERY_PATTERNS = [
+    # Etymology patterns
+    "what does 'dasharatha' mean",
+    "what does 'ikshvaku' mean",
+    "what does 'rama' mean",
+    "meaning of",
+    "etymology of",
+    # Metadata patterns
+    "first kanda",
+    "name of the first",
+    "critical edition",
+    "vulgate",
+    "how many kandas",
+    "what edition",
+    # Q55: Meta questions about the system
+    "which source",
+    "what source",
+    "meta refusal",
+    "refusal reason",
+    "determine scope",
+]
+
+# Answer markers written by the metadata handler
+METADATA_ANSWER_PATTERNS = ["structural metadata", "this is a metadata question"]
+
+# Query words that, with a fast (cached/lookup) response, indicate the metadata handler
+FAST_LOOKUP_QUERY_PATTERNS = ["mean", "kanda", "edition"]
+
+METADATA_QUERY_MATCHER = RuleMatcher(METADATA_QUERY_PATTERNS, literal=True)
+METADATA_ANSWER_MATCHER = RuleMatcher(METADATA_ANSWER_PATTERNS, literal=True)
+FAST_LOOKUP_QUERY_MATCHER = RuleMatcher(FAST_LOOKUP_QUERY_PATTERNS, literal=True)
@@ -7,9 +7,15 @@ Tests 5 questions through the Tattva API to verify inline citations appear.
 
 import requests
 import json
-import re
+import os
+import sys
 import time
 
+# Shared single-pass citation scanner (repo root on path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluations.evaluators.citation_scanner import citation_brackets
+
 # Configuration
 API_URL = "http://localhost:3000/api/answer"
 
@@ -25,8 +31,9 @@ TEST_QUESTIONS = [
     "Can you draw Rama?",
 ]
 
-# Citation regex pattern - matches both [Bala-Kanda X.Y] and [Bala Kanda X.Y]
-CITATION_PATTERN = r'\[[A-Za-z]+[ -]Kanda\s+\d+\.\d+\]'
+def find_inline_citations(text: str) -> list:
+    """Find inline citations - matches both [Bala-Kanda X.Y] and [Bala Kanda X.Y]."""
+    return citation_brackets(text)
 
 def call_api(question: str, provider: str = 'openai') -> dict:
     """Call the Tattva API with a question."""
@@ -58,14 +65,14 @@ def check_citations(trace: dict) -> tuple:
     
     # For T3, citations should NOT be present
     if template == 'T3':
-        citations = re.findall(CITATION_PATTERN, answer)
+        citations = find_inline_citations(answer)
         if len(citations) == 0:
             return True, "T3 correctly has no citations", []
         else:
             return False, "T3 incorrectly has citations", citations
     
     # For T1/T2, citations SHOULD be present
-    citations = re.findall(CITATION_PATTERN, answer)
+    citations = find_inline_citations(answer)
     if len(citations) > 0:
         return True, f"Found {len(citations)} citations", citations
     else:
@@ -0,0 +1,182 @@
+"""
+Trace JSONL
+Append-only JSON Lines storage for generated traces.
+
+Writer:
+- one record per line, appended and flushed as soon as it is produced
+- fsync batched every FSYNC_EVERY records / FSYNC_INTERVAL_SECONDS
+- a torn last line left by a crash is trimmed when the file is reopened
+- records can be re-appended (e.g. a retried trace); readers keep the last
+  record per trace_id
+
+Reader:
+- iter_traces() streams records without loading the whole file; with
+  dedupe it does two passes (trace_id -> offset index, then the records)
+- legacy {"traces": [...]} JSON files are still accepted
+
+orjson is used when installed; the standard json module otherwise.
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Set
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FSYNC_EVERY = 20
+FSYNC_INTERVAL_SECONDS = 5.0
+
+
+def dumps_line(record: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def loads_line(line: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def _trim_torn_tail(path: str):
+    """Drop a partial last line (no trailing newline) left by an interrupted write."""
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+
+        # Scan back to the previous newline
+        pos = size - 1
+        chunk = 4096
+        while pos > 0:
+            start = max(0, pos - chunk)
+            f.seek(start)
+            block = f.read(pos - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+
+class JsonlWriter:
+    """Append-only JSONL writer with batched fsync."""
+
+    def __init__(self, path: str, fsync_every: int = FSYNC_EVERY,
+                 fsync_interval: float = FSYNC_INTERVAL_SECONDS):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.written = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            _trim_torn_tail(path)
+        self._file = open(path, "ab")
+
+    def write(self, record: Dict[str, Any]):
+        self._file.write(dumps_line(record))
+        self._file.flush()
+        self.written += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _iter_lines(path: str) -> Iterator[tuple]:
+    """Yield (offset, parsed record) for every complete, parseable line."""
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            start = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield start, loads_line(line)
+            except ValueError:
+                # Torn/corrupt line (e.g. crash mid-write): skip it
+                continue
+
+
+def resolve_trace_path(path: str) -> str:
+    """Prefer the given file; fall back to the .jsonl/.json sibling if only that exists."""
+    if os.path.exists(path):
+        return path
+    root, ext = os.path.splitext(path)
+    alternative = root + (".json" if ext == ".jsonl" else ".jsonl")
+    return alternative if os.path.exists(alternative) else path
+
+
+def iter_traces(path: str, dedupe_key: Optional[str] = "trace_id") -> Iterator[Dict[str, Any]]:
+    """
+    Stream trace records from a .jsonl file (or a legacy {"traces": [...]} JSON file).
+
+    Args:
+        path: Trace file path
+        dedupe_key: Keep only the last record per this key (None = yield every line)
+    """
+    path = resolve_trace_path(path)
+
+    if not path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from (data.get("traces", []) if isinstance(data, dict) else data)
+        return
+
+    if dedupe_key is None:
+        for _, record in _iter_lines(path):
+            yield record
+        return
+
+    # Pass 1: last offset per key (small: ids and ints only)
+    latest: Dict[Any, int] = {}
+    for offset, record in _iter_lines(path):
+        latest[record.get(dedupe_key, offset)] = offset
+    keep = set(latest.values())
+
+    # Pass 2: stream the surviving records in file order
+    for offset, record in _iter_lines(path):
+        if offset in keep:
+            yield record
+
+
+def completed_trace_ids(path: str) -> Set[str]:
+    """trace_ids whose latest record succeeded (no "error" field); used to resume runs."""
+    if not os.path.exists(path):
+        return set()
+    status: Dict[str, bool] = {}
+    for _, record in _iter_lines(path):
+        trace_id = record.get("trace_id")
+        if trace_id:
+            status[trace_id] = "error" not in record
+    return {trace_id for trace_id, ok in status.items() if ok}
@@ -1,12 +1,80 @@
+"""
+Semantic (claim-level) verification of cited answers.
+
+Every (claim, cited shloka) pair in the answers is checked for entailment by
+an LLM. Pairs are deduplicated, packed ENTAILMENT_BATCH_SIZE at a time into
+one structured-output request (JSON schema, one verdict per pair id), and the
+batches run concurrently under a shared RPM/TPM limiter
+(scripts/rate_limiter.py). Verdicts are cached on disk per pair
+(scripts/llm_cache.py), not per batch, so re-runs over the same answers are
+free even when --limit, --batch-size or new answers move the batch
+boundaries; only uncached pairs are sent to the API.
+"""
+
 import json
 import re
 import argparse
+import asyncio
 import os
-from openai import OpenAI
-from typing import List, Dict, Any
+import sys
+import time
+from openai import AsyncOpenAI
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+from eval_checkpoint import row_key
+from llm_cache import get_llm_cache, print_cache_stats
+from rate_limiter import RateLimiter, estimate_tokens, is_rate_limit_error, retry_after_seconds
+
+# Shared citation scanner and kanda normalizer (repo root on path)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from evaluations.evaluators.citation_scanner import iter_citations
+from evaluations.evaluators.shloka_keys import id_to_key, pack_key
+from evaluations.evaluators.shloka_store import get_shloka_store
 
 # Initialize OpenAI Client
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+ENTAILMENT_MODEL = "gpt-4o-mini"
+ENTAILMENT_BATCH_SIZE = 20      # (claim, shloka) pairs per request
+ENTAILMENT_RPM = 500            # gpt-4o-mini tier-1 quota
+ENTAILMENT_TPM = 200_000
+CONCURRENCY = 8                 # Max batch requests in flight
+OUTPUT_TOKENS_PER_PAIR = 60     # Reserved per pair for verdict + reasoning
+RATE_LIMIT_RETRIES = 8          # 429s are retried separately from parse/other errors
+
+VERDICTS = ["YES", "CONTRADICTION", "UNSUPPORTED"]
+
+# Structured output: one {id, verdict, reason} per pair in the batch
+ENTAILMENT_CONFIG = {
+    "temperature": 0.0,
+    "response_format": {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "entailment_batch",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "id": {"type": "integer"},
+                                "verdict": {"type": "string", "enum": VERDICTS},
+                                "reason": {"type": "string"},
+                            },
+                            "required": ["id", "verdict", "reason"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
+                "required": ["results"],
+                "additionalProperties": False,
+            },
+        },
+    },
+}
 
 def load_responses(filepath: str) -> List[Dict]:
     with open(filepath, 'r') as f:
@@ -35,111 +103,328 @@ def extract_claims(text: str) -> List[Dict]:
             })
     return claims
 
-def get_shloka_text(citation: str, retrieval_results: Dict) -> str:
+# (kanda, sarga, shloka), e.g. ("sundara-kanda", 54, 30)
+ShlokaRef = Tuple[str, int, int]
+
+# Text source for citations missing from the retrieval context:
+# callable (kanda, sarga, shloka) -> text or None. None = no fallback.
+shloka_text_fallback: Optional[Callable[[str, int, int], Optional[str]]] = None
+
+def parse_citation(citation: str) -> Optional[ShlokaRef]:
+    """Canonical (kanda, sarga, shloka) for a citation string like "Sundara Kanda 54.30"."""
+    scanned = next(iter_citations(citation), None)
+    if scanned is None:
+        return None
+    return scanned.kanda, scanned.sarga, scanned.shloka_start
+
+def build_retrieval_index(retrieval_results: Dict) -> Dict[int, Dict]:
     """
-    Finds english translation for a given citation in the retrieval context.
-    Matches loosely: "Sundara Kanda 54.30" vs "id": "sundara-kanda-54-30"
+    Exact-match index of one trace's retrieved shlokas: packed shloka key -> metadata.
+    Built once per trace; IDs like "sundara-kanda-54-30" and "sundara-54-30" both parse.
     """
-    # Normalize citation to ID format: "sundara-kanda-54-30"
-    # Remove "Kanda" if present 2x? No, usually "Sundara Kanda".
-    # Lowercase, replace whitespace with hyphen.
-    
-    # 1. Parse citation string
-    parts = citation.replace("Kanda", "").strip().split()
-    # parts: ['Sundara', '54.30']
-    
-    if len(parts) >= 2:
-        kanda_name = parts[0].lower()
-        nums = parts[-1].split('.')
-        if len(nums) == 2:
-             sarga = nums[0]
-             shloka = nums[1]
-             
-             target_ids = [
-                 f"{kanda_name}-kanda-{sarga}-{shloka}",
-                 f"{kanda_name}-{sarga}-{shloka}"
-             ]
-             
-             shlokas = retrieval_results.get('shlokas', [])
-             for s in shlokas:
-                 s_id = s.get('id', '')
-                 if any(tid in s_id for tid in target_ids):
-                     # Found! Return translation
-                     meta = s.get('metadata', {})
-                     return meta.get('translation', '') or meta.get('shloka_text', '')
-    
-    return None
+    index = {}
+    for s in (retrieval_results or {}).get('shlokas', []) or []:
+        key = id_to_key(s.get('id', ''))
+        if key is not None and key not in index:
+            index[key] = s.get('metadata', {}) or {}
+    return index
 
-def verify_claim(claim: str, shloka_text: str) -> Dict:
-    """Calls LLM to check entailment."""
-    prompt = f"""
-    Premise (Source Text): "{shloka_text}"
-    Hypothesis (Claim): "{claim}"
-    
-    Does the Premise explicitly support the Hypothesis?
-    If yes, output YES.
-    If the Hypothesis contradicts the Premise, output CONTRADICTION.
-    If the Premise is unrelated or does not contain the info, output UNSUPPORTED.
-    
-    Provide a short reasoning.
-    Format: VERDICT | Reasoning
+def get_shloka_text(citation: str, retrieval_index: Dict[int, Dict]) -> Optional[str]:
+    """
+    Finds english translation for a given citation in the retrieval context
+    (see build_retrieval_index), falling back to shloka_text_fallback if set.
     """
+    ref = parse_citation(citation)
+    if ref is None:
+        return None
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.0
-    )
-    content = response.choices[0].message.content
-    parts = content.split('|')
-    verdict = parts[0].strip()
-    reason = parts[1].strip() if len(parts) > 1 else content
+    meta = retrieval_index.get(pack_key(*ref))
+    if meta:
+        text = meta.get('translation', '') or meta.get('shloka_text', '')
+        if text:
+            return text
     
-    return {'verdict': verdict, 'reason': reason}
+    if shloka_text_fallback is not None:
+        return shloka_text_fallback(*ref) or None
+    return None
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--input", required=True, help="Path to golden responses JSON")
-    parser.add_argument("--limit", type=int, default=5, help="Limit number of questions to verify")
-    args = parser.parse_args()
+def pair_key(claim: str, shloka_text: str) -> str:
+    """Identical (claim, shloka text) pairs are only checked once."""
+    return row_key(claim, shloka_text)
+
+def build_batch_prompt(pairs: List[Dict]) -> str:
+    """One prompt for a batch of {'claim', 'shloka_text'} pairs; ids are batch positions."""
+    blocks = []
+    for i, pair in enumerate(pairs):
+        blocks.append(
+            f"[{i}]\n"
+            f"Premise (Source Text): \"{pair['shloka_text']}\"\n"
+            f"Hypothesis (Claim): \"{pair['claim']}\""
+        )
     
-    data = load_responses(args.input)
+    return f"""
+    For each numbered Premise/Hypothesis pair below, decide whether the Premise explicitly supports the Hypothesis.
+    If yes, the verdict is YES.
+    If the Hypothesis contradicts the Premise, the verdict is CONTRADICTION.
+    If the Premise is unrelated or does not contain the info, the verdict is UNSUPPORTED.
     
-    print(f"Verifying first {args.limit} questions from {args.input}...")
+    Judge every pair independently and provide a short reasoning for each.
+    Return exactly one result per pair, using the pair's number as its id.
+
+""" + "\n\n".join(blocks)
+
+def parse_batch_response(content: str, size: int) -> Dict[int, Dict]:
+    """Map batch position -> {'verdict', 'reason'}; invalid or out-of-range entries are dropped."""
+    try:
+        results = json.loads(content).get('results', [])
+    except (json.JSONDecodeError, AttributeError):
+        return {}
     
-    for item in data[:args.limit]:
-        print(f"\nQ[{item.get('index')}]: {item.get('user_query')[:50]}...")
-        
+    parsed = {}
+    for r in results:
+        if not isinstance(r, dict):
+            continue
+        i = r.get('id')
+        verdict = str(r.get('verdict', '')).strip().upper()
+        if isinstance(i, int) and 0 <= i < size and verdict in VERDICTS:
+            parsed[i] = {'verdict': verdict, 'reason': str(r.get('reason', '')).strip()}
+    return parsed
+
+def cached_verdict(pair: Dict) -> Optional[Dict]:
+    """
+    Cached {'verdict', 'reason'} for one pair, or None.
+
+    Each verdict is cached as the response a single-pair request would get
+    (same model and config, the pair's own one-pair prompt), so the entry
+    depends only on the pair and the prompt template, never on its batch.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return None
+    content = cache.get(ENTAILMENT_MODEL, build_batch_prompt([pair]), ENTAILMENT_CONFIG)
+    return parse_batch_response(content, 1).get(0) if content is not None else None
+
+def store_verdict(pair: Dict, result: Dict):
+    """Cache one pair's verdict (see cached_verdict)."""
+    cache = get_llm_cache()
+    if cache is not None:
+        content = json.dumps({'results': [{'id': 0, **result}]})
+        cache.put(ENTAILMENT_MODEL, build_batch_prompt([pair]), content, ENTAILMENT_CONFIG)
+
+async def verify_batch(pairs: List[Dict], limiter: RateLimiter, label: str) -> List[Dict]:
+    """
+    Check one batch of (uncached) pairs in a single request.
+
+    429s shrink the limiter's rate and are retried without using up the
+    parse/error retries. Returned verdicts are cached per pair; pairs still
+    missing from the response after the last retry get verdict ERROR and are
+    not cached.
+    """
+    prompt = build_batch_prompt(pairs)
+    estimated_tokens = estimate_tokens(prompt) + OUTPUT_TOKENS_PER_PAIR * len(pairs)
+
+    async def generate():
+        await limiter.acquire_async(estimated_tokens)
+        response = await client.chat.completions.create(
+            model=ENTAILMENT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            **ENTAILMENT_CONFIG
+        )
+        limiter.on_success()
+        usage = getattr(response, 'usage', None)
+        limiter.record_usage(estimated_tokens, getattr(usage, 'total_tokens', None))
+        return response.choices[0].message.content
+
+    parsed = {}
+    max_retries = 3
+    attempt = 0
+    rate_limit_hits = 0
+    while attempt < max_retries:
+        try:
+            content = await generate()
+        except Exception as e:
+            if is_rate_limit_error(e) and rate_limit_hits < RATE_LIMIT_RETRIES:
+                rate_limit_hits += 1
+                limiter.on_rate_limited(retry_after_seconds(e))
+                print(f"  [{label}] Rate limited (429), backing off to {limiter.current_rpm:.1f} RPM...")
+                continue
+            print(f"  [{label}] ERROR (Attempt {attempt+1}): {e}")
+            attempt += 1
+            if attempt < max_retries:
+                await asyncio.sleep(2)
+            continue
+
+        parsed = parse_batch_response(content, len(pairs))
+        if len(parsed) == len(pairs):
+            break
+        attempt += 1
+        if attempt < max_retries:
+            print(f"  [{label}] Incomplete response ({len(parsed)}/{len(pairs)} verdicts, attempt {attempt}), retrying...")
+
+    for i, result in parsed.items():
+        store_verdict(pairs[i], result)
+    missing = {'verdict': 'ERROR', 'reason': 'No verdict returned'}
+    return [parsed.get(i, missing) for i in range(len(pairs))]
+
+async def verify_pairs(pairs: Dict[str, Dict], limiter: RateLimiter, batch_size: int = ENTAILMENT_BATCH_SIZE,
+                       concurrency: int = CONCURRENCY) -> Dict[str, Dict]:
+    """
+    Check unique pairs (pair_key -> {'claim', 'shloka_text'}).
+    Cached verdicts are looked up first; only the remaining pairs are sent,
+    in concurrent batches formed in key order.
+    """
+    results = {}
+    for key, pair in pairs.items():
+        cached = cached_verdict(pair)
+        if cached is not None:
+            results[key] = cached
+    keys = sorted(key for key in pairs if key not in results)
+    batches = [keys[i:i + batch_size] for i in range(0, len(keys), batch_size)]
+    if results:
+        print(f"{len(results)} pairs answered from the cache, {len(keys)} pairs in {len(batches)} requests")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(n, batch):
+        async with semaphore:
+            verdicts = await verify_batch([pairs[k] for k in batch], limiter, f"batch {n+1}/{len(batches)}")
+        results.update(zip(batch, verdicts))
+
+    await asyncio.gather(*(run(n, batch) for n, batch in enumerate(batches)))
+    return results
+
+def collect_checks(items: List[Dict]) -> List[Dict]:
+    """
+    Extract claims and look up cited shloka text for each question.
+    Returns one entry per question: {'item', 'status', 'claims'} where each
+    citation carries the shloka text (or None) and its pair_key.
+    """
+    questions = []
+    for item in items:
         # Access OpenAI Trace/Result from Batch format
         openai_trace = item.get('openai_trace', {})
         openai_result = item.get('openai', {})
         
-        retrieval = openai_trace.get('retrieval_results', {})
+        retrieval_index = build_retrieval_index(openai_trace.get('retrieval_results', {}))
         answer = openai_result.get('answer', '')
         
+        entry = {'item': item, 'status': 'ok', 'claims': []}
+        questions.append(entry)
         if not answer:
-            print("  No answer found.")
+            entry['status'] = 'no_answer'
             continue
             
         claims = extract_claims(answer)
         if not claims:
-            print("  No citations found in answer.")
+            entry['status'] = 'no_citations'
             continue
             
         for c in claims:
-            print(f"  Claim: {c['claim'][:60]}...")
+            checks = []
             for cit in c['citations']:
-                text = get_shloka_text(cit, retrieval)
-                if text:
-                    print(f"    Citation: {cit} (Found Text)")
-                    # Verify
-                    result = verify_claim(c['claim'], text)
-                    if "YES" in result['verdict']:
-                         print(f"      ✅ SUPPORTED")
-                    else:
-                         print(f"      ❌ {result['verdict']}: {result['reason'][:100]}...")
-                else:
+                text = get_shloka_text(cit, retrieval_index)
+                checks.append({
+                    'citation': cit,
+                    'shloka_text': text,
+                    'key': pair_key(c['claim'], text) if text else None,
+                })
+            entry['claims'].append({'claim': c['claim'], 'checks': checks})
+    return questions
+
+def print_report(questions: List[Dict], results: Dict[str, Dict]) -> Dict[str, int]:
+    """Per-question report in input order; returns verdict counts."""
+    counts = {}
+    for q in questions:
+        item = q['item']
+        print(f"\nQ[{item.get('index')}]: {(item.get('user_query') or '')[:50]}...")
+        if q['status'] == 'no_answer':
+            print("  No answer found.")
+            continue
+        if q['status'] == 'no_citations':
+            print("  No citations found in answer.")
+            continue
+            
+        for c in q['claims']:
+            print(f"  Claim: {c['claim'][:60]}...")
+            for check in c['checks']:
+                cit = check['citation']
+                if not check['key']:
                     print(f"    Citation: {cit} (Text Not Found in Retrieval Context)")
+                    counts['NOT_FOUND'] = counts.get('NOT_FOUND', 0) + 1
+                    continue
+                    
+                print(f"    Citation: {cit} (Found Text)")
+                result = results[check['key']]
+                check.update(result)
+                counts[result['verdict']] = counts.get(result['verdict'], 0) + 1
+                if "YES" in result['verdict']:
+                     print(f"      ✅ SUPPORTED")
+                else:
+                     print(f"      ❌ {result['verdict']}: {result['reason'][:100]}...")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True, help="Path to golden responses JSON")
+    parser.add_argument("--limit", type=int, default=None, help="Limit number of questions to verify (default: all)")
+    parser.add_argument("--batch-size", type=int, default=ENTAILMENT_BATCH_SIZE, help="Pairs per entailment request")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Max requests in flight")
+    parser.add_argument("--rpm", type=float, default=ENTAILMENT_RPM, help="Requests-per-minute quota")
+    parser.add_argument("--tpm", type=float, default=ENTAILMENT_TPM, help="Tokens-per-minute quota")
+    parser.add_argument("--output", help="Optional JSON file for per-claim verdicts")
+    parser.add_argument("--no-local-store", action="store_true",
+                        help="Only use shloka text from the trace's retrieval results")
+    args = parser.parse_args()
+    
+    # Citations outside the retrieval context: look them up in the local corpus store
+    global shloka_text_fallback
+    store = None if args.no_local_store else get_shloka_store()
+    if store is not None:
+        shloka_text_fallback = store.translation
+        print(f"Using local shloka store ({len(store)} shlokas) for citations outside retrieval results")
+    
+    data = load_responses(args.input)
+    items = data[:args.limit] if args.limit else data
+    
+    print(f"Verifying {len(items)} questions from {args.input}...")
+    questions = collect_checks(items)
+    
+    # Deduplicate identical (claim, shloka) pairs across all questions
+    pairs = {}
+    total_checks = 0
+    for q in questions:
+        for c in q['claims']:
+            for check in c['checks']:
+                if check['key']:
+                    total_checks += 1
+                    pairs.setdefault(check['key'], {'claim': c['claim'], 'shloka_text': check['shloka_text']})
+    batches = -(-len(pairs) // args.batch_size)
+    print(f"{total_checks} citation checks -> {len(pairs)} unique pairs -> at most {batches} requests "
+          f"({args.batch_size}/request, {args.concurrency} in flight)")
+    
+    limiter = RateLimiter(rpm=args.rpm, tpm=args.tpm)
+    start = time.time()
+    results = asyncio.run(verify_pairs(pairs, limiter, args.batch_size, args.concurrency))
+    elapsed = time.time() - start
+    
+    counts = print_report(questions, results)
+    
+    print(f"\nVerified {len(pairs)} unique pairs in {elapsed:.1f}s. Verdicts: {json.dumps(counts)}")
+    print(f"Limiter: {json.dumps(limiter.stats())}")
+    print_cache_stats()
+    
+    if args.output:
+        report = [{
+            'index': q['item'].get('index'),
+            'user_query': q['item'].get('user_query'),
+            'status': q['status'],
+            'claims': [{
+                'claim': c['claim'],
+                'checks': [{k: v for k, v in check.items() if k != 'key'} for check in c['checks']],
+            } for c in q['claims']],
+        } for q in questions]
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.output}")
 
 if __name__ == "__main__":
     main()